@@ -3,6 +3,9 @@
 -- 		If doing that, then these fuctions should be revoked from python code for creating dynamic tables, just by passing required table names
 
 
+-- substring search of the verses in the _cleaned bible tables
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- <<<<<<<<<<<<<<< content tables mainly used by VO ( some are used by AgMT as well) >>>>>>>>>>>>>>>>>>>>
 
 
@@ -67,7 +70,9 @@ CREATE TABLE public.sources (
     created_at_date timestamp with time zone DEFAULT ('now'::text)::timestamp(2) with time zone,
     status boolean DEFAULT true NOT NULL,
     version_id bigint,
-    metadata jsonb
+    metadata jsonb,
+    content_version integer DEFAULT 1 NOT NULL,
+    content_updated_at timestamp with time zone DEFAULT now() NOT NULL
 );
 CREATE SEQUENCE public.sources_source_id_seq
     AS integer
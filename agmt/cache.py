@@ -0,0 +1,83 @@
+import time
+import threading
+
+# In-process caches shared by the requests of one API worker.
+# Each worker keeps its own copy, so a write handled by one worker only clears that
+# worker's copy right away; the others pick up the change when their entries expire.
+
+class ReferenceCache(object):
+	'''Named lookup tables that are loaded on first use and kept for `ttl` seconds.
+	A loader is a function without arguments that returns the data to keep.'''
+
+	def __init__(self, ttl):
+		self.ttl = float(ttl)
+		self._loaders = {}
+		self._data = {}
+		self._loaded_at = {}
+		self._lock = threading.Lock()
+
+	def register(self, name, loader):
+		self._loaders[name] = loader
+
+	def get(self, name):
+		with self._lock:
+			loaded_at = self._loaded_at.get(name)
+			if loaded_at is not None and time.time() - loaded_at < self.ttl:
+				return self._data[name]
+		data = self._loaders[name]()
+		with self._lock:
+			self._data[name] = data
+			self._loaded_at[name] = time.time()
+		return data
+
+	def invalidate(self, name=None):
+		'''Drop one table, or all of them, so the next get() reloads from the database.'''
+		with self._lock:
+			if name is None:
+				self._loaded_at.clear()
+				self._data.clear()
+			else:
+				self._loaded_at.pop(name, None)
+				self._data.pop(name, None)
+
+class KeyedCache(object):
+	'''Rows looked up by key through `loader(key)` and kept for `ttl` seconds.
+	Misses (loader returning None) are not kept, so a new row is visible at once.'''
+
+	def __init__(self, ttl, loader):
+		self.ttl = float(ttl)
+		self.loader = loader
+		self._entries = {}
+		self._lock = threading.Lock()
+
+	def get(self, key):
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None and time.time() - entry[1] < self.ttl:
+				return entry[0]
+		value = self.loader(key)
+		if value is not None:
+			with self._lock:
+				self._entries[key] = (value, time.time())
+		return value
+
+	def peek(self, key):
+		'''The value kept for a key, None if there is none. Never calls the loader.'''
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None and time.time() - entry[1] < self.ttl:
+				return entry[0]
+		return None
+
+	def set(self, key, value):
+		'''Store a value computed elsewhere, e.g. by the request that changed the row.'''
+		with self._lock:
+			self._entries[key] = (value, time.time())
+
+	def invalidate(self, key=None):
+		'''Drop one key, or every key, so the next get() reloads from the database.'''
+		with self._lock:
+			if key is None:
+				self._entries.clear()
+			else:
+				self._entries.pop(key, None)
@@ -0,0 +1,76 @@
+import gzip
+import threading
+from collections import OrderedDict
+
+try:
+	import brotli
+except ImportError:
+	brotli = None
+
+# Compressed copies of content responses (bible books and chapters, commentary chapters).
+# A response body is compressed once, the first time it is served after its source changed, and
+# every later request gets the stored bytes in the encoding it accepts. Keys hold the content
+# version of the source, so an upload makes the next request build new copies and the old ones
+# drop out of the cache as it fills up. Each worker keeps its own cache.
+#
+# Brotli is used when the brotli package is installed, gzip always.
+
+MIN_SIZE = 1024
+
+class CompressedCache(object):
+	'''Least recently used store of {encoding: bytes} artifacts, at most max_bytes in total.'''
+
+	def __init__(self, max_bytes, gzip_level=9, brotli_quality=9):
+		self.max_bytes = int(max_bytes)
+		self.gzip_level = int(gzip_level)
+		self.brotli_quality = int(brotli_quality)
+		self._artifacts = OrderedDict()
+		self._size = 0
+		self._lock = threading.Lock()
+
+	def get(self, key):
+		with self._lock:
+			artifact = self._artifacts.get(key)
+			if artifact is not None:
+				self._artifacts.move_to_end(key)
+			return artifact
+
+	def add(self, key, body):
+		'''Compresses a response body, keeps it under key and returns the artifact.'''
+		artifact = self.compress(body)
+		size = sum(len(data) for data in artifact.values())
+		if size > self.max_bytes:
+			return artifact
+		with self._lock:
+			previous = self._artifacts.pop(key, None)
+			if previous is not None:
+				self._size -= sum(len(data) for data in previous.values())
+			self._artifacts[key] = artifact
+			self._size += size
+			while self._size > self.max_bytes:
+				_, dropped = self._artifacts.popitem(last=False)
+				self._size -= sum(len(data) for data in dropped.values())
+		return artifact
+
+	def compress(self, body):
+		if not isinstance(body, bytes):
+			body = body.encode("utf-8")
+		artifact = {"identity": body}
+		if len(body) < MIN_SIZE:
+			return artifact
+		artifact["gzip"] = gzip.compress(body, self.gzip_level)
+		if brotli is not None:
+			artifact["br"] = brotli.compress(body, quality=self.brotli_quality)
+		return artifact
+
+	def clear(self):
+		with self._lock:
+			self._artifacts.clear()
+			self._size = 0
+
+def choose_encoding(accept_encodings, artifact):
+	'''Best encoding of an artifact for the Accept-Encoding header of a request (werkzeug Accept).'''
+	offered = [encoding for encoding in ["br", "gzip"] if encoding in artifact]
+	if not offered:
+		return "identity"
+	return accept_encodings.best_match(offered, default="identity")
@@ -1,2 +1,68 @@
 --Issue: 38, Date: 17-01-2020, Author: Revant
-ALTER TABLE versions ADD metadata jsonb;
\ No newline at end of file
+ALTER TABLE versions ADD metadata jsonb;
+
+--Issue: Conditional GET for content endpoints, Date: 18-10-2026, Author: agent
+ALTER TABLE sources ADD content_version integer DEFAULT 1 NOT NULL;
+ALTER TABLE sources ADD content_updated_at timestamp with time zone DEFAULT now() NOT NULL;
+
+--Issue: Chapter wise JSON of bibles, Date: 18-10-2026, Author: agent
+--Creates <bible table>_chapters for every existing bible and fills it from json_text.
+DO $$
+DECLARE
+	bible text;
+BEGIN
+	FOR bible IN SELECT table_name FROM sources WHERE content_id=1 LOOP
+		IF to_regclass(quote_ident(bible)) IS NOT NULL AND to_regclass(quote_ident(bible || '_chapters')) IS NULL THEN
+			EXECUTE format('CREATE TABLE %I (book_id INT NOT NULL, chapter INT NOT NULL, json_text JSONB,
+				PRIMARY KEY (book_id, chapter))', bible || '_chapters');
+			EXECUTE format('INSERT INTO %I (book_id, chapter, json_text) SELECT b.book_id, c.chapter, c.json_text
+				FROM %I b, jsonb_array_elements(b.json_text->''chapters'') WITH ORDINALITY AS c(json_text, chapter)',
+				bible || '_chapters', bible);
+		END IF;
+	END LOOP;
+END $$;
+
+--Issue: Index ref_id of the cleaned bible tables for verse ranges, Date: 18-10-2026, Author: agent
+DO $$
+DECLARE
+	bible text;
+BEGIN
+	FOR bible IN SELECT table_name FROM sources WHERE content_id=1 LOOP
+		IF to_regclass(quote_ident(bible || '_cleaned')) IS NOT NULL AND NOT EXISTS (SELECT 1 FROM pg_indexes
+			WHERE tablename = bible || '_cleaned' AND indexdef LIKE '%(ref_id)') THEN
+			EXECUTE format('CREATE INDEX ON %I (ref_id)', bible || '_cleaned');
+		END IF;
+	END LOOP;
+END $$;
+
+--Issue: Full text search of bibles, Date: 18-10-2026, Author: agent
+DO $$
+DECLARE
+	bible text;
+BEGIN
+	FOR bible IN SELECT table_name FROM sources WHERE content_id=1 LOOP
+		IF to_regclass(quote_ident(bible || '_cleaned')) IS NOT NULL THEN
+			EXECUTE format('ALTER TABLE %I ADD COLUMN IF NOT EXISTS search_vector tsvector', bible || '_cleaned');
+			EXECUTE format('UPDATE %I SET search_vector=to_tsvector(''simple'', coalesce(verse, '''')) WHERE search_vector IS NULL',
+				bible || '_cleaned');
+			IF NOT EXISTS (SELECT 1 FROM pg_indexes WHERE tablename = bible || '_cleaned'
+				AND indexdef LIKE '%gin (search_vector)') THEN
+				EXECUTE format('CREATE INDEX ON %I USING gin (search_vector)', bible || '_cleaned');
+			END IF;
+		END IF;
+	END LOOP;
+END $$;
+
+--Issue: Trigram index for concordances, Date: 18-10-2026, Author: agent
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+DO $$
+DECLARE
+	bible text;
+BEGIN
+	FOR bible IN SELECT table_name FROM sources WHERE content_id=1 LOOP
+		IF to_regclass(quote_ident(bible || '_cleaned')) IS NOT NULL AND NOT EXISTS (SELECT 1 FROM pg_indexes
+			WHERE tablename = bible || '_cleaned' AND indexdef LIKE '%gin (verse gin_trgm_ops)') THEN
+			EXECUTE format('CREATE INDEX ON %I USING gin (verse gin_trgm_ops)', bible || '_cleaned');
+		END IF;
+	END LOOP;
+END $$;
@@ -0,0 +1,155 @@
+import os
+import time
+import threading
+import psycopg2
+from psycopg2 import extensions
+
+# A bounded pool of postgres connections for one API worker process.
+# get_db() in main.py borrows a connection from here for the duration of a request
+# and close_db() hands it back, so a worker reuses the same few connections instead of
+# doing a TCP + auth handshake for every HTTP call.
+
+class PoolError(Exception):
+	'''Raised when no connection could be checked out within the checkout timeout.'''
+	pass
+
+class ConnectionPool(object):
+
+	def __init__(self, minconn, maxconn, idle_timeout=300, checkout_timeout=10, \
+		healthcheck_after=30, **connect_kwargs):
+		self.minconn = max(0, int(minconn))
+		self.maxconn = max(1, int(maxconn), self.minconn)
+		self.idle_timeout = float(idle_timeout)
+		self.checkout_timeout = float(checkout_timeout)
+		self.healthcheck_after = float(healthcheck_after)
+		self.connect_kwargs = connect_kwargs
+		self.pid = os.getpid()
+		self._cond = threading.Condition()
+		self._idle = []			# (connection, time it was returned), most recent last
+		self._size = 0			# idle + checked out + being opened
+		self._stats = {
+			"created": 0,
+			"closed": 0,
+			"checkouts": 0,
+			"waits": 0,
+			"timeouts": 0,
+			"healthcheckFailures": 0
+		}
+		for _ in range(self.minconn):
+			self._size += 1
+			self._idle.append((self._connect(), time.time()))
+
+	def _connect(self):
+		try:
+			connection = psycopg2.connect(**self.connect_kwargs)
+		except Exception:
+			with self._cond:
+				self._size -= 1
+				self._cond.notify()
+			raise
+		with self._cond:
+			self._stats["created"] += 1
+		return connection
+
+	def _close(self, connection):
+		'''Close a connection that has already been taken out of the pool. Call with the lock held.'''
+		try:
+			connection.close()
+		except Exception:
+			pass
+		self._size -= 1
+		self._stats["closed"] += 1
+		self._cond.notify()
+
+	def _prune_idle(self):
+		'''Close connections idle for longer than idle_timeout, keeping minconn open. Call with the lock held.'''
+		now = time.time()
+		keep = []
+		for connection, returned_at in self._idle:
+			spare = self._size > self.minconn
+			if spare and now - returned_at > self.idle_timeout:
+				self._close(connection)
+			else:
+				keep.append((connection, returned_at))
+		self._idle = keep
+
+	def _healthy(self, connection, returned_at):
+		'''Check a connection before lending it out. Only connections idle for a while get a round trip.'''
+		if connection.closed:
+			return False
+		if time.time() - returned_at < self.healthcheck_after:
+			return True
+		try:
+			cursor = connection.cursor()
+			cursor.execute("select 1")
+			cursor.close()
+			connection.rollback()
+			return True
+		except Exception:
+			return False
+
+	def getconn(self):
+		'''Borrow a connection, waiting up to checkout_timeout for one to be returned when the pool is full.'''
+		deadline = time.time() + self.checkout_timeout
+		while True:
+			candidate = None
+			with self._cond:
+				self._prune_idle()
+				if self._idle:
+					candidate = self._idle.pop()
+				elif self._size < self.maxconn:
+					self._size += 1
+				else:
+					remaining = deadline - time.time()
+					if remaining <= 0:
+						self._stats["timeouts"] += 1
+						raise PoolError("No database connection available (pool size %s)" % self.maxconn)
+					self._stats["waits"] += 1
+					self._cond.wait(remaining)
+					continue
+			if candidate is None:
+				connection = self._connect()
+			else:
+				connection, returned_at = candidate
+				if not self._healthy(connection, returned_at):
+					with self._cond:
+						self._stats["healthcheckFailures"] += 1
+						self._close(connection)
+					continue
+			with self._cond:
+				self._stats["checkouts"] += 1
+			return connection
+
+	def putconn(self, connection, discard=False):
+		'''Return a borrowed connection. Any open transaction is rolled back so the next borrower starts clean.'''
+		if not discard and not connection.closed:
+			try:
+				if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+					connection.rollback()
+			except Exception:
+				discard = True
+		with self._cond:
+			if discard or connection.closed:
+				self._close(connection)
+			else:
+				self._idle.append((connection, time.time()))
+				self._cond.notify()
+
+	def closeall(self):
+		with self._cond:
+			for connection, _ in self._idle:
+				self._close(connection)
+			self._idle = []
+
+	def stats(self):
+		with self._cond:
+			stats = dict(self._stats)
+			stats.update({
+				"pid": self.pid,
+				"min": self.minconn,
+				"max": self.maxconn,
+				"size": self._size,
+				"idle": len(self._idle),
+				"inUse": self._size - len(self._idle)
+			})
+		return stats
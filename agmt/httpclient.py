@@ -0,0 +1,85 @@
+import os
+import time
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Outbound HTTP for the API. All calls to other services go through one pooled session per
+# worker process with connect and read timeouts, so a slow remote host can hold a request
+# for a bounded time only.
+
+log = logging.getLogger(__name__)
+
+connect_timeout = float(os.environ.get("AGMT_HTTP_CONNECT_TIMEOUT", "3.05"))
+read_timeout = float(os.environ.get("AGMT_HTTP_READ_TIMEOUT", "10"))
+pool_size = int(os.environ.get("AGMT_HTTP_POOL_SIZE", "10"))
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+def session():
+	'''Returns the shared session of this process, creating it on first use.'''
+	global _session, _session_pid
+	with _session_lock:
+		if _session is None or _session_pid != os.getpid():
+			new_session = requests.Session()
+			# only connection errors are retried, a request that reached the server is not sent twice
+			adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, \
+				max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.3))
+			new_session.mount("http://", adapter)
+			new_session.mount("https://", adapter)
+			_session = new_session
+			_session_pid = os.getpid()
+		return _session
+
+def request(method, url, **kwargs):
+	kwargs.setdefault("timeout", (connect_timeout, read_timeout))
+	return session().request(method, url, **kwargs)
+
+def get(url, **kwargs):
+	return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+	return request("POST", url, **kwargs)
+
+class UrlResolver(object):
+	'''Keeps the address each of `urls` finally redirects to (e.g. http -> https).
+	A background thread resolves them when the process first asks for one and again every
+	`refresh_interval` seconds. resolve() never makes a call itself; until the first lookup
+	has finished it returns the url as given.'''
+
+	def __init__(self, urls, refresh_interval=3600):
+		self.urls = list(urls)
+		self.refresh_interval = float(refresh_interval)
+		self.pid = None
+		self._resolved = {}
+		self._lock = threading.Lock()
+
+	def start(self):
+		with self._lock:
+			if self.pid == os.getpid():
+				return
+			self.pid = os.getpid()
+			thread = threading.Thread(target=self._run, name="url-resolver", daemon=True)
+			thread.start()
+
+	def refresh(self):
+		for url in self.urls:
+			try:
+				resp = get(url, stream=True)
+				resp.close()
+				self._resolved[url] = resp.url
+			except requests.RequestException as ex:
+				log.warning("Could not resolve %s: %s", url, ex)
+
+	def _run(self):
+		while True:
+			self.refresh()
+			time.sleep(self.refresh_interval)
+
+	def resolve(self, url):
+		self.start()
+		return self._resolved.get(url, url)
@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import requests
+import httpclient
+
+# Outbound email for the API. Endpoints put a message on the queue of their worker process
+# and return; a background thread hands the messages to a transport in batches and retries
+# the ones that failed, so a slow mail provider no longer holds up an HTTP request.
+
+log = logging.getLogger(__name__)
+
+DEFAULT_SENDER = ["noreply@autographamt.in", "Autographa MT"]
+
+class SendinblueTransport(object):
+	'''Sends messages through the sendinblue v2 email API.'''
+	url = "https://api.sendinblue.com/v2.0/email"
+
+	def __init__(self, api_key, timeout=10):
+		self.api_key = api_key
+		self.timeout = (httpclient.connect_timeout, float(timeout))
+
+	def send(self, messages):
+		'''Send a batch of messages over the shared HTTP session. Returns the messages worth retrying.'''
+		failed = []
+		headers = {"api-key": self.api_key}
+		for message in messages:
+			try:
+				resp = httpclient.post(self.url, data=json.dumps(message), headers=headers, \
+					timeout=self.timeout)
+			except requests.RequestException as ex:
+				log.warning("Mail to %s not sent: %s", list(message["to"]), ex)
+				failed.append(message)
+				continue
+			if resp.status_code >= 500 or resp.status_code == 429:
+				log.warning("Mail to %s not sent: HTTP %s", list(message["to"]), resp.status_code)
+				failed.append(message)
+			elif resp.status_code >= 400:
+				# the provider rejected the message itself, sending it again will not help
+				log.error("Mail to %s rejected: HTTP %s %s", list(message["to"]), resp.status_code, resp.text)
+		return failed
+
+class FileTransport(object):
+	'''Appends every message as one line of JSON to a file. Used for tests and local set ups.'''
+
+	def __init__(self, path):
+		self.path = path
+		self._lock = threading.Lock()
+
+	def send(self, messages):
+		with self._lock:
+			with open(self.path, "a") as f:
+				for message in messages:
+					f.write(json.dumps(message) + "\n")
+		return []
+
+class MailQueue(object):
+	'''Queue of outgoing messages drained by a background thread.
+	The thread is started on the first send() in each process, so gunicorn workers forked
+	from the master get their own.'''
+
+	def __init__(self, transport, batch_size=20, max_retries=3, retry_delay=5):
+		self.transport = transport
+		self.batch_size = max(1, int(batch_size))
+		self.max_retries = int(max_retries)
+		self.retry_delay = float(retry_delay)
+		self.pid = None
+		self._queue = None
+		self._thread = None
+		self._lock = threading.Lock()
+
+	def _start(self):
+		with self._lock:
+			if self.pid == os.getpid():
+				return
+			self.pid = os.getpid()
+			self._queue = queue.Queue()
+			self._thread = threading.Thread(target=self._run, name="mailer", daemon=True)
+			self._thread.start()
+
+	def send(self, to, subject, html, sender=None):
+		'''Queue a message for `to` (an email id or a list of them) and return immediately.'''
+		if isinstance(to, str):
+			to = [to]
+		message = {
+			"to": {email: "" for email in to},
+			"from": sender or DEFAULT_SENDER,
+			"subject": subject,
+			"html": html
+		}
+		self._start()
+		self._queue.put((message, 0))
+
+	def flush(self, timeout=None):
+		'''Block until every queued message has been handed to the transport or dropped.'''
+		if self.pid != os.getpid():
+			return True
+		deadline = None if timeout is None else time.time() + timeout
+		while self._queue.unfinished_tasks:
+			if deadline is not None and time.time() > deadline:
+				return False
+			time.sleep(0.05)
+		return True
+
+	def _next_batch(self):
+		batch = [self._queue.get()]
+		while len(batch) < self.batch_size:
+			try:
+				batch.append(self._queue.get_nowait())
+			except queue.Empty:
+				break
+		return batch
+
+	def _retry_later(self, message, attempts):
+		'''Put a failed message back after an exponential backoff. Its task stays open until then,
+		so flush() also waits for pending retries.'''
+		def requeue():
+			self._queue.put((message, attempts))
+			self._queue.task_done()
+		delay = self.retry_delay * (2 ** (attempts - 1))
+		timer = threading.Timer(delay, requeue)
+		timer.daemon = True
+		timer.start()
+
+	def _run(self):
+		while True:
+			batch = self._next_batch()
+			messages = [message for message, _ in batch]
+			try:
+				failed = self.transport.send(messages)
+			except Exception as ex:
+				log.error("Mail transport error: %s", ex)
+				failed = messages
+			failed_ids = set(id(message) for message in failed)
+			for message, attempts in batch:
+				if id(message) in failed_ids:
+					if attempts < self.max_retries:
+						self._retry_later(message, attempts + 1)
+						continue
+					log.error("Giving up on mail to %s: %s", list(message["to"]), message["subject"])
+				self._queue.task_done()
+
+def from_environment(api_key):
+	'''Builds the queue from the AGMT_MAIL_* settings. The sendinblue transport is the default.'''
+	transport_name = os.environ.get("AGMT_MAIL_TRANSPORT", "sendinblue")
+	if transport_name == "file":
+		transport = FileTransport(os.environ.get("AGMT_MAIL_FILE", "../logs/mails.jsonl"))
+	else:
+		transport = SendinblueTransport(api_key, \
+			timeout=os.environ.get("AGMT_MAIL_TIMEOUT", "10"))
+	mail_queue = MailQueue(transport, batch_size=os.environ.get("AGMT_MAIL_BATCH_SIZE", "20"), \
+		max_retries=os.environ.get("AGMT_MAIL_RETRIES", "3"), \
+		retry_delay=os.environ.get("AGMT_MAIL_RETRY_DELAY", "5"))
+	atexit.register(mail_queue.flush, 10)
+	return mail_queue
@@ -19,6 +19,9 @@ import re
 import json
 import logging
 import traceback
+import bisect
+import itertools
+import unicodedata
 import flask
 from flask import Flask, request, session, redirect, jsonify, make_response
 from flask import g
@@ -31,6 +34,13 @@ from psycopg2 import sql
 from psycopg2.extras import execute_values
 from random import randint
 import phrases
+import dbpool
+import httpclient
+import mailer
+import metrics
+import cache
+import compression
+import wordindex
 from functools import reduce
 import traceback
 from logging.handlers import RotatingFileHandler
@@ -56,21 +66,77 @@ postgres_database = os.environ.get("AGMT_POSTGRES_DATABASE", "postgres") # vacha
 host_api_url = os.environ.get("AGMT_HOST_API_URL", "localhost:8000")
 host_ui_url = os.environ.get("AGMT_HOST_UI_URL","autographamt.com")
 system_email = os.environ.get("MTV2_EMAIL_ID", "autographamt@gmail.com")
+postgres_pool_min = int(os.environ.get("AGMT_POSTGRES_POOL_MIN", "1"))
+postgres_pool_max = int(os.environ.get("AGMT_POSTGRES_POOL_MAX", "10"))
+postgres_pool_idle_timeout = float(os.environ.get("AGMT_POSTGRES_POOL_IDLE_TIMEOUT", "300"))
+postgres_pool_checkout_timeout = float(os.environ.get("AGMT_POSTGRES_POOL_TIMEOUT", "10"))
+postgres_pool_healthcheck_after = float(os.environ.get("AGMT_POSTGRES_POOL_HEALTHCHECK_AFTER", "30"))
+mail_queue = mailer.from_environment(sendinblue_key)
+metrics_registry = metrics.Registry(os.environ.get("AGMT_METRICS_DIR"))
+
+db_pool = None
+
+def get_pool():
+	"""Returns the connection pool of this worker process, creating it on first use.
+	The pool is created lazily so that every gunicorn worker gets its own connections
+	after the fork instead of sharing sockets opened in the master.
+	"""
+	global db_pool
+	if db_pool is None or db_pool.pid != os.getpid():
+		db_pool = dbpool.ConnectionPool(postgres_pool_min, postgres_pool_max,
+			idle_timeout=postgres_pool_idle_timeout, checkout_timeout=postgres_pool_checkout_timeout,
+			healthcheck_after=postgres_pool_healthcheck_after, dbname=postgres_database,
+			user=postgres_user, password=postgres_password, host=postgres_host, port=postgres_port,
+			cursor_factory=metrics.InstrumentedCursor)
+	return db_pool
 
 def get_db():                                                                      #--------------To open database connection-------------------#
-	"""Opens a new database connection if there is none yet for the
+	"""Borrows a database connection from the pool if there is none yet for the
 	current application context.
 	"""
 	if not hasattr(g, 'db'):
-		g.db = psycopg2.connect(dbname=postgres_database, user=postgres_user,
-			password=postgres_password,	host=postgres_host, port=postgres_port)
+		g.db = get_pool().getconn()
 	return g.db
 
 @app.teardown_appcontext                                              #-----------------Close database connection----------------#
 def close_db(error):
-	"""Closes the database again at the end of the request."""
+	"""Returns the database connection to the pool at the end of the request.
+	Uncommitted work is rolled back by the pool."""
 	if hasattr(g, 'db'):
-		g.db.close()
+		get_pool().putconn(g.pop('db'))
+
+@app.errorhandler(dbpool.PoolError)
+def pool_exception_handler(error):
+	log.error("Database pool exhausted: %s", get_pool().stats())
+	return '{"success":false, "message":"Server busy. Try again later"}', 503
+
+@app.route("/v1/stats/dbpool", methods=["GET"])
+def getPoolStats():
+	'''Return the connection pool usage of the worker that served the request.'''
+	return json.dumps(get_pool().stats())
+
+@app.before_request
+def start_request_metrics():
+	metrics.start_request()
+
+@app.after_request
+def record_request_metrics(response):
+	"""Adds latency, SQL statement count, DB time and response size of the request
+	to the numbers of its route."""
+	measured = metrics.end_request()
+	if measured is None:
+		return response
+	duration, statements, db_time = measured
+	route = request.url_rule.rule if request.url_rule else "unmatched"
+	size = None if response.is_streamed else response.calculate_content_length()
+	metrics_registry.observe(route, request.method, response.status_code, duration, statements, db_time, size)
+	return response
+
+@app.route("/v1/metrics", methods=["GET"])
+def getMetrics():
+	'''Return the request metrics per route in the Prometheus text format.'''
+	body = metrics.render(metrics_registry.collect(), get_pool().stats() if db_pool else None)
+	return body, 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
 
 def getLid(bcv):
 	connection = get_db()
@@ -90,26 +156,323 @@ def getLid(bcv):
 	cursor.close()
 	return lid
 
+#####################################################
+# Reference data cache
+# bible_books_look_up, languages and content_types rarely change, so every worker
+# loads them once and keeps them for AGMT_REFERENCE_CACHE_TTL seconds.
+#####################################################
+
+reference_cache = cache.ReferenceCache(float(os.environ.get("AGMT_REFERENCE_CACHE_TTL", "3600")))
+
+def loadBooks():
+	cursor = get_db().cursor()
+	cursor.execute("SELECT book_id, book_name, book_code FROM bible_books_look_up Order by book_id")
+	rst = cursor.fetchall()
+	cursor.close()
+	return {
+		"rows": rst,
+		"byId": {int(bookId): (bookName, bookCode) for bookId, bookName, bookCode in rst},
+		"byCode": {bookCode.lower(): (int(bookId), bookName) for bookId, bookName, bookCode in rst}
+	}
+
+def loadLanguages():
+	cursor = get_db().cursor()
+	cursor.execute("select language_id, language_name, language_code from languages order by language_name")
+	rst = cursor.fetchall()
+	cursor.close()
+	return {
+		"rows": rst,
+		"byId": {langId: (langName, langCode) for langId, langName, langCode in rst},
+		"byCode": {langCode: (langId, langName) for langId, langName, langCode in rst}
+	}
+
+def loadContentTypes():
+	cursor = get_db().cursor()
+	cursor.execute("select content_id, content_type, key from content_types")
+	rst = cursor.fetchall()
+	cursor.close()
+	return {
+		"rows": rst,
+		"byType": {contentType: (contentId, key) for contentId, contentType, key in rst}
+	}
+
+reference_cache.register("books", loadBooks)
+reference_cache.register("languages", loadLanguages)
+reference_cache.register("content_types", loadContentTypes)
+
+def getBookByCode(bookCode):
+	'''Returns (book_id, book_name) for a 3 letter book code in any case, None if invalid.'''
+	return reference_cache.get("books")["byCode"].get(bookCode.lower())
+
+def getBookById(bookId):
+	'''Returns (book_name, book_code) for a book id, None if invalid.'''
+	return reference_cache.get("books")["byId"].get(int(bookId))
+
+def getLanguageByCode(languageCode):
+	'''Returns (language_id, language_name) for a language code, None if not present.
+	A miss is confirmed against the DB in case languages were added after the cache was loaded.'''
+	language = reference_cache.get("languages")["byCode"].get(languageCode)
+	if language is None:
+		cursor = get_db().cursor()
+		cursor.execute("select language_id, language_name from languages where language_code=%s", (languageCode,))
+		language = cursor.fetchone()
+		cursor.close()
+		if language:
+			reference_cache.invalidate("languages")
+	return language
+
+def getLanguageById(languageId):
+	'''Returns (language_name, language_code) for a language id, None if not present.'''
+	try:
+		languageId = int(languageId)
+	except (TypeError, ValueError):
+		return None
+	language = reference_cache.get("languages")["byId"].get(languageId)
+	if language is None:
+		cursor = get_db().cursor()
+		cursor.execute("select language_name, language_code from languages where language_id=%s", (languageId,))
+		language = cursor.fetchone()
+		cursor.close()
+		if language:
+			reference_cache.invalidate("languages")
+	return language
+
 def getBibleBookIds():
 	'''
-	Returns a tuple of two dictionarys of the books of the Bible, bookcode has bible book codes
-	as the key and bookname has bible book names as the key.
+	Returns a dictionary of the books of the Bible with the book id as the key
+	and the bible book code as the value.
 	'''
-	bookIdDict = {}
-	connection  = get_db()
-	cursor = connection.cursor()
-	cursor.execute("SELECT book_id, book_name, book_code FROM bible_books_look_up Order by book_id")
-	rst = cursor.fetchall()
-	for book_id, book_name, book_code in rst:
-		bookIdDict[int(book_id)] = book_code
+	return {bookId: book[1] for bookId, book in reference_cache.get("books")["byId"].items()}
+
+def loadSource(sourceId):
+	cursor = get_db().cursor()
+	cursor.execute("select s.source_id, s.table_name, s.year, s.license, s.content_id, c.content_type, \
+		s.language_id, l.language_code, s.version_id, s.status, s.metadata, s.content_version, \
+			s.content_updated_at from sources s left join \
+			content_types c on s.content_id=c.content_id left join languages l on s.language_id=l.language_id \
+				where s.source_id=%s", (sourceId,))
+	rst = cursor.fetchone()
+	cursor.close()
+	if not rst:
+		return None
+	keys = ["sourceId", "tableName", "year", "license", "contentId", "contentType", "languageId",
+		"languageCode", "versionId", "status", "metadata", "contentVersion", "contentUpdatedAt"]
+	return dict(zip(keys, rst))
+
+source_cache = cache.KeyedCache(float(os.environ.get("AGMT_SOURCE_CACHE_TTL", "300")), loadSource)
+
+def getSource(sourceId):
+	'''
+	Returns the sources row of a source id as a dictionary, None if the source does not exist.
+	Rows are cached per worker; anything that updates a sources row must call invalidateSource().
+	'''
+	try:
+		sourceId = int(sourceId)
+	except (TypeError, ValueError):
+		return None
+	return source_cache.get(sourceId)
+
+def invalidateSource(sourceId=None):
+	'''Drop a cached sources row, or all of them when no source id is given.'''
+	source_cache.invalidate(None if sourceId is None else int(sourceId))
+
+def bumpContentVersion(cursor, sourceId):
+	'''Mark the content of a source as changed, so clients holding an old copy get it again.
+	Call in the transaction that changes the content and invalidateSource() after the commit.
+	Returns the new content version.'''
+	cursor.execute("update sources set content_version=content_version+1, content_updated_at=now() \
+		where source_id=%s returning content_version", (sourceId,))
+	rst = cursor.fetchone()
+	return rst[0] if rst else None
+
+def addToBookIndex(index, bookId, chapter, verse):
+	'''Counts a verse in a book index: {book id: [verses in chapter 1, verses in chapter 2, ...]}.'''
+	chapters = index.setdefault(bookId, [])
+	if chapter > len(chapters):
+		chapters.extend([0] * (chapter - len(chapters)))
+	if chapter > 0 and verse > chapters[chapter - 1]:
+		chapters[chapter - 1] = verse
+
+def loadBookIndex(key):
+	'''
+	Returns the book index of a bible, key being (source id, content version). The chapters of a
+	book are counted from its rows in the _chapters table, one per chapter of the uploaded JSON, as
+	uploadSource() counts them; the verses come from the ref_ids of the _cleaned table.
+	'''
+	source = getSource(key[0])
+	if not source or source["contentType"] != "bible":
+		return None
+	bibleTable = source["tableName"]
+	cursor = get_db().cursor()
+	cursor.execute(sql.SQL("select b.book_id, coalesce(max(c.chapter), 0) from {} b left join {} c on \
+		c.book_id=b.book_id group by b.book_id").format(sql.Identifier(bibleTable), \
+			sql.Identifier(bibleTable + "_chapters")))
+	index = {}
+	for bookId, chapterCount in cursor.fetchall():
+		addToBookIndex(index, bookId, chapterCount, 0)
+	cursor.execute(sql.SQL("select ref_id/1000000, mod(ref_id/1000, 1000), max(mod(ref_id, 1000)) from {} \
+		group by 1, 2").format(sql.Identifier(bibleTable + "_cleaned")))
+	for bookId, chapter, verse in cursor.fetchall():
+		addToBookIndex(index, bookId, chapter, verse)
+	cursor.close()
+	return index
+
+book_index = cache.KeyedCache(float(os.environ.get("AGMT_BOOK_INDEX_TTL", "86400")), loadBookIndex)
+
+def getBookIndex(source):
+	'''Returns {book id: [verses in chapter 1, ...]} of the books uploaded to a bible source.
+	Entries are per content version, as read by contentState(), so an upload makes every worker
+	read the new index.'''
+	return book_index.get((source["sourceId"], contentState(source)[0])) or {}
+
+def loadWordIndex(key):
+	'''Returns the word index of the verses of a bible, key being (source id, content version).'''
+	source = getSource(key[0])
+	if not source or source["contentType"] != "bible":
+		return None
+	cursor = get_db().cursor()
+	cursor.execute(sql.SQL("select ref_id, verse from {}").format(sql.Identifier(source["tableName"] + "_cleaned")))
+	index = wordindex.WordIndex.build(cursor.fetchall())
 	cursor.close()
-	return bookIdDict
+	return index
+
+word_index = cache.KeyedCache(float(os.environ.get("AGMT_WORD_INDEX_TTL", "86400")), loadWordIndex)
+
+book_order = cache.KeyedCache(float(os.environ.get("AGMT_BOOK_INDEX_TTL", "86400")), \
+	lambda key: sorted(book_index.get(key) or {}) or None)
+
+def getNeighbourBooks(source, bookId):
+	'''Returns the ids of the uploaded books before and after a book, None at either end.'''
+	books = book_order.get((source["sourceId"], contentState(source)[0])) or []
+	position = bisect.bisect_left(books, bookId)
+	previousBook = books[position - 1] if position > 0 else None
+	if position < len(books) and books[position] == bookId:
+		position += 1
+	nextBook = books[position] if position < len(books) else None
+	return previousBook, nextBook
+
+def contentState(source):
+	'''
+	Returns (content version, content updated at) of a source, read from the database once per
+	request. The cached sources row can be older than an upload done through another worker.
+	'''
+	states = g.setdefault("content_states", {})
+	if source["sourceId"] not in states:
+		cursor = get_db().cursor()
+		cursor.execute("select content_version, content_updated_at from sources where source_id=%s", \
+			(source["sourceId"],))
+		rst = cursor.fetchone()
+		cursor.close()
+		states[source["sourceId"]] = rst or (source["contentVersion"], source["contentUpdatedAt"])
+	return states[source["sourceId"]]
+
+def sourceValidators(source, *extra):
+	'''Returns the (etag, last modified) pair of a response built from the content of a source.'''
+	contentVersion, contentUpdatedAt = contentState(source)
+	parts = [source["sourceId"], contentVersion] + list(extra)
+	return "-".join(str(part) for part in parts), contentUpdatedAt
+
+def isNotModified(validators):
+	'''True when If-None-Match or If-Modified-Since of the request show the client copy is current.'''
+	etag, lastModified = validators
+	if request.if_none_match:
+		return request.if_none_match.contains_weak(etag)
+	if request.if_modified_since and lastModified:
+		lastModified = lastModified.astimezone(datetime.timezone.utc).replace(tzinfo=None, microsecond=0)
+		return lastModified <= request.if_modified_since.replace(tzinfo=None)
+	return False
+
+def withValidators(body, validators, status=200):
+	'''Wraps a response body with the ETag and Last-Modified headers. no-cache makes clients
+	revalidate every time instead of guessing a lifetime from Last-Modified.'''
+	etag, lastModified = validators
+	resp = make_response(body, status)
+	resp.set_etag(etag, weak=True)
+	if lastModified:
+		resp.last_modified = lastModified
+	resp.headers["Cache-Control"] = "no-cache"
+	return resp
+
+def notModifiedResponse(validators):
+	return withValidators("", validators, 304)
+
+compressed_cache = compression.CompressedCache( \
+	float(os.environ.get("AGMT_COMPRESSED_CACHE_MB", "64")) * 1024 * 1024, \
+		brotli_quality=os.environ.get("AGMT_BROTLI_QUALITY", "9"))
+
+def contentKey(source):
+	'''Key of the stored copies of a content response: the same path and content version give the same body.'''
+	return (source["sourceId"], contentState(source)[0], request.path)
+
+def compressedResponse(artifact, validators):
+	'''Response with the stored copy of a body in the best encoding the client accepts.'''
+	encoding = compression.choose_encoding(request.accept_encodings, artifact)
+	resp = withValidators(artifact[encoding], validators)
+	if encoding != "identity":
+		resp.headers["Content-Encoding"] = encoding
+	resp.vary.add("Accept-Encoding")
+	return resp
+
+class RawJson(object):
+	'''JSON text read from the database (a jsonb column selected as ::text). dumpsRaw() puts it
+	into a response as it is, instead of decoding it to Python objects and encoding it again.'''
+
+	def __init__(self, text):
+		self.text = text
+
+def dumpsRaw(obj):
+	'''json.dumps() for a response envelope that holds RawJson values.'''
+	marker = uuid.uuid4().hex
+	raws = []
+	def placeholder(value):
+		if not isinstance(value, RawJson):
+			raise TypeError("%r is not JSON serializable" % value)
+		raws.append(value.text)
+		return "%s:%s" % (marker, len(raws) - 1)
+	envelope = json.dumps(obj, default=placeholder)
+	if not raws:
+		return envelope
+	return re.sub('"%s:(\\d+)"' % marker, \
+		lambda match: "null" if raws[int(match.group(1))] is None else raws[int(match.group(1))], envelope)
+
+def streamJsonObject(cursor, firstRow, prefix, suffix, formatRow):
+	'''
+	Generates a response body from the rows of a named (server side) cursor, fetching one row at a
+	time so only one book is held in memory. formatRow(row) returns the `"key": value` text of a row,
+	the rows are joined into one JSON object written between prefix and suffix.
+	The status has been sent with the first chunk, so anything that can fail should be done before
+	the stream starts; an error while streaming is logged and ends the response unfinished.
+	'''
+	try:
+		yield prefix
+		row = firstRow
+		separator = ""
+		while row is not None:
+			yield separator + formatRow(row)
+			separator = ", "
+			row = cursor.fetchone()
+		yield suffix
+	except Exception as ex:
+		log.error("Exception while streaming %s: %s", request.path, ex)
+		log.error(traceback.format_exc())
+		raise
+	finally:
+		cursor.close()
+
+def streamResponse(body):
+	'''A chunked response for a body generator; the request context (and so its database
+	connection) is kept until the body has been sent.'''
+	return app.response_class(flask.stream_with_context(body))
+
+documentation_url = "http://docs.vachanengine.org/"
+url_resolver = httpclient.UrlResolver([documentation_url], \
+	refresh_interval=os.environ.get("AGMT_URL_REFRESH_INTERVAL", "3600"))
+url_resolver.start()
 
 # pass the URL with http, if URL will have SSL then will return the same otherwise wihtout SSL URL will return
 def return_url(url):
-	r = requests.get(url)
-	required_url = r.url
-	return required_url
+	'''Returns the address the url redirects to, as last resolved in the background.'''
+	return url_resolver.resolve(url)
 
 @app.route('/', methods=['GET'])
 def index():
@@ -166,23 +529,15 @@ def new_registration():
 	lastName = request.form['lastName']
 	email = request.form['email']
 	password = request.form['password']
-	headers = {"api-key": sendinblue_key}
-	url = "https://api.sendinblue.com/v2.0/email"
 	verification_code = str(uuid.uuid4()).replace("-", "")
-	documentation_url = return_url('http://docs.vachanengine.org/')
+	docs_url = return_url(documentation_url)
 	body = '''Hello %s,<br/><br/>Thanks for your interest to use the AutographaMT web service. <br/>
 	You need to confirm your email by opening this link:
 
 	https://%s/v1/verifications/%s
 
 	<br/><br/>The documentation for accessing the API is available at %s''' % \
-			(firstName, host_api_url, verification_code, documentation_url)
-	payload = {
-		"to": {email: ""},
-		"from": ["noreply@autographamt.in", "Autographa MT"],
-		"subject": "AutographaMT - Please verify your email address",
-		"html": body,
-		}
+			(firstName, host_api_url, verification_code, docs_url)
 	connection = get_db()
 	password_salt = str(uuid.uuid4()).replace("-", "")
 	password_hash = scrypt.hash(password, password_salt)
@@ -196,7 +551,7 @@ def new_registration():
 					(firstName, lastName, email, verification_code, password_hash, password_salt))
 		cursor.close()
 		connection.commit()
-		resp = requests.post(url, data=json.dumps(payload), headers=headers)
+		mail_queue.send(email, "AutographaMT - Please verify your email address", body)
 		return '{"success":true, "message":"Verification Email has been sent to your email id"}'
 	else:
 		if rst[1] == False:
@@ -217,28 +572,21 @@ def reset_password():
 		active = rst[1]
 		if not active:
 			return '{"success":false, "message":"User account is deactivated."}'
-		headers = {"api-key": sendinblue_key}
-		url = "https://api.sendinblue.com/v2.0/email"
 		# totp = pyotp.TOTP('base32secret3232')       # python otp module
 		# verification_code = totp.now()
 		verification_code = randint(100001,999999)
-		documentation_url = return_url('http://docs.vachanengine.org/')
+		docs_url = return_url(documentation_url)
 		body = '''Hi,<br/><br/>Your request for resetting the password has been recieved. <br/>
 		Your temporary password is %s. Use this to create a new password at %s .
 
 		<br/><br/>The documentation for accessing the API is available at %s''' % \
-				(verification_code, host_ui_url, documentation_url)
-		payload = {
-			"to": {email: ""},
-			"from": ["noreply@autographamt.in", "AutographaMT"],
-			"subject": "AutographaMT - Password reset verification mail",
-			"html": body,
-			}
+				(verification_code, host_ui_url, docs_url)
 		cursor.execute("UPDATE autographamt_users SET verification_code= %s WHERE email_id = %s", \
 			(verification_code, email))
 		cursor.close()
 		connection.commit()
-		resp = requests.post(url, data=json.dumps(payload), headers=headers)
+		mail_queue.send(email, "AutographaMT - Password reset verification mail", body, \
+			sender=["noreply@autographamt.in", "AutographaMT"])
 		return '{"success":true, "message":"Link to reset password has been sent to the registered mail ID"}\n'
 
 @app.route("/v1/forgotpassword", methods=["POST"])    #--------------To set the new password-------------------#
@@ -406,20 +754,11 @@ def createOrganisations():
 				cursor.execute("SELECT email_id from autographamt_users where role_id=3")
 				all_super_admins = cursor.fetchall()
 				cursor.close()
-				headers = {"api-key": sendinblue_key}
-				url = "https://api.sendinblue.com/v2.0/email"
 				body = '''Hello Super Admin,<br/><br/>
 				A new organization request has come for, %s. Please check and approve.<br/><br/>
 				AutographaMT'''%(organisationName)
 				for row in all_super_admins:
-					email = row[0]
-					payload = {
-						"to": {email: ""},
-						"from": ["noreply@autographamt.in", "Autographa MT"],
-						"subject": "AutographaMT - New Organisation Request",
-						"html": body,
-						}
-					resp = requests.post(url, data=json.dumps(payload), headers=headers)
+					mail_queue.send(row[0], "AutographaMT - New Organisation Request", body)
 			except Exception as e:
 				print(e)
 				return '{"success":false, "message":"'+str(e)+'"}'
@@ -481,17 +820,14 @@ def getProjects():
 			email = request.email
 			cursor.execute("select user_id from autographamt_users where email_id=%s", (email,))
 			userId = cursor.fetchone()[0]
-			cursor.execute("select organisation_id from autographamt_organisations where user_id=%s", (userId,))
-			organisationIds = [org[0] for org in cursor.fetchall()]
-			rst = []
-			for orgId in organisationIds:
-				cursor.execute("select p.project_id, p.project_name, p.source_id, p.target_id,  \
-					p.organisation_id, o.organisation_name, v.version_code, v.version_description, p.status \
-						from autographamt_projects p left join autographamt_organisations o on \
-						p.organisation_id=o.organisation_id left join sources s on \
-							s.source_id=p.source_id \
-							left join versions v on s.version_id = v.version_id where p.organisation_id=%s", (orgId,))
-				rst += cursor.fetchall()
+			cursor.execute("select p.project_id, p.project_name, p.source_id, p.target_id,  \
+				p.organisation_id, o.organisation_name, v.version_code, v.version_description, p.status \
+					from autographamt_projects p left join autographamt_organisations o on \
+					p.organisation_id=o.organisation_id left join sources s on \
+						s.source_id=p.source_id \
+						left join versions v on s.version_id = v.version_id where o.user_id=%s \
+							order by p.organisation_id", (userId,))
+			rst = cursor.fetchall()
 		elif role == 3:
 			cursor.execute("select p.project_id, p.project_name, p.source_id, p.target_id, \
 				p.organisation_id, o.organisation_name, v.version_code, v.version_description, p.status \
@@ -538,8 +874,7 @@ def createProjects():
 			cursor.execute("select l.language_name, l.language_code from sources s left join languages l on \
 				s.language_id=l.language_id where source_id=%s", (sourceId,))
 			sourceLanguage, sourceLanguageCode = cursor.fetchone()
-			cursor.execute("select language_name, language_code from languages where language_id=%s", (targetLanguageId,))
-			targetLanguage, targetLanguageCode = cursor.fetchone()
+			targetLanguage, targetLanguageCode = getLanguageById(targetLanguageId)
 			projectName = sourceLanguage + '-to-' + targetLanguage + '|' + sourceLanguageCode + '-to-' + targetLanguageCode
 			cursor.execute("select status from autographamt_projects where organisation_id=%s and source_id=%s and \
 				target_id=%s", (organisationId, sourceId, targetLanguageId))
@@ -636,18 +971,10 @@ def createAssignments():
 		cursor.execute("SELECT project_name from autographamt_projects where project_id=%s",(projectId,))
 		project = cursor.fetchone()[0]
 		cursor.close()
-		headers = {"api-key": sendinblue_key}
-		url = "https://api.sendinblue.com/v2.0/email"
 		body = '''Hello %s,<br/><br/>
 		Books %s has been assigned to you in project %s.<br/><br/>
 		AutographaMT'''%(name, books.replace('|', ", "), project)
-		payload = {
-			"to": {email: ""},
-			"from": ["noreply@autographamt.in", "Autographa MT"],
-			"subject": "AutographaMT - New work assignment",
-			"html": body,
-			}
-		resp = requests.post(url, data=json.dumps(payload), headers=headers)
+		mail_queue.send(email, "AutographaMT - New work assignment", body)
 	except Exception as e:
 		print(e)
 		return '{"success":false, "message":'+str(e)+'}'
@@ -736,13 +1063,10 @@ def updateProjectTokenTranslations():
 			return '{"success":false, "message":"UnAuthorized/ You haven\'t been assigned this project"}'
 		cursor.execute("select source_id, target_id from autographamt_projects where project_id=%s", (projectId,))
 		sourceId, targetLanguageId = cursor.fetchone()
-		cursor.execute("select language_code from languages where language_id=%s", (targetLanguageId,))
-		targetLanguageCode = cursor.fetchone()
+		targetLanguageCode = getLanguageById(targetLanguageId)
 		if not targetLanguageCode:
 			return '{"success":false, "message":"Target Language does not exist"}'
-		cursor.execute("select * from sources where source_id=%s", (sourceId,))
-		rst = cursor.fetchone()
-		if not rst:
+		if not getSource(sourceId):
 			return '{"success":false, "message":"Source does not exist"}'
 		cursor.execute("select t.token, t.translation, t.senses from translations t left join \
 			translation_projects_look_up p on t.translation_id=p.translation_id where p.project_id=%s and \
@@ -810,13 +1134,10 @@ def bulkUpdateProjectTokenTranslations():
 			return '{"success":false, "message":"UnAuthorized/ You haven\'t been assigned this project"}'
 		cursor.execute("select source_id, target_id from autographamt_projects where project_id=%s", (projectId,))
 		sourceId, targetLanguageId = cursor.fetchone()
-		cursor.execute("select language_code from languages where language_id=%s", (targetLanguageId,))
-		targetLanguageCode = cursor.fetchone()
+		targetLanguageCode = getLanguageById(targetLanguageId)
 		if not targetLanguageCode:
 			return '{"success":false, "message":"Target Language does not exist"}'
-		cursor.execute("select * from sources where source_id=%s", (sourceId,))
-		rst = cursor.fetchone()
-		if not rst:
+		if not getSource(sourceId):
 			return '{"success":false, "message":"Source does not exist"}'
 		if not (tokenTranslations):
 			return '{"success":false, "message":"There is no data in excel"}'
@@ -824,6 +1145,15 @@ def bulkUpdateProjectTokenTranslations():
 		empty_translation = 0
 		empty_senses = 0
 		empty_tokenName = 0
+		# Work out the resulting rows first and write them with a fixed number of statements,
+		# instead of 3-4 statements for every token of the sheet.
+		tokens = [item['token'] for item in tokenTranslations if "token" in item and "translation" in item]
+		cursor.execute("select t.token, t.senses from translations t left join \
+			translation_projects_look_up p on t.translation_id=p.translation_id where p.project_id=%s and \
+			t.token = ANY(%s)",(projectId, tokens))
+		current = {token: {"senses": senses, "new": False} for token, senses in cursor.fetchall()}
+		touched = []
+		history = []
 		for item in tokenTranslations:
 			if (("token" not in item) and ("translation" not in item) and ("senses" not in item)):  #if all fields are empty
 				pass
@@ -838,76 +1168,56 @@ def bulkUpdateProjectTokenTranslations():
 				token = item['token']
 				translation = item['translation']
 				senses = item['senses']
-				logging.warning('senses \'%s\'' % senses)
 				splitSense = senses.split(',')
-				logging.warning('splitSense \'%s\'' % splitSense)
 				if "" in splitSense:
 					splitSense.remove("")
-				cursor.execute("select t.token, t.translation, t.senses from translations t left join \
-					translation_projects_look_up p on t.translation_id=p.translation_id where p.project_id=%s and \
-					token=%s",(projectId, token))
-				rst = cursor.fetchone()
-				if not rst:
+				row = current.get(token)
+				if not row:
 					senses = '|'.join(splitSense)
-					cursor.execute("insert into translations (token, translation, source_id, target_id, \
-						user_id, senses) values (%s, %s, %s, %s, %s, %s) returning translation_id", (token, translation, sourceId, targetLanguageId, \
-							userId, senses))
-					translationId = cursor.fetchone()[0]
-					cursor.execute("insert into translation_projects_look_up (translation_id, project_id) values \
-						(%s, %s)", (translationId, projectId))
-					cursor.execute("insert into translations_history (token, translation, source_id, target_id, \
-						user_id, senses) values (%s, %s, %s, %s, %s, %s)", (token, translation, sourceId, targetLanguageId, \
-							userId, senses))
+					row = current[token] = {"senses": senses, "new": True}
 				else:
 					dbSenses = []
-					if rst[2] != None:
-							logging.warning('rst[2] \'%s\'' % rst[2])
-							dbSenses = rst[2].split("|")
-							logging.warning('dbSenses \'%s\'' % dbSenses)
+					if row["senses"] != None:
+						dbSenses = row["senses"].split("|")
 					for sense in splitSense:
 						if sense not in dbSenses:
 							dbSenses.append(sense)
 					senses = "|".join(dbSenses)
-					cursor.execute("update translations set translation=%s, user_id=%s, senses=%s where source_id=%s and \
-							target_id=%s and token=%s",(translation, userId, senses, sourceId, targetLanguageId, token))
-					cursor.execute("insert into translations_history (token, translation, source_id, target_id, \
-							user_id, senses) values (%s, %s, %s, %s, %s, %s)", (token, translation, sourceId, targetLanguageId, \
-								userId, senses))
-			
+					row["senses"] = senses
+				row["translation"] = translation
+				touched.append(token)
+				history.append((token, translation, sourceId, targetLanguageId, userId, senses))
 			elif(("token" in item) and ("translation" in item) and ("senses" not in item)): # if only senses are not available
 				empty_senses += 1
 				token = item['token']
 				translation = item['translation']
-				cursor.execute("select t.token, t.translation from translations t left join \
-					translation_projects_look_up p on t.translation_id=p.translation_id where p.project_id=%s and \
-					token=%s",(projectId, token))
-				rst = cursor.fetchone()
-				if not rst:
-					# senses = '|'.join(splitSense)
-					cursor.execute("insert into translations (token, translation, source_id, target_id, \
-						user_id) values (%s, %s, %s, %s, %s) returning translation_id", (token, translation, sourceId, targetLanguageId, \
-							userId))
-					translationId = cursor.fetchone()[0]
-					cursor.execute("insert into translation_projects_look_up (translation_id, project_id) values \
-						(%s, %s)", (translationId, projectId))
-					cursor.execute("insert into translations_history (token, translation, source_id, target_id, \
-						user_id) values (%s, %s, %s, %s, %s)", (token, translation, sourceId, targetLanguageId, \
-							userId))
-				else:
-					# dbSenses = []
-					# if rst[2] != "":
-					# 		dbSenses = rst[2].split("|")
-					# for sense in splitSense:
-					# 	if sense not in dbSenses:
-					# 		dbSenses.append(sense)
-					# senses = "|".join(dbSenses)
-					cursor.execute("update translations set translation=%s, user_id=%s where source_id=%s and \
-							target_id=%s and token=%s",(translation, userId, sourceId, targetLanguageId, token))
-					cursor.execute("insert into translations_history (token, translation, source_id, target_id, \
-							user_id) values (%s, %s, %s, %s, %s)", (token, translation, sourceId, targetLanguageId, \
-								userId))
+				row = current.get(token)
+				if not row:
+					row = current[token] = {"senses": None, "new": True}
+				row["translation"] = translation
+				touched.append(token)
+				history.append((token, translation, sourceId, targetLanguageId, userId, None))
 			else:
 				pass
+		seen = set()
+		touched = [token for token in touched if not (token in seen or seen.add(token))]
+		newRows = [(token, current[token]["translation"], sourceId, targetLanguageId, userId, current[token]["senses"]) \
+			for token in touched if current[token]["new"]]
+		changedRows = [(token, current[token]["translation"], current[token]["senses"]) \
+			for token in touched if not current[token]["new"]]
+		if newRows:
+			translationIds = execute_values(cursor, "insert into translations (token, translation, source_id, target_id, \
+				user_id, senses) values %s returning translation_id", newRows, fetch=True)
+			execute_values(cursor, "insert into translation_projects_look_up (translation_id, project_id) values %s", \
+				[(translationId[0], projectId) for translationId in translationIds])
+		if changedRows:
+			execute_values(cursor, sql.SQL("update translations t set translation=v.translation, user_id={}, \
+				senses=v.senses from (values %s) as v(token, translation, senses) where t.source_id={} and \
+					t.target_id={} and t.token=v.token").format(sql.Literal(userId), sql.Literal(sourceId), \
+						sql.Literal(targetLanguageId)), changedRows)
+		if history:
+			execute_values(cursor, "insert into translations_history (token, translation, source_id, target_id, \
+				user_id, senses) values %s", history)
 		connection.commit()
 		cursor.close()
 		return '{"success":true, "message":"Translations have been added.\\nEmpty token(s)  '+str(empty_tokenName)+' \\nEmpty translation(s)  '+str(empty_translation)+'\\nEmpty sense(s)  '+str(empty_senses)+'"}'
@@ -986,8 +1296,6 @@ def organisationApprovals():
 				cursor.execute("SELECT organisation_name from autographamt_organisations where organisation_id=%s",(organisationId,))
 				org_name = cursor.fetchone()[0]
 				cursor.close()
-				headers = {"api-key": sendinblue_key}
-				url = "https://api.sendinblue.com/v2.0/email"
 				if verified:
 					body = '''Hello %s,<br/><br/>
 					Your request to create organization,%s, has been approved.<br/><br/>
@@ -996,13 +1304,7 @@ def organisationApprovals():
 					body = '''Hello %s,<br/><br/>
 					Your request to create organization,%s, has not been approved.<br/><br/>
 					AutographaMT'''%(name, org_name)
-				payload = {
-					"to": {email: ""},
-					"from": ["noreply@autographamt.in", "Autographa MT"],
-					"subject": "AutographaMT - New Organisation",
-					"html": body,
-					}
-				resp = requests.post(url, data=json.dumps(payload), headers=headers)
+				mail_queue.send(email, "AutographaMT - New Organisation", body)
 			except Exception as e:
 				print(e)
 				return '{"success":false, "message":'+str(e)+'}'
@@ -1026,8 +1328,7 @@ def getProjectStatistics(projectId):
 			return '{"sucess":false, "message":"Invalid project id"}'
 		tableName = rst[0] + "_tokens"
 		bookDict = {}
-		cursor.execute("select book_id, book_name, book_code from bible_books_look_up")
-		for b_id, b_name, b_code in cursor.fetchall():
+		for b_id, b_name, b_code in reference_cache.get("books")["rows"]:
 			bookDict[b_id] = {
 				"name": b_name,
 				"code": b_code
@@ -1108,13 +1409,12 @@ def available_books(sourceId):
 	try:
 		connection = get_db()
 		cursor = connection.cursor()
-		cursor.execute("select table_name,content_type from sources as s left join content_types c on s.content_id=c.content_id where source_id=%s", (sourceId,))
-		rst = cursor.fetchone()
-		if not rst:
+		source = getSource(sourceId)
+		if not source:
 			return '{"success":false, "message":"No data available"}'
-		tablename = rst[0]
-		if rst[1] != 'bible':
-			return json.dumps({'success':False,'message':"Source is "+rst[1]+" not Bible"})
+		tablename = source["tableName"]
+		if source["contentType"] != 'bible':
+			return json.dumps({'success':False,'message':"Source is "+source["contentType"]+" not Bible"})
 		cursor.execute(sql.SQL("select l.book_code from {} as u left join bible_books_look_up as l \
 			on u.book_id=l.book_id").format(sql.Identifier(tablename)))
 		rst = cursor.fetchall()
@@ -1175,11 +1475,8 @@ def getTokenLists(sourceId, book):
 	print("comes to getTokenLists")
 	connection = get_db()
 	cursor = connection.cursor()
-	cursor.execute("select table_name from sources where source_id=%s", (sourceId,))
-	rst = cursor.fetchone()
-	cursor.execute("select book_id from bible_books_look_up where book_code=%s", (book.lower(),))
-	bookId = cursor.fetchone()[0]
-	tablename = rst[0] + '_tokens'
+	bookId = getBookByCode(book)[0]
+	tablename = getSource(sourceId)["tableName"] + '_tokens'
 	tablename_parts = tablename.split('_')
 	languageCode = tablename_parts[0]
 	version = '_'.join(tablename_parts[1:-2])
@@ -1242,8 +1539,7 @@ def getTokenTranslationList(projectId, book):
 		source_table = cursor.fetchone()[0]
 		tablename = source_table + '_tokens'
 
-		cursor.execute("select book_id from bible_books_look_up where book_code=%s", (book,))
-		bookId_rst = cursor.fetchone()
+		bookId_rst = getBookByCode(book)
 		if not bookId_rst:
 			return '{"success":false, "message":"Invalid book code. The 3 letter code expected."}'
 		bookId = bookId_rst[0]
@@ -1299,27 +1595,140 @@ def getConcordanceList(db_data):
 
 @app.route("/v1/concordances/<sourceId>/<book>/<token>", methods=["GET"])
 def generateConcordances(sourceId, book, token):
+	'''
+	List the verses having the token: all of them in the given book, and a page of the verses in the
+	other books (?limit, default 100, and ?cursor of the next page). The book list, the total of the
+	other books and the per book counts (?facets=book) come with the first page. For tokens of
+	several words the total and the counts are of the verses having all the words, anywhere in the
+	verse, and are marked as not exact.
+	Tokens of whole words are looked up in the word index of the bible, others (or all of them with
+	?match=substring) are matched as a substring of the verses.
+	'''
 	connection = get_db()
 	cursor = connection.cursor()
 	book = book.lower()
-	cursor.execute("select table_name from sources where source_id=%s", (sourceId,))
-	tablename = cursor.fetchone()[0]+"_cleaned"
-	# try:
-	cursor.execute("select bb.book_code, bb.book_name, l.chapter, l.verse, b.verse from " + tablename + " b \
-	left join bcv_map l on b.ref_id=l.ref_id left join bible_books_look_up bb on l.book=bb.book_id \
-		where b.verse like '%" + token + "%' and bb.book_code='" + book +"' order by l.ref_id")
-	book_concordance = getConcordanceList(cursor.fetchall())
-	cursor.execute("select bb.book_code, bb.book_name, l.chapter, l.verse, b.verse from " + tablename + " b \
-	left join bcv_map l on b.ref_id=l.ref_id left join bible_books_look_up bb on l.book=bb.book_id \
-		where b.verse like '%" + token + "%' and bb.book_code!='" + book +"' order by l.ref_id \
-			limit 100")
-	all_books_concordance = getConcordanceList(cursor.fetchall())
-	return json.dumps({
-		book:book_concordance,
-		"all":all_books_concordance
-	})
-	# except Exception as ex:
-	#     return '{"success": false, "messsage":"%s"}' %(ex)
+	source = getSource(sourceId)
+	if not source:
+		return '{"success":false, "message":"Invalid source Id"}'
+	try:
+		limit, after = pageArguments(100)
+	except ValueError:
+		return '{"success":false, "message":"Invalid limit or cursor"}'
+	tablename = source["tableName"]+"_cleaned"
+	bookData = getBookByCode(book)
+	startId = bookData[0] * 1000000 if bookData else 0
+	endId = startId + 1000000 if bookData else 0
+	page = {}
+	tokenWords = wordindex.words(token)
+	if request.args.get("match") != "substring" and source["contentType"] == "bible" and \
+		" ".join(tokenWords) == unicodedata.normalize("NFC", token.strip()):
+		refIds = word_index.get((source["sourceId"], contentState(source)[0])).lookup(tokenWords)
+		start = bisect.bisect_left(refIds, startId)
+		end = bisect.bisect_left(refIds, endId)
+		bookRefIds = refIds[start:end] if after is None else []
+		otherRefIds = refIds[:start] + refIds[end:]
+		if after is None:
+			# tokens of several words are counted before their verses are checked
+			page["total"] = len(otherRefIds)
+			page["totalExact"] = len(tokenWords) == 1
+			if request.args.get("facets") == "book":
+				page["facets"] = bookFacets([(bookId, len(list(verses))) for bookId, verses in \
+					itertools.groupby(refIds, lambda refId: refId // 1000000)])
+				page["facetsExact"] = len(tokenWords) == 1
+		otherRefIds = otherRefIds[bisect.bisect_right(otherRefIds, after or 0):]
+		# a single word needs no check, so a page of verses is enough
+		checked = otherRefIds[:limit if len(tokenWords) == 1 else 4 * limit]
+		cursor.execute(sql.SQL("select ref_id, verse from {} where ref_id = any(%s) order by ref_id").format(\
+			sql.Identifier(tablename)), (bookRefIds + checked,))
+		rows = [row for row in cursor.fetchall() if len(tokenWords) == 1 or \
+			wordindex.contains_words(row[1], tokenWords)]
+		bookRows = [row for row in rows if startId <= row[0] < endId]
+		otherRows = [row for row in rows if not startId <= row[0] < endId]
+		nextCursor = None
+		if len(otherRows) > limit:
+			otherRows = otherRows[:limit]
+			nextCursor = otherRows[-1][0]
+		elif len(checked) < len(otherRefIds):
+			nextCursor = checked[-1]
+	else:
+		# substring match, answered from the trigram index of the verses
+		pattern = "%" + token.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+		table = sql.Identifier(tablename)
+		bookRows = []
+		if after is None:
+			cursor.execute(sql.SQL("select ref_id, verse from {} where verse like %s and ref_id >= %s \
+				and ref_id < %s order by ref_id").format(table), (pattern, startId, endId))
+			bookRows = cursor.fetchall()
+		others = sql.SQL("from {} where verse like %s and (ref_id < %s or ref_id >= %s)").format(table)
+		cursor.execute(sql.SQL("select ref_id, verse {} and ref_id > %s order by ref_id limit %s").format(others), \
+			(pattern, startId, endId, after or 0, limit + 1))
+		otherRows = cursor.fetchall()
+		nextCursor = None
+		if len(otherRows) > limit:
+			otherRows = otherRows[:limit]
+			nextCursor = otherRows[-1][0]
+		if after is None:
+			if request.args.get("facets") == "book":
+				counts = countByBook(cursor, sql.SQL("from {} where verse like %s").format(table), (pattern,))
+				page["facets"] = bookFacets(counts)
+				page["facetsExact"] = True
+				page["total"] = sum(count for bookId, count in counts if bookId != startId // 1000000)
+				page["totalExact"] = True
+			elif nextCursor is None:
+				page["total"], page["totalExact"] = len(otherRows), True
+			else:
+				page["total"], page["totalExact"] = countMatches(cursor, others, (pattern, startId, endId))
+	cursor.close()
+	concordance = {
+		book:getConcordanceList(concordanceRows(bookRows)),
+		"all":getConcordanceList(concordanceRows(otherRows)),
+		"nextCursor": None if nextCursor is None else str(nextCursor)
+	}
+	concordance.update(page)
+	return json.dumps(concordance)
+
+def concordanceRows(rows):
+	'''(book code, book name, chapter, verse, text) of (ref_id, text) rows.'''
+	result = []
+	for refId, text in rows:
+		bookName, bookCode = getBookById(refId // 1000000)
+		result.append((bookCode, bookName, refId // 1000 % 1000, refId % 1000, text))
+	return result
+
+search_count_limit = int(os.environ.get("AGMT_SEARCH_COUNT_LIMIT", "10000"))
+
+def pageArguments(defaultLimit=None):
+	'''
+	Returns (limit, cursor) of the ?limit and ?cursor arguments of a paged list of verses. The cursor
+	is the ref_id of the last verse of the previous page, None on the first page. Pages are at most
+	verse_range_limit verses. Raises ValueError for arguments that are not valid.
+	'''
+	limit = request.args.get("limit")
+	after = request.args.get("cursor")
+	limit = int(limit) if limit else defaultLimit
+	after = int(after) if after else None
+	if (limit is not None and not 0 < limit <= verse_range_limit) or (after is not None and after < 0):
+		raise ValueError("limit %s, cursor %s" % (limit, after))
+	return limit, after
+
+def countMatches(cursor, fromWhere, args):
+	'''
+	Returns (count, exact) for the rows of a "from ... where ..." clause. Counting stops after
+	search_count_limit rows, so the count of a very common word is a lower bound.
+	'''
+	cursor.execute(sql.SQL("select count(*) from (select 1 {} limit %s) matches").format(fromWhere), \
+		tuple(args) + (search_count_limit + 1,))
+	count = cursor.fetchone()[0]
+	return min(count, search_count_limit), count <= search_count_limit
+
+def countByBook(cursor, fromWhere, args):
+	'''[(book id, count)] of the verses of a "from ... where ..." clause.'''
+	cursor.execute(sql.SQL("select ref_id/1000000, count(*) {} group by 1 order by 1").format(fromWhere), args)
+	return cursor.fetchall()
+
+def bookFacets(counts):
+	'''{book code: count} of (book id, count) pairs, in the order of the books.'''
+	return dict((getBookById(bookId)[1], count) for bookId, count in counts)
 
 
 @app.route("/v1/contenttypes", methods=["GET"])
@@ -1356,10 +1765,7 @@ def getLanguages(contentId):
 
 @app.route("/v1/languages", methods=["GET"])
 def getAllLanguages():
-	connection = get_db()
-	cursor = connection.cursor()
-	cursor.execute("select language_id, language_name, language_code from languages order by language_name")
-	rst = cursor.fetchall()
+	rst = reference_cache.get("languages")["rows"]
 	allLanguagesData = [
 		{
 			"languageName": languagename,
@@ -1367,22 +1773,17 @@ def getAllLanguages():
 			"languageCode": languagecode
 		} for languageid, languagename, languagecode in rst
 	]
-	cursor.close()
 	return json.dumps(allLanguagesData)
 
 @app.route("/v1/contentdetails", methods=["GET"])
 def getContentDetails():
-	connection = get_db()
-	cursor = connection.cursor()
-	cursor.execute("select content_id, content_type from content_types")
-	rst = cursor.fetchall()
+	rst = reference_cache.get("content_types")["rows"]
 	allContentTypeData = [
 		{
 			"contentId":contentId,
 			"contentType":contentType
-		} for contentId, contentType in rst
+		} for contentId, contentType, key in rst
 	]
-	cursor.close()
 	return json.dumps(allContentTypeData)
 
 
@@ -1395,13 +1796,10 @@ def parsePunctuationsForDraft(text):
 	return content
 
 def parseDataForDBInsert(usfmData):
-	connection = get_db()
 	normalVersePattern = re.compile(r'\d+$')
 	splitVersePattern = re.compile(r'(\d+)(\w)$')
 	mergedVersePattern = re.compile(r'(\d+)-(\d+)$')
-	cursor = connection.cursor()
-	cursor.execute("select book_id, book_code from bible_books_look_up")
-	bookIdDict = {v.lower():k for k,v in cursor.fetchall()}
+	bookIdDict = {bookCode: book[0] for bookCode, book in reference_cache.get("books")["byCode"].items()}
 	bookName = usfmData["book"]["bookCode"].lower()
 	chapterData = usfmData["chapters"]
 	dbInsertData = []
@@ -1492,8 +1890,8 @@ def createBibleSource():
 		bibleTableName = "%s_%s_%s_bible" %(language.lower(), versionContentCode.lower(), str(revision).replace('.', '_'))
 		cleanTableName = "%s_%s_%s_bible_cleaned" %(language.lower(), versionContentCode.lower(), str(revision).replace('.', '_'))
 		tokenTableName = "%s_%s_%s_bible_tokens" %(language.lower(), versionContentCode.lower(), str(revision).replace('.', '_'))
-		cursor.execute("select language_id from languages where language_code=%s", (language,))
-		languageId = cursor.fetchone()[0]
+		chapterTableName = "%s_%s_%s_bible_chapters" %(language.lower(), versionContentCode.lower(), str(revision).replace('.', '_'))
+		languageId = getLanguageByCode(language)[0]
 		cursor.execute("select s.source_id from sources s left join languages l on \
 			s.language_id=l.language_id left join content_types c on s.content_id=c.content_id \
 				left join versions v on v.version_id=s.version_id \
@@ -1507,15 +1905,21 @@ def createBibleSource():
 			create_usfm_bible_table_command = createTableCommand(['book_id INT NOT NULL', 'usfm_text TEXT', \
 				'json_text JSONB'], bibleTableName)
 			create_clean_bible_table_command = createTableCommand(['ref_id INT NOT NULL', 'verse TEXT', \
-				'cross_reference TEXT', 'foot_notes TEXT'], cleanTableName)
+				'cross_reference TEXT', 'foot_notes TEXT', 'search_vector TSVECTOR'], cleanTableName)
 			create_token_bible_table_command = createTableCommand(['token_id BIGSERIAL PRIMARY KEY', \
 				'book_id INT NOT NUll', 'token TEXT NOT NULL'], tokenTableName)
+			create_chapter_bible_table_command = createTableCommand(['book_id INT NOT NULL', \
+				'chapter INT NOT NULL', 'json_text JSONB', 'PRIMARY KEY (book_id, chapter)'], chapterTableName)
 			log.debug("Create bible table command: %s",create_usfm_bible_table_command)
 			log.debug("Create clean bible table command: %s",create_clean_bible_table_command)
 			log.debug("Create token bible table command: %s",create_token_bible_table_command)
 			cursor.execute(create_usfm_bible_table_command)
 			cursor.execute(create_clean_bible_table_command)
 			cursor.execute(create_token_bible_table_command)
+			cursor.execute(create_chapter_bible_table_command)
+			cursor.execute(sql.SQL("CREATE INDEX ON {} (ref_id)").format(sql.Identifier(cleanTableName)))
+			cursor.execute(sql.SQL("CREATE INDEX ON {} USING gin (search_vector)").format(sql.Identifier(cleanTableName)))
+			cursor.execute(sql.SQL("CREATE INDEX ON {} USING gin (verse gin_trgm_ops)").format(sql.Identifier(cleanTableName)))
 			cur2 = connection.cursor()
 			cur2.execute("select version_id from versions where version_code=%s and version_description=%s \
 				and revision=%s",(versionContentCode,versionContentDescription,version,))
@@ -1549,15 +1953,13 @@ def uploadSource():
 		parsedUsfmText = req["parsedUsfmText"]
 		connection = get_db()
 		cursor = connection.cursor()
-		cursor.execute("select s.table_name from sources as s where s.source_id=%s", (sourceId,))
-		rst = cursor.fetchone()
-		if not rst:
+		source = getSource(sourceId)
+		if not source:
 			log.warning("Exiting uploadSource: No source created: %s",sourceId)
 			return '{"success":false, "message":"No source created"}'
-		bibleTable = rst[0]
+		bibleTable = source["tableName"]
 		bookCode = parsedUsfmText["book"]["bookCode"].lower()
-		cursor.execute("select book_id from bible_books_look_up where book_code=%s",(bookCode,))
-		bookId = cursor.fetchone()[0]
+		bookId = getBookByCode(bookCode)[0]
 		cursor.execute(sql.SQL("select * from {} where book_id=%s").format(sql.Identifier(bibleTable)),(bookId,))
 		rst = cursor.fetchone()
 		cursor.close()
@@ -1569,15 +1971,48 @@ def uploadSource():
 		cleanTableName = bibleTable + "_cleaned"
 		print(cleanTableName)
 		cursor = connection.cursor()
-		execute_values(cursor,sql.SQL('insert into {} (ref_id, verse, cross_reference, foot_notes) values %s').format(sql.Identifier(cleanTableName)),
-			parsedDbData)
+		# the verse is passed twice, the second time for its search vector
+		execute_values(cursor,sql.SQL('insert into {} (ref_id, verse, cross_reference, foot_notes, search_vector) values %s').format(sql.Identifier(cleanTableName)),
+			[row + (row[1],) for row in parsedDbData], template="(%s, %s, %s, %s, to_tsvector('simple', coalesce(%s, '')))")
 		print("added in ",cleanTableName)
 		print("About to insert to ",bibleTable)
 		usfmJson = str(json.dumps(parsedUsfmText))
 		cursor.execute(sql.SQL('insert into {} (book_id,usfm_text,json_text) values (%s,%s,%s)').format(sql.Identifier(bibleTable)), (bookId, wholeUsfmText,usfmJson,))
 		print("Added to ",bibleTable)
+		# every chapter is also kept on its own, so reading one does not load the whole book
+		chapterRows = [(bookId, number + 1, json.dumps(chapter)) \
+			for number, chapter in enumerate(parsedUsfmText["chapters"])]
+		if chapterRows:
+			execute_values(cursor, sql.SQL('insert into {} (book_id, chapter, json_text) values %s').format(\
+				sql.Identifier(bibleTable + "_chapters")), chapterRows, page_size=len(chapterRows))
+		contentVersion = bumpContentVersion(cursor, sourceId)
 		connection.commit()
 		cursor.close()
+		invalidateSource(sourceId)
+		# the index of the new content is the index of the version just before this upload with
+		# this book added, when this worker has one; otherwise it is read from the database
+		previousVersion = contentVersion - 1
+		bookIndex = book_index.peek((source["sourceId"], previousVersion))
+		if bookIndex is not None:
+			bookIndex = dict(bookIndex)
+			bookIndex.pop(bookId, None)
+			for refId in [row[0] for row in parsedDbData]:
+				addToBookIndex(bookIndex, bookId, refId // 1000 % 1000, refId % 1000)
+			addToBookIndex(bookIndex, bookId, len(parsedUsfmText["chapters"]), 0)
+			book_index.set((source["sourceId"], contentVersion), bookIndex)
+		else:
+			book_index.invalidate((source["sourceId"], contentVersion))
+		book_index.invalidate((source["sourceId"], previousVersion))
+		book_order.invalidate((source["sourceId"], previousVersion))
+		# the word index is only carried over when this worker has built one for the content
+		# just before this upload; otherwise loadWordIndex() builds it again when asked for
+		wordIndex = word_index.peek((source["sourceId"], previousVersion))
+		if wordIndex is not None:
+			word_index.set((source["sourceId"], contentVersion), \
+				wordIndex.added([(row[0], row[1]) for row in parsedDbData]))
+		else:
+			word_index.invalidate((source["sourceId"], contentVersion))
+		word_index.invalidate((source["sourceId"], previousVersion))
 		log.info("Inserted %s into database",bookCode)
 		return '{"success":true, "message":"Inserted %s into database"}' %(bookCode)
 	except Exception as ex:
@@ -1597,13 +2032,10 @@ def updateTokenTranslations():
 	userId = 2
 	connection = get_db()
 	cursor = connection.cursor()
-	cursor.execute("select language_code from languages where language_id=%s", (targetLanguageId,))
-	targetLanguageCode = cursor.fetchone()
+	targetLanguageCode = getLanguageById(targetLanguageId)
 	if not targetLanguageCode:
 		return '{"success":false, "message":"Target Language does not exist"}'
-	cursor.execute("select * from sources where source_id=%s", (sourceId,))
-	rst = cursor.fetchone()
-	if not rst:
+	if not getSource(sourceId):
 		return '{"success":false, "message":"Source does not exist"}'
 	cursor.execute("select token, translation, senses from translations where source_id=%s and \
 		target_id=%s and token=%s",(sourceId, targetLanguageId, token))
@@ -1646,21 +2078,17 @@ def getTransaltedTokensInfo():
 		email = request.email
 		cursor.execute("select user_id from autographamt_users where email_id=%s", (email,))
 		userId = cursor.fetchone()[0]
-		cursor.execute("select project_id from autographamt_assignments where user_id=%s", (userId,))
-		projectIds = [p[0] for p in cursor.fetchall()]
+		cursor.execute("select p.project_id, p.project_name, p.status from autographamt_projects p \
+			where p.project_id in (select project_id from autographamt_assignments where user_id=%s) \
+				and exists (select 1 from translation_projects_look_up t where t.project_id=p.project_id) \
+					order by p.project_id", (userId,))
 		translationInfo = []
-		for p_id in projectIds:
-			cursor.execute("select distinct p.project_id, p.project_name, p.status from translation_projects_look_up \
-				t left join autographamt_projects p on t.project_id=p.project_id where p.project_id=%s", \
-					(p_id,))
-			rst = cursor.fetchall()
-			if rst:
-				for projectId, projectName, status in rst:
-					translationInfo.append({
-						"projectId": projectId,
-						"projectName": projectName,
-						"projectActive":status
-					})
+		for projectId, projectName, status in cursor.fetchall():
+			translationInfo.append({
+				"projectId": projectId,
+				"projectName": projectName,
+				"projectActive":status
+			})
 		cursor.close()
 		return json.dumps(translationInfo)
 	except Exception as ex:
@@ -1679,9 +2107,7 @@ def getTranslatedBooks(sourceId, targetId):
 		and target_id=%s", (sourceId, targetId))
 	tokenTranslations = {k:v for k, v in cursor.fetchall()}
 	tokenList = list(tokenTranslations.keys())
-	cursor.execute("select table_name from sources where source_id=%s", (sourceId,))
-	rst = cursor.fetchone()[0]
-	tableName = rst + "_tokens"
+	tableName = getSource(sourceId)["tableName"] + "_tokens"
 	#
 
 	cursor.execute(sql.SQL("select b.book_code, t.token from {} t left join bible_books_look_up b on t.book_id=b.book_id").format(sql.Identifier(tableName)))
@@ -1761,8 +2187,7 @@ def downloadDraft():
 
 		if phrases.loadPhraseTranslations(connection, projectId):
 
-			cursor.execute("select table_name from sources where source_id=%s", (sourceId,))
-			tablename = cursor.fetchone()[0]
+			tablename = getSource(sourceId)["tableName"]
 			# bookList = ",".join(bookList)
 			cursor.execute(sql.SQL("select usfm_text,book_code from {} bb \
 					left join bible_books_look_up bl on bb.book_id=bl.book_id \
@@ -1844,12 +2269,10 @@ def downloadDraft():
 def getTranslationWords(sourceId, token):
 	connection = get_db()
 	cursor = connection.cursor()
-	cursor.execute("select l.language_code from sources s left join languages l \
-		on s.language_id=l.language_id where s.source_id=%s", (sourceId,))
-	rst = cursor.fetchone()
-	if not rst:
+	source = getSource(sourceId)
+	if not source:
 		return '{"success":false, "message":"Invalid source ID"}'
-	tableName = "%s_translation_words" %(rst[0])
+	tableName = "%s_translation_words" %(source["languageCode"])
 	try:
 		cursor.execute("select keyword, wordforms, strongs, definition, translationhelp \
 			from " + tableName + " where wordforms like '%" + token + "%'")
@@ -1933,15 +2356,14 @@ def getbookText(sourceid, outputtype, bookid):
 		cursor = connection.cursor()
 		outputtype = outputtype.lower()
 		bookIdDict = getBibleBookIds()
-		cursor.execute("select table_name from sources where source_id=%s and status=true", (sourceid,))
-		rst = cursor.fetchone()
-		if not rst:
+		source = getSource(sourceid)
+		if not source or not source["status"]:
 			return json.dumps({'success':False,'message':'Source not present.'})
 
-		tableName = rst[0]
+		tableName = source["tableName"]
 		returnObj = {}
 		if bookid:
-			cursor.execute(sql.SQL("select usfm_text, json_text from {} where book_id=%s").format(sql.Identifier(tableName)),(bookid,))
+			cursor.execute(sql.SQL("select usfm_text, json_text::text from {} where book_id=%s").format(sql.Identifier(tableName)),(bookid,))
 			sourceContent = cursor.fetchone()
 			bookCode = (bookIdDict[int(bookid)]).lower()
 			if not sourceContent:
@@ -1949,25 +2371,30 @@ def getbookText(sourceid, outputtype, bookid):
 			if outputtype == 'usfm':
 				returnObj[bookCode] = sourceContent[0]
 			elif outputtype == 'json':
-				returnObj[bookCode] = sourceContent[1]
+				returnObj[bookCode] = RawJson(sourceContent[1])
 			else:
 				return json.dumps({'success':False,'message':'Unsupported type. Use "usfm" or "json"'})
 		else:
-			cursor.execute(sql.SQL("select book_id,usfm_text, json_text from {}").format(sql.Identifier(tableName)))
-			sourceContents = cursor.fetchall()
-			if not sourceContents:
-				return json.dumps({'success':False,'message':'Book has not been uploaded in the source.'})
 			if outputtype == 'usfm':
-				for row in sourceContents:
-					returnObj[row[0]] = row[1]
+				column = sql.SQL("usfm_text")
+				formatRow = lambda row: "%s: %s" % (json.dumps(str(row[0])), json.dumps(row[1]))
 			elif outputtype == 'json':
-				for row in sourceContents:
-					bookCode = (bookIdDict[int(row[0])]).lower()
-					returnObj[bookCode] = row[2]
+				column = sql.SQL("json_text::text")
+				formatRow = lambda row: "%s: %s" % (json.dumps(bookIdDict[int(row[0])].lower()), \
+					"null" if row[1] is None else row[1])
 			else:
 				return json.dumps({'success':False,'message':'Unsupported type. Use "usfm" or "json"'})
+			# the books are sent one by one as they are read, instead of building the whole bible in memory
+			cursor.close()
+			cursor = connection.cursor("bible_content")
+			cursor.execute(sql.SQL("select book_id, {} from {} order by book_id").format(column, sql.Identifier(tableName)))
+			firstRow = cursor.fetchone()
+			if not firstRow:
+				cursor.close()
+				return json.dumps({'success':False,'message':'Book has not been uploaded in the source.'})
+			return streamResponse(streamJsonObject(cursor, firstRow, '{', '}', formatRow))
 
-		return json.dumps(returnObj)
+		return dumpsRaw(returnObj)
 	except Exception as e:
 		print(e)
 		return json.dumps({'success':False,'message':'Server error'})
@@ -1981,13 +2408,12 @@ def getVerseInRange(sourceid, outputtype, bookid, chapterid):
 		cursor = connection.cursor()
 		outputtype = outputtype.lower()
 
-		cursor.execute("select table_name from sources where source_id=%s", (sourceid,))
-		rst = cursor.fetchone()
-		if not rst:
+		source = getSource(sourceid)
+		if not source:
 			return '{"success":false, "message":"Source File not available. Create source"}'
 
 		if outputtype == "clean":
-			tablename = rst[0] + '_cleaned'
+			tablename = source["tableName"] + '_cleaned'
 			cursor.execute(sql.SQL("select b.book_code, b.book_id, b.book_name,bcv.chapter,bcv.verse, t.verse from {} \
 				 t left join bcv_map bcv on t.ref_id=bcv.ref_id left join \
 					 bible_books_look_up b on b.book_id=bcv.book where bcv.book=%s \
@@ -2003,18 +2429,13 @@ def getVerseInRange(sourceid, outputtype, bookid, chapterid):
 			} for  bookCode, bookId, bookName,chapter,verse, text in cleanedText]
 			return json.dumps(cleanedText)
 		elif outputtype == "json":
-			tablename = rst[0]
-			cursor.execute(sql.SQL("select json_text from {} where book_id=%s").format(sql.Identifier(tablename)),(bookid,))
+			tablename = source["tableName"] + "_chapters"
+			cursor.execute(sql.SQL("select json_text::text from {} where book_id=%s and chapter=%s").\
+				format(sql.Identifier(tablename)),(int(bookid), int(chapterid)))
 			rst2 = cursor.fetchone()
 			if not rst2:
 				return '{"success":false, "message":"Book not available"}'
-			booksIdDict = getBibleBookIds()
-			bookCode = (booksIdDict[int(bookid)]).lower()
-			jsonContent = rst2[0]
-
-			chapterContent = jsonContent["chapters"]
-			chapterContent = chapterContent[int(chapterid) -1]
-			return json.dumps(chapterContent)
+			return dumpsRaw(RawJson(rst2[0]))
 		else:
 			'{"success":false, "message":"Invalid type. Use either `clean` or `json`"}'
 	except Exception as e:
@@ -2273,7 +2694,9 @@ def activateSource():
 			status = row[0]
 			if status==False:
 				cursor.execute("update sources set status=true where source_id=%s",(sourceId,))
+				bumpContentVersion(cursor, sourceId)
 				connection.commit()
+				invalidateSource(sourceId)
 				return json.dumps({'success':True,'message':"Source re-activated."})
 			else:
 				return json.dumps({'success':False,'message':"Source already active."})
@@ -2372,7 +2795,9 @@ def delete_source(source_id):
 				print(rows)
 				if not rows:
 					cursor.execute("update sources set status=false where source_id=%s",(source_id,))
+					bumpContentVersion(cursor, source_id)
 					connection.commit()
+					invalidateSource(source_id)
 					return {"success":True, "message":"Source deactivated."}
 				else:
 					return {"success":False,"message":"Source is being used in project(s):"+','.join([r[0] for r in rows])}
@@ -2493,6 +2918,13 @@ def getBibles():
 	cursor = connection.cursor()
 	#use status param to filter by status, default only true
 	status = request.args.get('status')
+	#the list changes only when a bible source is added or one of them is changed
+	cursor.execute("select count(*), coalesce(sum(content_version),0), max(content_updated_at) from sources \
+		where content_id=1")
+	count, versions, lastModified = cursor.fetchone()
+	validators = ("bibles-%s-%s" % (count, versions), lastModified)
+	if isNotModified(validators):
+		return notModifiedResponse(validators)
 	query = "select s.source_id, v.revision, v.version_code, v.version_description,s.metadata, \
 		l.language_id, l.language_name, l.language_code, local_script_name, script, script_direction, \
 			created_at_date, s.status, a.name, a.url, a.format, a.books, a.status from sources s left join \
@@ -2540,7 +2972,7 @@ def getBibles():
 		sortedList = reduce(sortByLanguageName,biblesList,[])
 	else:
 		sortedList = reduce(sortByLanguageObject,biblesList,[])
-	return json.dumps(sortedList)
+	return withValidators(json.dumps(sortedList), validators)
 
 @app.route("/v1/bibles/languages", methods=["GET"])
 def getBibleLanguages():
@@ -2549,13 +2981,12 @@ def getBibleLanguages():
 	cursor = connection.cursor()
 	cursor.execute("select distinct(language_id) from sources where content_id=1")
 	languageIds = [item[0] for item in cursor.fetchall()]
-	cursor.execute("select language_id, language_name, language_code from languages")
 	languagesDict = {
 		langId:{
 			"languageName":langName.capitalize(),
 			"languageCode":langCode,
 			"languageId": langId
-		} for langId, langName, langCode in cursor.fetchall()
+		} for langId, langName, langCode in reference_cache.get("languages")["rows"]
 	}
 	languagesList = [languagesDict[x] for x in languageIds]
 	return json.dumps(languagesList)
@@ -2565,18 +2996,16 @@ def getBibleBooks(sourceId):
 	'''Return the list of books in a Bible Language and Version.'''
 	connection = get_db()
 	cursor = connection.cursor()
-	cursor.execute("select table_name from sources where source_id=%s", (sourceId,))
-	rst = cursor.fetchone()
-	if not rst:
+	source = getSource(sourceId)
+	if not source:
 		return json.dumps({"success": False, "message": "Invalid Source Id"})
-	cursor.execute("select book_id from "+rst[0])
+	cursor.execute("select book_id from "+source["tableName"])
 	bookLists = cursor.fetchall()
 	if not bookLists:
 		return json.dumps({"success": False, "message": "No Books uploaded yet"})
 	booksData = []
-	cursor.execute("select * from bible_books_look_up order by book_id")
 	booksDict = {}
-	for bibleBookID, bibleBookFullName, bibleBookCode in cursor.fetchall():
+	for bibleBookID, bibleBookFullName, bibleBookCode in reference_cache.get("books")["rows"]:
 		booksDict[bibleBookID] = {
 			"bibleBookID":bibleBookID,
 			"abbreviation": bibleBookCode,
@@ -2600,22 +3029,23 @@ def getBibleBookChapters(sourceId):
 	'''Return the list of books and chapter Number in a Bible Language and Version.'''
 	connection = get_db()
 	cursor = connection.cursor()
-	cursor.execute("select table_name from sources where source_id=%s", (sourceId,))
-	rst = cursor.fetchone()
-	if not rst:
+	source = getSource(sourceId)
+	if not source:
 		return json.dumps({"success": False, "message": "Invalid Source Id"})
-	cursor.execute( sql.SQL("select l.book_id,l.book_name,book_code,json_array_length(cast (json_text->'chapters' as json)) \
-		from {} b left join bible_books_look_up l on b.book_id=l.book_id").format(sql.Identifier(rst[0])))
-	bookLists = cursor.fetchall()
-	if not bookLists:
+	validators = sourceValidators(source, "books-chapters")
+	if isNotModified(validators):
+		return notModifiedResponse(validators)
+	bookIndex = getBookIndex(source)
+	if not bookIndex:
 		return json.dumps({"success": False, "message": "No Books uploaded yet"})
 	booksDict = {}
-	for bibleBookID, bibleBookFullName, bibleBookCode, chapters in bookLists:
+	for bibleBookID in sorted(bookIndex):
+		bibleBookFullName, bibleBookCode = getBookById(bibleBookID)
 		booksDict[bibleBookCode] = {
 			"bibleBookID":bibleBookID,
 			"abbreviation": bibleBookCode,
 			"bibleBookFullName": bibleBookFullName.capitalize(),
-			"chapters": chapters
+			"chapters": len(bookIndex[bibleBookID])
 		}
 	bibleBooks = [
 		{
@@ -2623,40 +3053,37 @@ def getBibleBookChapters(sourceId):
 			"books": booksDict
 		}
 	]
-	return json.dumps(bibleBooks)
+	return withValidators(json.dumps(bibleBooks), validators)
 
 @app.route("/v1/bibles/<sourceId>/<contentFormat>", methods=["GET"])
 def getBible(sourceId, contentFormat):
 	'''Return the bible content for a particular Bible version and format.'''
 	connection = get_db()
 	cursor = connection.cursor()
-	cursor.execute("select table_name from sources where source_id=%s", (sourceId,))
-	rst = cursor.fetchone()
-	if not rst:
+	source = getSource(sourceId)
+	if not source:
 		return json.dumps({"success": False, "message": "Invalid Source Id"})
-	cursor.execute("select count(*) from "+rst[0])
-	if not cursor.fetchone():
+	tableName = source["tableName"]
+	cursor.execute(sql.SQL("select count(*) from {}").format(sql.Identifier(tableName)))
+	if cursor.fetchone()[0] == 0:
+		cursor.close()
 		return json.dumps({"success": False, "message": "No Books uploaded yet"})
+	cursor.close()
+	# book codes are looked up before the stream starts, so formatting a row cannot fail
+	bookCodes = getBibleBookIds()
 	if contentFormat.lower() == 'usfm':
-		cursor.execute( sql.SQL("select l.book_code,b.usfm_text from {} b \
-			left join bible_books_look_up l on b.book_id=l.book_id").format(sql.Identifier(rst[0])))
-		bible_data = cursor.fetchall()
-		usfm_text = {}
-		for book,text in bible_data:
-			usfm_text[book]=text
-		usfmText = {"sourceId":sourceId,"bibleContent":usfm_text}
+		column = sql.SQL("usfm_text")
+		formatRow = lambda row: "%s: %s" % (json.dumps(bookCodes.get(row[0])), json.dumps(row[1]))
 	elif contentFormat.lower() == 'json':
-		cursor.execute( sql.SQL("select l.book_code,b.json_text from {} b \
-			left join bible_books_look_up l on b.book_id=l.book_id").format(sql.Identifier(rst[0])))
-		bible_data = cursor.fetchall()
-		json_text = {}
-		for book,text in bible_data:
-			json_text[book]=text
-		usfmText = {"sourceId":sourceId,"bibleContent":json_text}
+		column = sql.SQL("json_text::text")
+		formatRow = lambda row: "%s: %s" % (json.dumps(bookCodes.get(row[0])), "null" if row[1] is None else row[1])
 	else:
 		return '{"success": false, "message":"Invalid Content Type"}'
-	cursor.close()
-	return json.dumps(usfmText)
+	# the books are sent one by one as they are read, instead of building the whole bible in memory
+	cursor = connection.cursor("bible_content")
+	cursor.execute(sql.SQL("select book_id, {} from {} order by book_id").format(column, sql.Identifier(tableName)))
+	return streamResponse(streamJsonObject(cursor, cursor.fetchone(), \
+		'{"sourceId": %s, "bibleContent": {' % json.dumps(sourceId), '}}', formatRow))
 
 
 @app.route("/v1/bibles/<sourceId>/books/<bookCode>/<contentFormat>", methods=["GET"])
@@ -2666,20 +3093,26 @@ def getBook(sourceId,bookCode, contentFormat):
 	if contentFormat.lower() not in ["usfm","json"]:
 		return '{"success": false, "message":"Invalid Content Type"}'
 	cursor = connection.cursor()
-	cursor.execute("select table_name from sources where source_id=%s", (sourceId,))
-	rst = cursor.fetchone()
-	if not rst[0]:
+	source = getSource(sourceId)
+	if not source:
 		return json.dumps({"success": False, "message": "Invalid Source Id"})
+	validators = sourceValidators(source, bookCode, contentFormat)
+	if isNotModified(validators):
+		return notModifiedResponse(validators)
+	artifact = compressed_cache.get(contentKey(source))
+	if artifact:
+		return compressedResponse(artifact, validators)
 	contentType="usfm_text" if contentFormat.lower() == "usfm" else "json_text"
-	cursor.execute( sql.SQL("select {} from {} b left join bible_books_look_up l \
-		on b.book_id=l.book_id where l.book_code=%s").format(sql.Identifier(contentType),sql.Identifier(rst[0])),[bookCode])
+	cursor.execute( sql.SQL("select {}::text from {} b left join bible_books_look_up l \
+		on b.book_id=l.book_id where l.book_code=%s").format(sql.Identifier(contentType),sql.Identifier(source["tableName"])),[bookCode])
 	rst = cursor.fetchone()
-	if not rst[0]:
+	if not rst or not rst[0]:
 		return json.dumps({"success": False, "message": "Book not uploaded"})
 	else:
-		usfmText = {"sourceId":sourceId,"bibleBookCode":bookCode,"bookContent":rst[0]}
+		content = RawJson(rst[0]) if contentType == "json_text" else rst[0]
+		usfmText = {"sourceId":sourceId,"bibleBookCode":bookCode,"bookContent":content}
 	cursor.close()
-	return json.dumps(usfmText)
+	return compressedResponse(compressed_cache.add(contentKey(source), dumpsRaw(usfmText)), validators)
 
 @app.route("/v1/bibles/<sourceId>/books/<biblebookCode>/chapters", methods=["GET"])
 def getBibleChapters(sourceId, biblebookCode):
@@ -2687,19 +3120,16 @@ def getBibleChapters(sourceId, biblebookCode):
 	try:
 		connection = get_db()
 		cursor = connection.cursor()
-		cursor.execute("select table_name from sources where source_id=%s", (sourceId,))
-		rst = cursor.fetchone()
-		if not rst:
+		source = getSource(sourceId)
+		if not source:
 			return json.dumps({"success": False, "message": "Invalid Source Id"})
 
-		cursor.execute(sql.SQL("select book_name,json_array_length(cast (json_text->'chapters' as json)) \
-		from {} b left join bible_books_look_up l on b.book_id=l.book_id where book_code=%s").\
-			format(sql.Identifier(rst[0])),[biblebookCode.lower()])
-		bible_book_data = cursor.fetchone()
-		if not bible_book_data:
+		book = getBookByCode(biblebookCode)
+		chapterVerses = getBookIndex(source).get(book[0]) if book else None
+		if not chapterVerses:
 			return '{"success":false, "message":"Book not uploaded"}'
 		chapters = []
-		book_name,chapter_count = bible_book_data
+		book_name,chapter_count = book[1], len(chapterVerses)
 		for num in range(chapter_count):
 			chapters.append(
 				{
@@ -2722,55 +3152,48 @@ def getChapter(sourceId,bookCode,chapterId):
 	connection = get_db()
 	cursor = connection.cursor()
 	bookCode=bookCode.lower()
-	cursor.execute("select book_id from bible_books_look_up where book_code=%s", (bookCode.lower(),))
-	bible_book_data = cursor.fetchone()
+	bible_book_data = getBookByCode(bookCode)
 	if not bible_book_data:
 		return '{"success":false, "message":"Invalid book code"}'
 	book_id = bible_book_data[0]
-	cursor.execute("select table_name from sources where source_id=%s", (sourceId,))
-	rst = cursor.fetchone()
-	if not rst:
+	source = getSource(sourceId)
+	if not source:
 		return '{"success":false, "message":"Source doesn\'t exist"}'
-	table_name=rst[0]
-	cursor.execute(sql.SQL("select json_text->'chapters'->%s from {} where book_id=%s")\
-		.format(sql.Identifier(table_name)),[int(chapterId)-1,book_id])
-	chapter_content = cursor.fetchone()
-	if not chapter_content:
+	validators = sourceValidators(source, bookCode, chapterId)
+	if isNotModified(validators):
+		return notModifiedResponse(validators)
+	artifact = compressed_cache.get(contentKey(source))
+	if artifact:
+		return compressedResponse(artifact, validators)
+	bookIndex = getBookIndex(source)
+	chapter_count = len(bookIndex.get(book_id, []))
+	if not chapter_count:
 		return json.dumps({"success": False, "message": "Book not uploaded"})
-	#get data for next and previous chapters
-	prevChapter=int(chapterId)-1
+	chapterNumber = int(chapterId)
+	if not 0 < chapterNumber <= chapter_count:
+		return json.dumps({"success": False, "message": "Invalid chapter id"})
+	#get data for next and previous chapters from the index, the next book when this is the last chapter
+	previousBook, nextBook = getNeighbourBooks(source, book_id)
 	previous={}
 	next={}
-	if(prevChapter > 0):
-		previous={"sourceId":sourceId, "bibleBookCode":bookCode, "chapterId":prevChapter}
-	else:
-		cursor.execute(sql.SQL("select book_code,json_array_length(cast (json_text->'chapters' as json)) from \
-			{} b left join bible_books_look_up l on b.book_id=l.book_id where b.book_id \
-				= (select max(book_id) from {} where book_id<%s)").format(sql.Identifier(table_name),sql.Identifier(table_name)),[bible_book_data[0]])
-		prev_book = cursor.fetchone()
-		if prev_book:
-			previous={"sourceId":sourceId, "bibleBookCode":prev_book[0], "chapterId":prev_book[1]}
-	#get chapter count and if next chapter less than chapter count return it else get next book
-	cursor.execute(sql.SQL("select json_array_length(cast (json_text->'chapters' as json)) from {} \
-		where book_id=%s").format(sql.Identifier(table_name)),[book_id])
-	chapter_count = cursor.fetchone()[0]
-	nextChapter=int(chapterId)+1
-	if(nextChapter <= chapter_count):
-		next={"sourceId":sourceId, "bibleBookCode":bookCode, "chapterId":nextChapter}
-	else:
-		cursor.execute(sql.SQL("select book_code from bible_books_look_up where book_id = \
-			(select min(book_id) from {} where book_id>%s)").format(sql.Identifier(table_name)),[book_id])
-		next_book_id = cursor.fetchone()
-		if next_book_id:
-			next={"sourceId":sourceId, "bibleBookCode":next_book_id[0], "chapterId":1}
-	chapterId=int(chapterId)-1
-	if (chapterId>=0 and chapterId<chapter_count):
-		usfmText = {"sourceId":sourceId,"bibleBookCode":bookCode,"chapterId":chapterId+1,
-			"previous":previous,"next":next,"chapterContent":chapter_content[0]}
-	else:
-		return json.dumps({"success": False, "message": "Invalid chapter id"})
+	if chapterNumber > 1:
+		previous={"sourceId":sourceId, "bibleBookCode":bookCode, "chapterId":chapterNumber-1}
+	elif previousBook:
+		previous={"sourceId":sourceId, "bibleBookCode":getBookById(previousBook)[1], \
+			"chapterId":len(bookIndex[previousBook])}
+	if chapterNumber < chapter_count:
+		next={"sourceId":sourceId, "bibleBookCode":bookCode, "chapterId":chapterNumber+1}
+	elif nextBook:
+		next={"sourceId":sourceId, "bibleBookCode":getBookById(nextBook)[1], "chapterId":1}
+	cursor.execute(sql.SQL("select json_text::text from {} where book_id=%s and chapter=%s")\
+		.format(sql.Identifier(source["tableName"] + "_chapters")),[book_id,chapterNumber])
+	chapter_content = cursor.fetchone()
+	if not chapter_content:
+		return json.dumps({"success": False, "message": "Book not uploaded"})
+	usfmText = {"sourceId":sourceId,"bibleBookCode":bookCode,"chapterId":chapterNumber,
+		"previous":previous,"next":next,"chapterContent":RawJson(chapter_content[0])}
 	cursor.close()
-	return json.dumps(usfmText)
+	return compressedResponse(compressed_cache.add(contentKey(source), dumpsRaw(usfmText)), validators)
 
 @app.route("/v1/bibles/<sourceId>/books/<biblebookCode>/chapters/<chapterId>/verses", methods=["GET"])
 def getBibleVerses(sourceId, biblebookCode, chapterId):
@@ -2778,25 +3201,19 @@ def getBibleVerses(sourceId, biblebookCode, chapterId):
 	try:
 		connection = get_db()
 		cursor = connection.cursor()
-		cursor.execute("select book_id, book_name from bible_books_look_up \
-			where book_code=%s", (biblebookCode.lower(),))
-		bibleBookData = cursor.fetchone()
+		bibleBookData = getBookByCode(biblebookCode)
 		if not bibleBookData:
 			return '{"success":false, "message":"Invalid book code"}'
-		cursor.execute("select table_name from sources where source_id=%s", (sourceId,))
-		tableName = cursor.fetchone()
-		if not tableName:
+		source = getSource(sourceId)
+		if not source:
 			return '{"success":false, "message":"Source doesn\'t exist"}'
-		startId = int(bibleBookData[0]) * 1000000 + (int(chapterId) * 1000)
-		endId = int(bibleBookData[0]) * 1000000 + ((int(chapterId) + 1) * 1000)
-		cursor.execute(sql.SQL("select ref_id from {} where ref_id > %s and ref_id < %s order by ref_id").\
-			format(sql.Identifier(tableName[0] + "_cleaned")), [startId, endId])
-		refIdsList = [x[0] for x in cursor.fetchall()]
-		verseList = []
-		for ref in refIdsList:
-			verseNumber = int(str(ref)[-3:])
-			if verseNumber not in verseList:
-				verseList.append(verseNumber)
+		validators = sourceValidators(source, biblebookCode.lower(), chapterId)
+		if isNotModified(validators):
+			return notModifiedResponse(validators)
+		artifact = compressed_cache.get(contentKey(source))
+		if artifact:
+			return compressedResponse(artifact, validators)
+		verseList = chapterVerseNumbers(cursor, source, bibleBookData[0], int(chapterId))
 		verses = []
 		for num in verseList:
 			verses.append(
@@ -2811,7 +3228,7 @@ def getBibleVerses(sourceId, biblebookCode, chapterId):
 					}
 				}
 			)
-		return json.dumps(verses)
+		return compressedResponse(compressed_cache.add(contentKey(source), json.dumps(verses)), validators)
 	except Exception as ex:
 		return '{"success":false, "message":"%s"}' %(str(ex))
 
@@ -2821,19 +3238,16 @@ def getBibleVerseText(sourceId, bibleBookCode, chapterId, verseId):
 	try:
 		connection = get_db()
 		cursor = connection.cursor()
-		cursor.execute("select book_id, book_name from bible_books_look_up \
-			where book_code=%s", (bibleBookCode.lower(),))
-		bibleBookData = cursor.fetchone()
+		bibleBookData = getBookByCode(bibleBookCode)
 		if not bibleBookData:
 			return '{"success":false, "message":"Invalid book code"}'
-		cursor.execute("select table_name from sources where source_id=%s", (sourceId,))
-		tableName = cursor.fetchone()
-		if not tableName:
+		source = getSource(sourceId)
+		if not source:
 			return '{"success":false, "message":"Source doesn\'t exist"}'
 		bookId = bibleBookData[0]
 		ref_id = int(str(bookId).zfill(2) + chapterId.zfill(3) + verseId.zfill(3))
 		cursor.execute(sql.SQL("select verse from {} where ref_id=%s").\
-			format(sql.Identifier(tableName[0] + "_cleaned")), [ref_id])
+			format(sql.Identifier(source["tableName"] + "_cleaned")), [ref_id])
 		verse = cursor.fetchone()
 		if not verse:
 			return '{"success": false, "message":"No verse found"}'
@@ -2860,25 +3274,19 @@ def getBibleVerses2(sourceId, chapterId):
 			bookCode, chapterNumber = chapterId.split('.')
 		except:
 			return '{"success": false, "message":"Invalid Chapter id format."}'
-		cursor.execute("select book_id, book_name from bible_books_look_up \
-			where book_code=%s", (bookCode.lower(),))
-		bibleBookData = cursor.fetchone()
+		bibleBookData = getBookByCode(bookCode)
 		if not bibleBookData:
 			return '{"success":false, "message":"Invalid book code"}'
-		cursor.execute("select table_name from sources where source_id=%s", (sourceId,))
-		tableName = cursor.fetchone()
-		if not tableName:
+		source = getSource(sourceId)
+		if not source:
 			return '{"success":false, "message":"Source doesn\'t exist"}'
-		startId = int(bibleBookData[0]) * 1000000 + (int(chapterNumber) * 1000)
-		endId = int(bibleBookData[0]) * 1000000 + ((int(chapterNumber) + 1) * 1000)
-		cursor.execute(sql.SQL("select ref_id from {} where ref_id > %s and ref_id < %s order by ref_id").\
-			format(sql.Identifier(tableName[0] + "_cleaned")), [startId, endId])
-		refIdsList = [x[0] for x in cursor.fetchall()]
-		verseList = []
-		for ref in refIdsList:
-			verseNumber = int(str(ref)[-3:])
-			if verseNumber not in verseList:
-				verseList.append(verseNumber)
+		validators = sourceValidators(source, chapterId.lower())
+		if isNotModified(validators):
+			return notModifiedResponse(validators)
+		artifact = compressed_cache.get(contentKey(source))
+		if artifact:
+			return compressedResponse(artifact, validators)
+		verseList = chapterVerseNumbers(cursor, source, bibleBookData[0], int(chapterNumber))
 		verses = []
 		for num in verseList:
 			verses.append(
@@ -2893,7 +3301,7 @@ def getBibleVerses2(sourceId, chapterId):
 					}
 				}
 			)
-		return json.dumps(verses)
+		return compressedResponse(compressed_cache.add(contentKey(source), json.dumps(verses)), validators)
 	except Exception as ex:
 		return '{"success":false, "message":"%s"}' %(str(ex))
 
@@ -2907,19 +3315,16 @@ def getBibleVerseText2(sourceId, verseId):
 			bookCode, chapterNumber, verseNumber = verseId.split('.')
 		except:
 			return '{"success": false, "message":"Invalid Verse id format."}'
-		cursor.execute("select book_id, book_name from bible_books_look_up \
-			where book_code=%s", (bookCode.lower(),))
-		bibleBookData = cursor.fetchone()
+		bibleBookData = getBookByCode(bookCode)
 		if not bibleBookData:
 			return '{"success":false, "message":"Invalid book code"}'
-		cursor.execute("select table_name from sources where source_id=%s", (sourceId,))
-		tableName = cursor.fetchone()
-		if not tableName:
+		source = getSource(sourceId)
+		if not source:
 			return '{"success":false, "message":"Source doesn\'t exist"}'
 		bookId = bibleBookData[0]
 		ref_id = int(str(bookId).zfill(2) + chapterNumber.zfill(3) + verseNumber.zfill(3))
 		cursor.execute(sql.SQL("select verse from {} where ref_id=%s").\
-			format(sql.Identifier(tableName[0] + "_cleaned")), [ref_id])
+			format(sql.Identifier(source["tableName"] + "_cleaned")), [ref_id])
 		verse = cursor.fetchone()
 		if not verse:
 			return '{"success": false, "message":"No verse found"}'
@@ -2936,14 +3341,177 @@ def getBibleVerseText2(sourceId, verseId):
 	except Exception as ex:
 		return '{"success":false, "message":"%s"}' %(str(ex))
 
+def chapterVerseNumbers(cursor, source, bookId, chapter):
+	'''The distinct verse numbers of a chapter in a bible, in order.'''
+	startId = int(bookId) * 1000000 + chapter * 1000
+	cursor.execute(sql.SQL("select distinct mod(ref_id, 1000) from {} where ref_id > %s and ref_id < %s order by 1").\
+		format(sql.Identifier(source["tableName"] + "_cleaned")), [startId, startId + 1000])
+	return [row[0] for row in cursor.fetchall()]
+
+verse_range_limit = int(os.environ.get("AGMT_VERSE_RANGE_LIMIT", "2000"))
+
+def verseRefId(verseId):
+	'''Returns the ref_id of a verse id like "gen.1.26", None if it is not a valid verse id.'''
+	try:
+		bookCode, chapterNumber, verseNumber = verseId.split('.')
+		chapterNumber = int(chapterNumber)
+		verseNumber = int(verseNumber)
+	except ValueError:
+		return None
+	bibleBookData = getBookByCode(bookCode)
+	if not bibleBookData or not 0 < chapterNumber < 1000 or not 0 < verseNumber < 1000:
+		return None
+	return bibleBookData[0] * 1000000 + chapterNumber * 1000 + verseNumber
+
+def verseReference(refId):
+	'''Book code, chapter, verse, verse id and reference of a ref_id.'''
+	bookName, bookCode = getBookById(refId // 1000000)
+	chapterNumber = refId // 1000 % 1000
+	verseNumber = refId % 1000
+	return {
+		"bibleBookCode": bookCode,
+		"chapterNumber": chapterNumber,
+		"verseNumber": verseNumber,
+		"verseId": "%s.%s.%s" % (bookCode, chapterNumber, verseNumber),
+		"reference": "%s %s:%s" % (bookName.title(), chapterNumber, verseNumber)
+	}
+
+def verseObject(sourceId, refId, text):
+	'''The verse object of the verse endpoints for a ref_id and its text.'''
+	verse = {"sourceId": sourceId}
+	verse.update(verseReference(refId))
+	verse["verseContent"] = {"text": text}
+	return verse
+
+@app.route("/v1/bibles/<sourceId>/verses/<startVerseId>/<endVerseId>", methods=["GET"])
+def getBibleVerseRange(sourceId, startVerseId, endVerseId):
+	'''Return the verses from one verse id to another (both included), across chapters and books.'''
+	try:
+		startRefId = verseRefId(startVerseId)
+		endRefId = verseRefId(endVerseId)
+		if not startRefId or not endRefId:
+			return '{"success": false, "message":"Invalid Verse id format."}'
+		if endRefId < startRefId:
+			return '{"success": false, "message":"The range ends before it starts"}'
+		source = getSource(sourceId)
+		if not source or source["contentType"] != "bible":
+			return '{"success":false, "message":"Source doesn\'t exist"}'
+		cursor = get_db().cursor()
+		cursor.execute(sql.SQL("select ref_id, verse from {} where ref_id between %s and %s order by ref_id \
+			limit %s").format(sql.Identifier(source["tableName"] + "_cleaned")), \
+				[startRefId, endRefId, verse_range_limit + 1])
+		rst = cursor.fetchall()
+		cursor.close()
+		if not rst:
+			return '{"success": false, "message":"No verse found"}'
+		if len(rst) > verse_range_limit:
+			return '{"success": false, "message":"The range has more than %s verses"}' % verse_range_limit
+		verses = [verseObject(sourceId, refId, text) for refId, text in rst]
+		return json.dumps({
+			"sourceId": sourceId,
+			"reference": "%s - %s" % (verses[0]["reference"], verses[-1]["reference"]),
+			"verses": verses
+		})
+	except Exception as ex:
+		return '{"success":false, "message":"%s"}' %(str(ex))
+
+parallel_source_limit = 10
+
+@app.route("/v1/bibles/parallel", methods=["GET"])
+def getParallelVerses():
+	'''
+	Return the verses of a chapter (chapter=gen.1) or a range (start=gen.1.26&end=gen.2.3) in several
+	bibles (sourceIds=1,2,3), aligned by verse: every verse has the text of each source, null when a
+	source does not have it. All the bibles are read with one query.
+	'''
+	try:
+		try:
+			sourceIds = [int(sourceId) for sourceId in request.args.get("sourceIds", "").split(",")]
+		except ValueError:
+			return '{"success": false, "message":"Give the bibles as sourceIds=1,2,3"}'
+		sourceIds = list(dict.fromkeys(sourceIds))
+		if len(sourceIds) > parallel_source_limit:
+			return '{"success": false, "message":"Ask for at most %s bibles"}' % parallel_source_limit
+		chapterId = request.args.get("chapter")
+		if chapterId:
+			startRefId = verseRefId(chapterId + ".1")
+			endRefId = startRefId + 998 if startRefId else None
+		else:
+			startRefId = verseRefId(request.args.get("start", ""))
+			endRefId = verseRefId(request.args.get("end", ""))
+		if not startRefId or not endRefId or endRefId < startRefId:
+			return '{"success": false, "message":"Give a chapter like gen.1 or a range like start=gen.1.26&end=gen.2.3"}'
+		tables = []
+		for sourceId in sourceIds:
+			source = getSource(sourceId)
+			if not source or source["contentType"] != "bible":
+				return '{"success":false, "message":"Source %s doesn\'t exist"}' % sourceId
+			tables.append(sql.SQL("select {}, ref_id, verse from {} where ref_id between %(start)s and %(end)s").\
+				format(sql.Literal(sourceId), sql.Identifier(source["tableName"] + "_cleaned")))
+		limit = verse_range_limit * len(sourceIds)
+		cursor = get_db().cursor()
+		cursor.execute(sql.SQL("{} order by 2 limit %(limit)s").format(sql.SQL(" union all ").join(tables)), \
+			{"start": startRefId, "end": endRefId, "limit": limit + 1})
+		rst = cursor.fetchall()
+		cursor.close()
+		if len(rst) > limit:
+			return '{"success": false, "message":"The range has more than %s verses"}' % verse_range_limit
+		verses = {}
+		for sourceId, refId, text in rst:
+			if refId not in verses:
+				verses[refId] = verseReference(refId)
+				verses[refId]["verseContent"] = dict((str(s), None) for s in sourceIds)
+			verses[refId]["verseContent"][str(sourceId)] = {"text": text}
+		return json.dumps({"sourceIds": sourceIds, "verses": list(verses.values())})
+	except Exception as ex:
+		return '{"success":false, "message":"%s"}' %(str(ex))
+
+@app.route("/v1/bibles/<sourceId>/verses", methods=["POST"])
+def getBibleVerseBatch(sourceId):
+	'''
+	Return the verses of a list of verse ids, e.g. {"verseIds": ["gen.1.1", "jhn.3.16"]}, in the
+	order they were asked for. Invalid ids and verses not in the bible get an error entry.
+	'''
+	try:
+		req = request.get_json(True)
+		verseIds = req.get("verseIds") if isinstance(req, dict) else None
+		if not isinstance(verseIds, list) or not verseIds:
+			return '{"success": false, "message":"Give the verse ids as a list in verseIds"}'
+		if len(verseIds) > verse_range_limit:
+			return '{"success": false, "message":"Ask for at most %s verses"}' % verse_range_limit
+		source = getSource(sourceId)
+		if not source or source["contentType"] != "bible":
+			return '{"success":false, "message":"Source doesn\'t exist"}'
+		refIds = [verseRefId(verseId) if isinstance(verseId, str) else None for verseId in verseIds]
+		cursor = get_db().cursor()
+		cursor.execute(sql.SQL("select ref_id, verse from {} where ref_id = ANY(%s)").\
+			format(sql.Identifier(source["tableName"] + "_cleaned")), [list(set(refId for refId in refIds if refId))])
+		texts = dict(cursor.fetchall())
+		cursor.close()
+		verses = []
+		for verseId, refId in zip(verseIds, refIds):
+			if not refId:
+				verses.append({"verseId": verseId, "success": False, "message": "Invalid Verse id format."})
+			elif refId not in texts:
+				verses.append({"verseId": verseId, "success": False, "message": "No verse found"})
+			else:
+				verses.append(verseObject(sourceId, refId, texts[refId]))
+		return json.dumps({"sourceId": sourceId, "verses": verses})
+	except Exception as ex:
+		return '{"success":false, "message":"%s"}' %(str(ex))
+
 def getContentId(cursor,contentType):
 	'''Get content type id for given content type name'''
+	contentTypeData = reference_cache.get("content_types")["byType"].get(contentType)
+	if contentTypeData:
+		return contentTypeData[0]
 	cursor.execute("select content_id from content_types where content_type=%s", (contentType,))
 	rst = cursor.fetchone()
 	if not rst:
 		#if content type not found, insert value into db
 		cursor.execute("insert into content_types(content_type) values(%s) returning content_id",(contentType,))
 		rst = cursor.fetchone()
+	reference_cache.invalidate("content_types")
 	return rst[0]
 
 def getVersionId(cursor,abbreviation,name,revision):
@@ -2961,8 +3529,7 @@ def getVersionId(cursor,abbreviation,name,revision):
 
 def getLanguageId(cursor,language):
 	'''Get language id for given language code'''
-	cursor.execute("select language_id from languages where language_code=%s", (language,))
-	rst = cursor.fetchone()
+	rst = getLanguageByCode(language)
 	return None if not rst else rst[0]
 
 @app.route("/v1/sources/commentary", methods=["POST"])
@@ -3041,9 +3608,8 @@ def checkAuthorised(cursor,key):
 	'''Check if key authorized'''
 	authorised = False
 	if key and key.strip():
-		cursor.execute("select key from content_types where content_type='commentary'")
-		db_key = cursor.fetchone()
-		if db_key and db_key is not None and key == db_key[0]:
+		commentaryType = reference_cache.get("content_types")["byType"].get('commentary')
+		if commentaryType and commentaryType[1] is not None and key == commentaryType[1]:
 			authorised = True
 	return authorised
 
@@ -3060,8 +3626,7 @@ def getBibleCommentaries():
 		#use language code param to filter by language
 		lang_code = request.args.get('language')
 		if lang_code and lang_code.strip():
-			cursor.execute("select language_id from languages where language_code=%s", (lang_code,))
-			language_id = cursor.fetchone()
+			language_id = getLanguageByCode(lang_code)
 			if not language_id or language_id is None:
 				return '{"success": false, "message":""message":"language code not available.""}'
 			cursor.execute(query + " and s.language_id in(%s)", (language_id[0],))
@@ -3088,20 +3653,18 @@ def getCommentaryChapter(sourceId,bookCode,chapterId):
 	try:
 		connection = get_db()
 		cursor = connection.cursor()
-		cursor.execute("select s.metadata->'Copyright' from sources s where source_id=%s and content_id \
-			in(select content_id from content_types where content_type = 'commentary')", (sourceId,))
-		rst = cursor.fetchone()
-		if not rst:
+		source = getSource(sourceId)
+		if not source or source["contentType"] != 'commentary':
 			return '{"success":false, "message":"Invalid commentary sourceId"}'
-		if rst[0] and rst[0] =="True":
+		copyrighted = (source["metadata"] or {}).get("Copyright")
+		if copyrighted and copyrighted =="True":
 			#If copyright commentary then check if authorised
 			authorised = checkAuthorised(cursor,request.args.get('key'))
 			if not authorised:
 				return '{"success":false, "message":"Not authorised"}'
 		bookCode=bookCode.lower()
 		#Get bible book id
-		cursor.execute("select book_id from bible_books_look_up where book_code=%s", (bookCode.lower(),))
-		bible_book_data = cursor.fetchone()
+		bible_book_data = getBookByCode(bookCode)
 		if not bible_book_data:
 			return '{"success":false, "message":"Invalid book code"}'
 		book_id = bible_book_data[0]
@@ -3110,11 +3673,13 @@ def getCommentaryChapter(sourceId,bookCode,chapterId):
 		rst = cursor.fetchone()
 		if not rst[0]:
 			return '{"success":false, "message":"Invalid chapter"}'
-		#Get commentary table
-		cursor.execute("select table_name from sources where source_id=%s and content_id in(select \
-			content_id from content_types where content_type = 'commentary')", (sourceId,))
-		rst = cursor.fetchone()
-		table_name=rst[0]
+		validators = sourceValidators(source, bookCode, chapterId)
+		if isNotModified(validators):
+			return notModifiedResponse(validators)
+		artifact = compressed_cache.get(contentKey(source))
+		if artifact:
+			return compressedResponse(artifact, validators)
+		table_name=source["tableName"]
 		#Get commentary
 		cursor.execute(sql.SQL("select verse,commentary from {} where book_id=%s and chapter=%s \
 			order by verse").format(sql.Identifier(table_name)),[book_id,int(chapterId)])
@@ -3130,8 +3695,9 @@ def getCommentaryChapter(sourceId,bookCode,chapterId):
 				bookIntro = bookIntro[0][0]
 		for row in commentary:
 			commentaries.append({"verse":row[0],"text":row[1]})
-		return json.dumps({ "sourceId":sourceId,"bookCode":bookCode,"chapter":chapterId,\
+		body = json.dumps({ "sourceId":sourceId,"bookCode":bookCode,"chapter":chapterId,\
 			"bookIntro":bookIntro,"commentaries":sorted(commentaries, key = lambda i: int(i['verse'].split("-")[0])) })
+		return compressedResponse(compressed_cache.add(contentKey(source), body), validators)
 	except Exception as ex:
 		traceback.print_exc()
 		return '{"success":false, "message":"%s"}' %(str(ex))
@@ -3222,8 +3788,7 @@ def getDictionaries():
 		#use language code param to filter by language
 		lang_code = request.args.get('language')
 		if lang_code and lang_code.strip():
-			cursor.execute("select language_id from languages where language_code=%s", (lang_code,))
-			language_id = cursor.fetchone()
+			language_id = getLanguageByCode(lang_code)
 			if not language_id or language_id is None:
 				return '{"success": false, "message":""message":"language code not available.""}'
 			cursor.execute(query + " and s.language_id in(%s)", (language_id[0],))
@@ -3260,12 +3825,10 @@ def getDictionaryWords(sourceId):
 		connection = get_db()
 		cursor = connection.cursor()
 		#Get dictionary table
-		cursor.execute("select table_name from sources where source_id=%s and content_id in(select \
-			content_id from content_types where content_type = 'translation_words')", (sourceId,))
-		rst = cursor.fetchone()
-		if not rst:
+		source = getSource(sourceId)
+		if not source or source["contentType"] != 'translation_words':
 			return '{"success":false, "message":"Invalid dictionary sourceId"}'
-		table_name=rst[0]
+		table_name=source["tableName"]
 		#Get dictionary
 		cursor.execute(sql.SQL("select id,wordforms from {} order by keyword")
 			.format(sql.Identifier(table_name)))
@@ -3291,12 +3854,10 @@ def getDictionaryWord(sourceId,wordId):
 		connection = get_db()
 		cursor = connection.cursor()
 		#Get dictionary table
-		cursor.execute("select table_name from sources where source_id=%s and content_id in(select \
-			content_id from content_types where content_type = 'translation_words')", (sourceId,))
-		rst = cursor.fetchone()
-		if not rst:
+		source = getSource(sourceId)
+		if not source or source["contentType"] != 'translation_words':
 			return '{"success":false, "message":"Invalid dictionary sourceId"}'
-		table_name=rst[0]
+		table_name=source["tableName"]
 		#Get dictionary
 		cursor.execute(sql.SQL("select * from {} where id=%s")
 			.format(sql.Identifier(table_name)),[int(wordId)])
@@ -3394,9 +3955,7 @@ def getInfographics(languageCode):
 	try:
 		connection = get_db()
 		cursor = connection.cursor()
-		cursor.execute(
-			"select language_id from languages where language_code=%s", (languageCode.strip(),))
-		language_id = cursor.fetchone()
+		language_id = getLanguageByCode(languageCode.strip())
 		if not language_id or language_id is None:
 			return '{"success":false, "message":"Invalid language code"}'
 		cursor.execute("select table_name,s.metadata from sources s where content_id in (select content_id \
@@ -3444,10 +4003,8 @@ def addAudioBible():
 		connection = get_db()
 		cursor = connection.cursor()
 		#Check if valid sourceId
-		cursor.execute("select table_name from sources where source_id=%s and content_id in (select \
-			content_id from content_types where content_type = 'bible')", (sourceId,))
-		rst = cursor.fetchone()
-		if not rst:
+		source = getSource(sourceId)
+		if not source or source["contentType"] != 'bible':
 			log.warning("Exiting addAudioBible: Invalid bible sourceId: %s",sourceId)
 			return '{"success":false, "message":"Invalid bible sourceId"}'
 		#Check if audio bible exists
@@ -3457,8 +4014,10 @@ def addAudioBible():
 			#Insert row in table
 			cursor.execute('insert into audio_bibles (source_id, name, url, books, format, status) values \
 				(%s, %s, %s, %s, %s,true)', (sourceId, name, url, books, format,))
+			bumpContentVersion(cursor, sourceId)
 			connection.commit()
 			cursor.close()
+			invalidateSource(sourceId)
 			log.info("Audio bible added successfully")
 			return '{"success": true, "message":"Audio bible added successfully"}'
 		else:
@@ -3493,8 +4052,7 @@ def getAudioBibles():
 		#use language code param to filter by language
 		lang_code = request.args.get('language')
 		if lang_code and lang_code.strip():
-			cursor.execute("select language_id from languages where language_code=%s", (lang_code,))
-			language_id = cursor.fetchone()
+			language_id = getLanguageByCode(lang_code)
 			if not language_id or language_id is None:
 				return '{"success": false, "message":""message":"language code not available.""}'
 			cursor.execute(query + " and s.language_id in(%s)", (language_id[0],))
@@ -3592,8 +4150,7 @@ def getVideos():
 		#use language code param to filter by language
 		lang_code = request.args.get('language')
 		if lang_code and lang_code.strip():
-			cursor.execute("select language_id from languages where language_code=%s", (lang_code,))
-			language_id = cursor.fetchone()
+			language_id = getLanguageByCode(lang_code)
 			if not language_id or language_id is None:
 				return '{"success": false, "message":""message":"language code not available.""}'
 			cursor.execute(query + " and l.language_id in(%s)", (language_id[0],))
@@ -3650,8 +4207,7 @@ def getBookNames():
 		#use language code param to filter by language
 		lang_code = request.args.get('language')
 		if lang_code and lang_code.strip():
-			cursor.execute("select language_id from languages where language_code=%s", (lang_code,))
-			language_id = cursor.fetchone()
+			language_id = getLanguageByCode(lang_code)
 			if not language_id or language_id is None:
 				return '{"success": false, "message":""message":"language code not available.""}'
 			cursor.execute(query + " and l.language_id in(%s)", (language_id[0],))
@@ -3673,26 +4229,61 @@ def getBookNames():
 
 @app.route("/v1/search/<sourceId>", methods=["GET"])
 def searchBible(sourceId):
-	'''Fetch the bible verses with the given keyword in the specified sourceId clear text bible'''
+	'''
+	Fetch the bible verses with the given keyword in the specified sourceId clear text bible.
+	With ?limit or ?cursor the verses come in pages in the order of the bible, with the cursor of
+	the next page; the first page also has the total (and the per book counts with ?facets=book).
+	'''
 	try:
 		connection = get_db()
 		cursor = connection.cursor()
-		cursor.execute("select table_name from sources where source_id=%s", (sourceId,))
-		tableName = cursor.fetchone()
-		if not tableName:
+		source = getSource(sourceId)
+		if not source:
 			return '{"success":false, "message":"Invalid source Id"}'
 		keyword = request.args.get('keyword')
 		if not keyword:
 			return '{"success":false, "message":"Keyword empty"}'
-		cursor.execute("select book_id,book_code from bible_books_look_up")
-		rst = cursor.fetchall()
+		try:
+			limit, after = pageArguments()
+		except ValueError:
+			return '{"success":false, "message":"Invalid limit or cursor"}'
 		bookMap={}
-		for book_id,book_code in rst:
+		for book_id,book_name,book_code in reference_cache.get("books")["rows"]:
 			bookMap[str(book_id)]=book_code
-		cursor.execute(sql.SQL("select ref_id,verse from {} where verse ~* {}").\
-			format(sql.Identifier(tableName[0] + "_cleaned"),sql.Literal(keyword)))
-		rst = cursor.fetchall()
-		if not rst:
+		table = sql.Identifier(source["tableName"] + "_cleaned")
+		page = {}
+		if limit is not None or after is not None:
+			limit = limit or 100
+			if request.args.get('mode') == 'fts':
+				matches = sql.SQL("from {} where search_vector @@ plainto_tsquery('simple', %s)").format(table)
+			else:
+				matches = sql.SQL("from {} where verse ~* %s").format(table)
+			cursor.execute(sql.SQL("select ref_id,verse {} and ref_id > %s order by ref_id limit %s").\
+				format(matches), (keyword, after or 0, limit + 1))
+			rst = cursor.fetchall()
+			page["nextCursor"] = str(rst[limit - 1][0]) if len(rst) > limit else None
+			rst = rst[:limit]
+			if after is None:
+				if request.args.get('facets') == 'book':
+					counts = countByBook(cursor, matches, (keyword,))
+					page["facets"] = bookFacets(counts)
+					page["facetsExact"] = True
+					page["total"], page["totalExact"] = sum(count for bookId, count in counts), True
+				elif page["nextCursor"] is None:
+					page["total"], page["totalExact"] = len(rst), True
+				else:
+					page["total"], page["totalExact"] = countMatches(cursor, matches, (keyword,))
+		elif request.args.get('mode') == 'fts':
+			# words of the keyword looked up in the full text index, best matches first
+			cursor.execute(sql.SQL("select ref_id,verse from {}, plainto_tsquery('simple', %s) query \
+				where search_vector @@ query order by ts_rank(search_vector, query) desc, ref_id").\
+					format(table), (keyword,))
+			rst = cursor.fetchall()
+		else:
+			cursor.execute(sql.SQL("select ref_id,verse from {} where verse ~* {}").\
+				format(table,sql.Literal(keyword)))
+			rst = cursor.fetchall()
+		if not rst and after is None:
 			return '{"success":false, "message":"Keyword not found in bible"}'
 		result =[]
 		for ref_id,verse in rst:
@@ -3700,11 +4291,84 @@ def searchBible(sourceId):
 			bookCode = bookMap[ref[-8:-6]]
 			result.append({'bookCode':bookCode,'chapter':int(ref[-6:-3]),'verse': int(ref[-3:]),'text':verse})
 		searchResult = {'sourceId':sourceId,'keyword':keyword,'result':result}
+		searchResult.update(page)
 		return json.dumps(searchResult)
 	except Exception as ex:
 		traceback.print_exc()
 		return '{"success":false, "message":"%s"}' % (str(ex))
 
+search_source_limit = 20
+
+@app.route("/v1/search", methods=["GET"])
+def searchBibles():
+	'''
+	Fetch the verses with the given keyword in several active bibles, given as sourceIds=1,2,3 or as
+	the bibles of language=hin (or language=hin,mal). Every bible gets at most ?limit verses
+	(default 100), in the order of the bible, or best matches first with mode=fts. All the bibles
+	are searched with one query.
+	'''
+	try:
+		keyword = request.args.get('keyword')
+		if not keyword:
+			return '{"success":false, "message":"Keyword empty"}'
+		try:
+			limit = int(request.args.get('limit') or 100)
+		except ValueError:
+			limit = 0
+		if not 0 < limit <= verse_range_limit:
+			return '{"success":false, "message":"Invalid limit"}'
+		cursor = get_db().cursor()
+		if request.args.get('sourceIds'):
+			try:
+				sourceIds = [int(sourceId) for sourceId in request.args.get('sourceIds').split(",")]
+			except ValueError:
+				return '{"success": false, "message":"Give the bibles as sourceIds=1,2,3"}'
+			sourceIds = list(dict.fromkeys(sourceIds))
+			if len(sourceIds) > search_source_limit:
+				return '{"success": false, "message":"Search at most %s bibles"}' % search_source_limit
+			tableNames = {}
+			for sourceId in sourceIds:
+				source = getSource(sourceId)
+				if not source or source["contentType"] != "bible" or not source["status"]:
+					return '{"success":false, "message":"Source %s doesn\'t exist"}' % sourceId
+				tableNames[sourceId] = source["tableName"]
+		elif request.args.get('language'):
+			cursor.execute("select s.source_id, s.table_name from sources s join languages l on \
+				s.language_id=l.language_id where s.content_id=1 and s.status=true and \
+					l.language_code = any(%s) order by s.source_id", (request.args.get('language').split(","),))
+			tableNames = dict(cursor.fetchall())
+			sourceIds = list(tableNames)
+			if not sourceIds:
+				return '{"success":false, "message":"No bibles in this language"}'
+		else:
+			return '{"success":false, "message":"Give the bibles as sourceIds=1,2,3 or language=hin"}'
+		if len(sourceIds) > search_source_limit:
+			return '{"success": false, "message":"Search at most %s bibles"}' % search_source_limit
+		if request.args.get('mode') == 'fts':
+			match = sql.SQL("search_vector @@ plainto_tsquery('simple', %(keyword)s)")
+			rank = sql.SQL("ts_rank(search_vector, plainto_tsquery('simple', %(keyword)s))")
+		else:
+			match = sql.SQL("verse ~* %(keyword)s")
+			rank = sql.SQL("0")
+		searches = [sql.SQL("(select {}, ref_id, verse, {} as rank from {} where {} order by rank desc, ref_id \
+			limit %(limit)s)").format(sql.Literal(sourceId), rank, sql.Identifier(tableNames[sourceId] + "_cleaned"), \
+				match) for sourceId in sourceIds]
+		cursor.execute(sql.SQL(" union all ").join(searches), {"keyword": keyword, "limit": limit + 1})
+		rst = sorted(cursor.fetchall(), key=lambda row: (-row[3], row[1]))
+		cursor.close()
+		results = dict((sourceId, {"sourceId": sourceId, "result": [], "more": False}) for sourceId in sourceIds)
+		for sourceId, refId, text, _ in rst:
+			sourceResult = results[sourceId]
+			if len(sourceResult["result"]) == limit:
+				sourceResult["more"] = True
+				continue
+			sourceResult["result"].append({'bookCode': getBookById(refId // 1000000)[1], \
+				'chapter': refId // 1000 % 1000, 'verse': refId % 1000, 'text': text})
+		return json.dumps({'keyword': keyword, 'sourceIds': sourceIds, 'results': list(results.values())})
+	except Exception as ex:
+		traceback.print_exc()
+		return '{"success":false, "message":"%s"}' % (str(ex))
+
 @app.route("/v1/sources/metadata", methods=["PUT"])
 @check_token
 def addmetadata():
@@ -3730,7 +4394,9 @@ def addmetadata():
 		# append/overwrite new metadata to the existing and update in db
 		metadata.update(newMetadata)
 		cursor.execute(sql.SQL("update sources set metadata=%s where source_id=%s"),(json.dumps(metadata),int(sourceId)))
+		bumpContentVersion(cursor, sourceId)
 		connection.commit()
+		invalidateSource(sourceId)
 		cursor.close()
 		log.info("Metadata Updated Successfully to SourceId: %s",sourceId)
 		return '{"success":true, "message":"Metadata Updated"}'
@@ -3753,8 +4419,7 @@ def addbiblebooknames():
         bibleBookNames = req["bibleBookNames"]
         connection = get_db()
         cursor = connection.cursor()
-        cursor.execute("select language_id from languages where language_code=%s", (language,))
-        rst = cursor.fetchone()
+        rst = getLanguageByCode(language)
         if not rst:
             cursor.close()
             log.warning("Exiting addbiblebooknames: Language code not found %s",language)
@@ -3763,9 +4428,8 @@ def addbiblebooknames():
         cursor.execute("select book_id from bible_book_names where language_id=%s",(languageId,))
         rst = cursor.fetchall()
         bookIds = [b[0] for b in rst]
-        cursor.execute("select book_id,book_code from bible_books_look_up")
-        rst = cursor.fetchall()
-        bookMap = {row[1]:row[0] for row in rst}
+        rst = reference_cache.get("books")["rows"]
+        bookMap = {row[2]:row[0] for row in rst}
         bookData = []
         added = []
         skipped = []
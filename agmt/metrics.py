@@ -0,0 +1,222 @@
+import os
+import json
+import time
+import threading
+from psycopg2 import extensions
+
+# Per route request metrics for the API, rendered in the Prometheus text format by /v1/metrics.
+# main.py starts a record in before_request and closes it in after_request. Every statement run
+# through an InstrumentedCursor (the cursor factory of the pool connections) in between is
+# counted against that request, which shows N+1 query patterns per route.
+#
+# Each worker keeps its own numbers. When AGMT_METRICS_DIR is set, workers also write them to
+# <dir>/<pid>.json and /v1/metrics adds up the files of all running workers. Files of workers that
+# have exited are removed, so the numbers of a restarted server start again from zero.
+
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+STATEMENT_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+SNAPSHOT_INTERVAL = 5
+
+_current = threading.local()
+
+class InstrumentedCursor(extensions.cursor):
+	'''psycopg2 cursor that counts statements and the time spent on them for the current request.'''
+
+	def execute(self, query, vars=None):
+		start = time.time()
+		try:
+			return super(InstrumentedCursor, self).execute(query, vars)
+		finally:
+			record_statement(time.time() - start)
+
+	def executemany(self, query, vars_list):
+		start = time.time()
+		try:
+			return super(InstrumentedCursor, self).executemany(query, vars_list)
+		finally:
+			record_statement(time.time() - start)
+
+def record_statement(duration):
+	if getattr(_current, "active", False):
+		_current.statements += 1
+		_current.db_time += duration
+
+def start_request():
+	_current.active = True
+	_current.started = time.time()
+	_current.statements = 0
+	_current.db_time = 0.0
+
+def current_statements():
+	'''Number of statements run so far by the request of this thread, None outside a request.'''
+	if not getattr(_current, "active", False):
+		return None
+	return _current.statements
+
+def end_request():
+	'''Stops counting for this thread and returns (duration, statements, db time) of the request.'''
+	if not getattr(_current, "active", False):
+		return None
+	_current.active = False
+	return time.time() - _current.started, _current.statements, _current.db_time
+
+def _empty_route():
+	return {
+		"count": 0,
+		"latencyBuckets": [0] * len(LATENCY_BUCKETS),
+		"latencySum": 0.0,
+		"statementBuckets": [0] * len(STATEMENT_BUCKETS),
+		"statementSum": 0,
+		"dbSeconds": 0.0,
+		"responseBytes": 0,
+		"statuses": {}
+	}
+
+def _observe(buckets, bounds, value):
+	for i, bound in enumerate(bounds):
+		if value <= bound:
+			buckets[i] += 1
+
+class Registry(object):
+
+	def __init__(self, directory=None):
+		self.directory = directory
+		self.pid = os.getpid()
+		self._routes = {}
+		self._lock = threading.Lock()
+		self._snapshot_at = 0
+		if directory:
+			self.remove_stale_snapshots()
+
+	def observe(self, route, method, status, duration, statements, db_time, size):
+		'''Adds one finished request. size is None for streamed responses.'''
+		with self._lock:
+			if self.pid != os.getpid():
+				# forked from a process that already served requests
+				self.pid = os.getpid()
+				self._routes = {}
+			stats = self._routes.setdefault("%s %s" % (method, route), _empty_route())
+			stats["count"] += 1
+			_observe(stats["latencyBuckets"], LATENCY_BUCKETS, duration)
+			stats["latencySum"] += duration
+			_observe(stats["statementBuckets"], STATEMENT_BUCKETS, statements)
+			stats["statementSum"] += statements
+			stats["dbSeconds"] += db_time
+			if size is not None:
+				stats["responseBytes"] += size
+			status = str(status)
+			stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+			due = self.directory and time.time() - self._snapshot_at > SNAPSHOT_INTERVAL
+		if due:
+			self.write_snapshot()
+
+	def routes(self):
+		with self._lock:
+			return json.loads(json.dumps(self._routes))
+
+	def write_snapshot(self):
+		routes = self.routes()
+		self._snapshot_at = time.time()
+		path = os.path.join(self.directory, "%s.json" % os.getpid())
+		with open(path + ".tmp", "w") as f:
+			json.dump(routes, f)
+		os.rename(path + ".tmp", path)
+
+	def remove_stale_snapshots(self):
+		'''Deletes the snapshot files of workers that are no longer running.'''
+		for name in os.listdir(self.directory):
+			if name.endswith(".json") and not _running(name[:-len(".json")]):
+				try:
+					os.remove(os.path.join(self.directory, name))
+				except OSError:
+					pass
+
+	def collect(self):
+		'''Numbers of this worker, or of all running workers when a metrics directory is used.'''
+		if not self.directory:
+			return self.routes()
+		self.write_snapshot()
+		self.remove_stale_snapshots()
+		merged = {}
+		for name in os.listdir(self.directory):
+			if not name.endswith(".json"):
+				continue
+			try:
+				with open(os.path.join(self.directory, name)) as f:
+					routes = json.load(f)
+			except (IOError, ValueError):
+				continue
+			for key, stats in routes.items():
+				total = merged.setdefault(key, _empty_route())
+				for field in ["count", "latencySum", "statementSum", "dbSeconds", "responseBytes"]:
+					total[field] += stats[field]
+				for field in ["latencyBuckets", "statementBuckets"]:
+					total[field] = [a + b for a, b in zip(total[field], stats[field])]
+				for status, count in stats["statuses"].items():
+					total["statuses"][status] = total["statuses"].get(status, 0) + count
+		return merged
+
+def _running(pid):
+	'''True when a process with this id (a snapshot file name) exists.'''
+	try:
+		os.kill(int(pid), 0)
+	except ValueError:
+		return False
+	except PermissionError:
+		return True
+	except OSError:
+		return False
+	return True
+
+def _labels(**labels):
+	def escape(value):
+		return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+	return "{" + ",".join('%s="%s"' % (k, escape(v)) for k, v in sorted(labels.items())) + "}"
+
+def _histogram(lines, name, labels, bounds, buckets, total, count):
+	for bound, value in zip(bounds, buckets):
+		lines.append("%s_bucket%s %s" % (name, _labels(le=bound, **labels), value))
+	lines.append("%s_bucket%s %s" % (name, _labels(le="+Inf", **labels), count))
+	lines.append("%s_sum%s %s" % (name, _labels(**labels), total))
+	lines.append("%s_count%s %s" % (name, _labels(**labels), count))
+
+def render(routes, pool_stats=None):
+	'''Prometheus text exposition of the collected route numbers and the pool of this worker.'''
+	lines = []
+	families = [
+		("agmt_request_duration_seconds", "histogram", "Time taken to serve a request."),
+		("agmt_request_sql_statements", "histogram", "SQL statements run by a request."),
+		("agmt_request_db_seconds_total", "counter", "Time spent in SQL statements."),
+		("agmt_response_bytes_total", "counter", "Bytes in response bodies, streamed responses excluded."),
+		("agmt_requests_total", "counter", "Requests served by status code.")
+	]
+	for name, kind, help_text in families:
+		lines.append("# HELP %s %s" % (name, help_text))
+		lines.append("# TYPE %s %s" % (name, kind))
+		for key in sorted(routes):
+			stats = routes[key]
+			method, route = key.split(" ", 1)
+			labels = {"method": method, "route": route}
+			if name == "agmt_request_duration_seconds":
+				_histogram(lines, name, labels, LATENCY_BUCKETS, stats["latencyBuckets"], \
+					stats["latencySum"], stats["count"])
+			elif name == "agmt_request_sql_statements":
+				_histogram(lines, name, labels, STATEMENT_BUCKETS, stats["statementBuckets"], \
+					stats["statementSum"], stats["count"])
+			elif name == "agmt_request_db_seconds_total":
+				lines.append("%s%s %s" % (name, _labels(**labels), stats["dbSeconds"]))
+			elif name == "agmt_response_bytes_total":
+				lines.append("%s%s %s" % (name, _labels(**labels), stats["responseBytes"]))
+			else:
+				for status in sorted(stats["statuses"]):
+					lines.append("%s%s %s" % (name, _labels(status=status, **labels), stats["statuses"][status]))
+	if pool_stats:
+		pid = pool_stats["pid"]
+		for field, name, kind in [("size", "size", "gauge"), ("idle", "idle", "gauge"), \
+			("inUse", "in_use", "gauge"), ("max", "max", "gauge"), ("checkouts", "checkouts_total", "counter"), \
+				("waits", "waits_total", "counter"), ("timeouts", "timeouts_total", "counter"), \
+					("healthcheckFailures", "healthcheck_failures_total", "counter")]:
+			name = "agmt_dbpool_%s" % name
+			lines.append("# TYPE %s %s" % (name, kind))
+			lines.append("%s%s %s" % (name, _labels(pid=pid), pool_stats[field]))
+	return "\n".join(lines) + "\n"
@@ -0,0 +1,67 @@
+import re
+import bisect
+import unicodedata
+from array import array
+
+# Inverted index of the verse text of a bible, for concordances: every word maps to the sorted
+# ref_ids of the verses it occurs in. Postings are array('i') (4 bytes a verse), so the index of
+# a whole bible takes a few MB. A token of several words is looked up by intersecting the postings
+# of its words; the verses found are then checked for the words being next to each other.
+#
+# Words are the runs of text between spaces and punctuation, in Unicode NFC form. Case is kept,
+# so a token matches the same verses as the substring search of the concordance (apart from
+# matching whole words only). An index is never changed once built, so requests can share it.
+
+WORD_PATTERN = re.compile(r'[^\s!"#$%&\\\'()*+,./:;<=>?@\[\]^_`{|}~“”‘’।॥—]+')
+
+def words(text):
+	'''The words of a text, in order.'''
+	return WORD_PATTERN.findall(unicodedata.normalize("NFC", text or ""))
+
+def contains_words(text, token_words):
+	'''True when the words of a token occur one after the other in a text.'''
+	text_words = words(text)
+	size = len(token_words)
+	return any(text_words[i:i + size] == token_words for i in range(len(text_words) - size + 1))
+
+class WordIndex(object):
+	'''{word: array('i') of ref_ids} of the verses of a bible.'''
+
+	def __init__(self, postings=None):
+		self.postings = postings or {}
+
+	@classmethod
+	def build(cls, verses):
+		'''Index of (ref_id, verse text) rows.'''
+		lists = {}
+		for ref_id, text in sorted(verses, key=lambda verse: verse[0]):
+			for word in set(words(text)):
+				lists.setdefault(word, []).append(ref_id)
+		return cls(dict((word, array('i', ref_ids)) for word, ref_ids in lists.items()))
+
+	def added(self, verses):
+		'''A new index with (ref_id, verse text) rows added. Postings of the other words are shared.'''
+		added = WordIndex.build(verses).postings
+		postings = dict(self.postings)
+		for word, ref_ids in added.items():
+			if word in postings:
+				postings[word] = array('i', sorted(set(postings[word]).union(ref_ids)))
+			else:
+				postings[word] = ref_ids
+		return WordIndex(postings)
+
+	def lookup(self, token_words):
+		'''Sorted ref_ids of the verses having every one of the words (in any order).'''
+		lists = sorted((self.postings.get(word, ()) for word in set(token_words)), key=len)
+		if not lists:
+			return []
+		result = list(lists[0])
+		for postings in lists[1:]:
+			result = [ref_id for ref_id in result if _contains(postings, ref_id)]
+			if not result:
+				break
+		return result
+
+def _contains(postings, ref_id):
+	position = bisect.bisect_left(postings, ref_id)
+	return position < len(postings) and postings[position] == ref_id
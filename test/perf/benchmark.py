@@ -0,0 +1,169 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import seed
+import psycopg2
+
+# Times the main read and write endpoints against the local database built by seed.py and writes
+# the results as a JSON baseline. Passing an earlier baseline with --compare reports every scenario
+# that got slower than the tolerance allows or runs more SQL statements, and exits with status 1.
+#
+#   python3 test/perf/benchmark.py --output baseline.json
+#   python3 test/perf/benchmark.py --compare baseline.json --tolerance 0.25
+
+def read_scenarios(sourceId):
+	'''(name, path) of the GET requests to time. All of them read the synthetic bible.'''
+	return [
+		("bibles", "/v1/bibles"),
+		("bible languages", "/v1/bibles/languages"),
+		("books", "/v1/bibles/%s/books" % sourceId),
+		("books-chapters", "/v1/bibles/%s/books-chapters" % sourceId),
+		("book json", "/v1/bibles/%s/books/psa/json" % sourceId),
+		("book chapters", "/v1/bibles/%s/books/psa/chapters" % sourceId),
+		("chapter", "/v1/bibles/%s/books/psa/chapter/119" % sourceId),
+		("chapter verse ids", "/v1/bibles/%s/books/psa/chapters/119/verses" % sourceId),
+		("verse", "/v1/bibles/%s/books/jhn/chapters/3/verses/16" % sourceId),
+		("verse by id", "/v1/bibles/%s/verses/jhn.3.16" % sourceId),
+		("verse range", "/v1/bibles/%s/verses/gen.1.26/gen.2.3" % sourceId),
+		("parallel chapter", "/v1/bibles/parallel?sourceIds=%s,%s&chapter=psa.119" % (sourceId, sourceId)),
+		("chapter clean text", "/v1/sources/%s/clean/19/119" % sourceId),
+		("book usfm", "/v1/sources/%s/usfm/19" % sourceId),
+		("whole bible json", "/v1/bibles/%s/json" % sourceId),
+		("whole bible usfm", "/v1/bibles/%s/usfm" % sourceId),
+		("search", "/v1/search/%s?keyword=covenant" % sourceId),
+		("search fts", "/v1/search/%s?keyword=covenant&mode=fts" % sourceId),
+		("search bibles", "/v1/search?keyword=covenant&sourceIds=%s,%s" % (sourceId, sourceId)),
+		("search language", "/v1/search?keyword=covenant&language=%s&mode=fts" % seed.LANGUAGE_CODE),
+		("search page", "/v1/search/%s?keyword=covenant&limit=20&facets=book" % sourceId),
+		("concordance", "/v1/concordances/%s/gen/covenant" % sourceId),
+		("concordance substring page", "/v1/concordances/%s/gen/coven?match=substring&limit=20&facets=book" % sourceId)
+	]
+
+def route_statements(main):
+	'''Total SQL statements and requests recorded so far, per route.'''
+	return dict((key, (stats["statementSum"], stats["count"])) \
+		for key, stats in main.metrics_registry.routes().items())
+
+def measure(main, call, iterations):
+	'''Runs call() once to warm the caches and then `iterations` times.
+	Returns the timings in milliseconds and the SQL statements of one call.'''
+	call()
+	before = route_statements(main)
+	timings = []
+	for _ in range(iterations):
+		start = time.time()
+		call()
+		timings.append((time.time() - start) * 1000)
+	after = route_statements(main)
+	statements = 0
+	for key, (total, count) in after.items():
+		previous = before.get(key, (0, 0))
+		if count > previous[1]:
+			statements += (total - previous[0]) / float(count - previous[1])
+	return timings, statements
+
+def summarise(timings, statements, size=None):
+	timings = sorted(timings)
+	result = {
+		"iterations": len(timings),
+		"medianMs": round(timings[len(timings) // 2], 2),
+		"p95Ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+		"minMs": round(timings[0], 2),
+		"statements": round(statements, 1)
+	}
+	if size is not None:
+		result["responseBytes"] = size
+	return result
+
+def run(iterations, writeIterations):
+	main, client, token, sourceId, _ = seed.seed()
+	results = {}
+	for name, path in read_scenarios(sourceId):
+		resp = client.get(path)
+		if resp.status_code != 200:
+			raise Exception("%s returned %s: %s" % (path, resp.status_code, resp.get_data(as_text=True)[:200]))
+		size = len(resp.get_data())
+		timings, statements = measure(main, lambda: client.get(path).get_data(), iterations)
+		results[name] = summarise(timings, statements, size)
+		print("%-22s median %8.2f ms  p95 %8.2f ms  %6.1f statements" % \
+			(name, results[name]["medianMs"], results[name]["p95Ms"], statements))
+
+	# writes: every upload goes to a new source, so each call does the same amount of work
+	connection = psycopg2.connect(**seed.connect_kwargs(seed.PERF_DATABASE))
+	codes = seed.book_codes(connection)
+	connection.close()
+	layout = seed.bible_layout()
+	psalms = seed.synthetic_book(codes[19], layout[19])
+	headers = {"Authorization": "bearer " + token}
+	uploadTimings = []
+	uploadStatements = 0
+	for i in range(writeIterations):
+		target = seed.create_bible(client, token, "PRFW%s" % i)
+		before = route_statements(main)
+		start = time.time()
+		seed.upload_book(client, target, *psalms)
+		uploadTimings.append((time.time() - start) * 1000)
+		after = route_statements(main)
+		key = "POST /v1/bibles/upload"
+		uploadStatements += after[key][0] - before.get(key, (0, 0))[0]
+	# statements of one upload, like the read scenarios
+	results["upload psalms"] = summarise(uploadTimings, uploadStatements / float(max(writeIterations, 1)))
+	metadataBody = json.dumps({"sourceId": sourceId, "metadata": {"benchmark": True}})
+	timings, statements = measure(main, lambda: client.put('/v1/sources/metadata', \
+		headers=headers, data=metadataBody), iterations)
+	results["add metadata"] = summarise(timings, statements)
+	for name in ["upload psalms", "add metadata"]:
+		print("%-22s median %8.2f ms  p95 %8.2f ms  %6.1f statements" % \
+			(name, results[name]["medianMs"], results[name]["p95Ms"], results[name]["statements"]))
+	return {
+		"createdAt": datetime.datetime.utcnow().isoformat(),
+		"python": platform.python_version(),
+		"machine": platform.node(),
+		"iterations": iterations,
+		"scenarios": results
+	}
+
+def compare(current, baseline, tolerance):
+	'''Returns a message for every scenario that regressed against the baseline.'''
+	regressions = []
+	for name, old in baseline["scenarios"].items():
+		new = current["scenarios"].get(name)
+		if new is None:
+			regressions.append("%s: missing from this run" % name)
+			continue
+		if new["medianMs"] > old["medianMs"] * (1 + tolerance):
+			regressions.append("%s: median %.2f ms, baseline %.2f ms" % (name, new["medianMs"], old["medianMs"]))
+		if new["statements"] > old["statements"]:
+			regressions.append("%s: %s SQL statements, baseline %s" % (name, new["statements"], old["statements"]))
+	return regressions
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="Benchmark the API against a local Postgres")
+	parser.add_argument("--iterations", type=int, default=20, help="timed calls per read scenario")
+	parser.add_argument("--write-iterations", type=int, default=3, help="timed book uploads")
+	parser.add_argument("--output", help="write the results to this JSON file")
+	parser.add_argument("--compare", help="baseline JSON file to compare the results with")
+	parser.add_argument("--tolerance", type=float, default=0.2, \
+		help="allowed slow down of the median against the baseline, 0.2 = 20%%")
+	args = parser.parse_args()
+	# the app runs from the agmt folder, so resolve the file names first
+	output = os.path.abspath(args.output) if args.output else None
+	baselineFile = os.path.abspath(args.compare) if args.compare else None
+	current = run(args.iterations, args.write_iterations)
+	if output:
+		with open(output, "w") as f:
+			json.dump(current, f, indent=2, sort_keys=True)
+	if baselineFile:
+		with open(baselineFile) as f:
+			regressions = compare(current, json.load(f), args.tolerance)
+		for regression in regressions:
+			print("REGRESSION " + regression)
+		if regressions:
+			sys.exit(1)
+		print("No regressions against %s" % args.compare)
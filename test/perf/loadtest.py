@@ -0,0 +1,173 @@
+import json
+import time
+import random
+import argparse
+import threading
+import requests
+
+# Generates reader traffic against a running API server and reports latency percentiles and
+# throughput per endpoint. Each simulated reader picks an action at random, weighted like the
+# traffic of the mobile and web readers: reading on chapter by chapter (following the "next"
+# link of getChapter), opening single verses, searching, reading commentary and listing bibles.
+#
+#   python3 test/perf/seed.py          # prints the bible and commentary source ids
+#   AGMT_POSTGRES_DATABASE=agmt_perf gunicorn --workers 3 --bind :8000 main:app   # in agmt/
+#   python3 test/perf/loadtest.py --url http://localhost:8000 --source 1 --commentary 2 \
+#       --concurrency 20 --duration 60
+
+BOOKS = ["gen", "exo", "psa", "pro", "isa", "mat", "mrk", "luk", "jhn", "act", "rom", "rev"]
+SEARCH_WORDS = ["covenant", "light", "peace", "water", "mountain", "grace", "temple"]
+
+# action name: weight
+MIX = {
+	"getChapter": 50,
+	"getBibleVerseText2": 20,
+	"searchBible": 10,
+	"getCommentaryChapter": 12,
+	"getBibles": 8
+}
+
+class Stats(object):
+
+	def __init__(self):
+		self.timings = {}
+		self.errors = {}
+		self._lock = threading.Lock()
+
+	def add(self, endpoint, ms, ok):
+		with self._lock:
+			self.timings.setdefault(endpoint, []).append(ms)
+			if not ok:
+				self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+def percentile(sorted_values, fraction):
+	index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+	return sorted_values[index]
+
+class Reader(threading.Thread):
+	'''One simulated client with its own connection and reading position.'''
+
+	def __init__(self, number, args, stats, deadline):
+		threading.Thread.__init__(self, daemon=True)
+		self.args = args
+		self.stats = stats
+		self.deadline = deadline
+		self.rand = random.Random(args.seed + number)
+		self.session = requests.Session()
+		self.position = None
+		actions = [name for name in MIX if name != "getCommentaryChapter" or args.commentary]
+		self.actions = actions
+		self.weights = [MIX[name] for name in actions]
+
+	def call(self, endpoint, path):
+		start = time.time()
+		ok = False
+		body = None
+		try:
+			resp = self.session.get(self.args.url + path, timeout=self.args.timeout)
+			ok = resp.status_code == 200
+			body = resp.text
+			if ok and (body.startswith('{"success": false') or body.startswith('{"success":false')):
+				ok = False
+		except requests.RequestException:
+			pass
+		self.stats.add(endpoint, (time.time() - start) * 1000, ok)
+		return body if ok else None
+
+	def getChapter(self):
+		source = self.args.source
+		if not self.position or self.rand.random() < 0.1:
+			# start reading somewhere else
+			self.position = (self.rand.choice(BOOKS), self.rand.randint(1, 3))
+		book, chapter = self.position
+		body = self.call("getChapter", "/v1/bibles/%s/books/%s/chapter/%s" % (source, book, chapter))
+		nextChapter = json.loads(body).get("next") if body else None
+		if nextChapter:
+			self.position = (nextChapter["bibleBookCode"], nextChapter["chapterId"])
+		else:
+			self.position = None
+
+	def getBibleVerseText2(self):
+		book = self.rand.choice(BOOKS)
+		self.call("getBibleVerseText2", "/v1/bibles/%s/verses/%s.%s.%s" % \
+			(self.args.source, book, self.rand.randint(1, 3), self.rand.randint(1, 20)))
+
+	def searchBible(self):
+		self.call("searchBible", "/v1/search/%s?keyword=%s" % \
+			(self.args.source, self.rand.choice(SEARCH_WORDS)))
+
+	def getCommentaryChapter(self):
+		book = self.rand.choice(BOOKS)
+		self.call("getCommentaryChapter", "/v1/commentaries/%s/%s/%s" % \
+			(self.args.commentary, book, self.rand.randint(1, 3)))
+
+	def getBibles(self):
+		self.call("getBibles", "/v1/bibles")
+
+	def run(self):
+		done = 0
+		while time.time() < self.deadline and (not self.args.requests or done < self.args.requests):
+			action = self.rand.choices(self.actions, self.weights)[0]
+			getattr(self, action)()
+			done += 1
+			if self.args.think_time:
+				time.sleep(self.rand.uniform(0, 2 * self.args.think_time))
+
+def report(stats, elapsed):
+	'''Returns the per endpoint summary and prints it as a table.'''
+	summary = {}
+	print("%-22s %8s %7s %9s %9s %9s %9s" % ("endpoint", "requests", "errors", "req/s", "p50 ms", "p95 ms", "p99 ms"))
+	allTimings = []
+	for endpoint in sorted(stats.timings):
+		timings = sorted(stats.timings[endpoint])
+		allTimings.extend(timings)
+		summary[endpoint] = {
+			"requests": len(timings),
+			"errors": stats.errors.get(endpoint, 0),
+			"throughput": round(len(timings) / elapsed, 2),
+			"p50Ms": round(percentile(timings, 0.50), 2),
+			"p95Ms": round(percentile(timings, 0.95), 2),
+			"p99Ms": round(percentile(timings, 0.99), 2)
+		}
+	if allTimings:
+		allTimings.sort()
+		summary["all"] = {
+			"requests": len(allTimings),
+			"errors": sum(stats.errors.values()),
+			"throughput": round(len(allTimings) / elapsed, 2),
+			"p50Ms": round(percentile(allTimings, 0.50), 2),
+			"p95Ms": round(percentile(allTimings, 0.95), 2),
+			"p99Ms": round(percentile(allTimings, 0.99), 2)
+		}
+	for endpoint, row in sorted(summary.items(), key=lambda item: item[0] == "all"):
+		print("%-22s %8s %7s %9.2f %9.2f %9.2f %9.2f" % (endpoint, row["requests"], row["errors"], \
+			row["throughput"], row["p50Ms"], row["p95Ms"], row["p99Ms"]))
+	return summary
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="Mixed reader traffic against a running API server")
+	parser.add_argument("--url", default="http://localhost:8000", help="base url of the API server")
+	parser.add_argument("--source", type=int, required=True, help="bible source id to read")
+	parser.add_argument("--commentary", type=int, help="commentary source id, commentary reads are skipped without it")
+	parser.add_argument("--concurrency", type=int, default=10, help="number of simultaneous readers")
+	parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+	parser.add_argument("--requests", type=int, default=0, help="stop each reader after this many requests")
+	parser.add_argument("--think-time", type=float, default=0, help="mean pause between requests of a reader, in seconds")
+	parser.add_argument("--timeout", type=float, default=30, help="request timeout in seconds")
+	parser.add_argument("--seed", type=int, default=1, help="random seed, for repeatable traffic")
+	parser.add_argument("--output", help="write the summary to this JSON file")
+	args = parser.parse_args()
+	args.url = args.url.rstrip("/")
+	stats = Stats()
+	start = time.time()
+	readers = [Reader(i, args, stats, start + args.duration) for i in range(args.concurrency)]
+	for reader in readers:
+		reader.start()
+	for reader in readers:
+		reader.join()
+	elapsed = time.time() - start
+	summary = report(stats, elapsed)
+	if args.output:
+		with open(args.output, "w") as f:
+			json.dump({"concurrency": args.concurrency, "seconds": round(elapsed, 1), "endpoints": summary}, \
+				f, indent=2, sort_keys=True)
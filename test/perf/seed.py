@@ -0,0 +1,218 @@
+import os
+import re
+import sys
+import csv
+import json
+import random
+import datetime
+import psycopg2
+from psycopg2 import sql
+
+# Builds a local database for the performance scripts in this folder: the schema and lookup data
+# of DB/seed_DB.sql, a verified super admin and a synthetic bible with a verse for every row of
+# bcv_map (31k verses), uploaded through the API like a real one.
+#
+# The database is named by AGMT_PERF_DATABASE (default agmt_perf) on the server given by the
+# usual AGMT_POSTGRES_* variables. It is dropped and created again by create_database().
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+DB_DIR = os.path.join(REPO_DIR, 'DB')
+AGMT_DIR = os.path.join(REPO_DIR, 'agmt')
+
+PERF_DATABASE = os.environ.get("AGMT_PERF_DATABASE", "agmt_perf")
+ADMIN_EMAIL = "perf.admin@example.com"
+LANGUAGE_CODE = "hin"
+VERSION_CODE = "PRF"
+REVISION = "1"
+
+WORDS = ["lord", "god", "people", "land", "king", "son", "house", "day", "man", "word", "hand",
+	"heart", "light", "water", "city", "earth", "heaven", "spirit", "life", "name", "servant",
+	"father", "brother", "mother", "law", "covenant", "temple", "bread", "fire", "mountain",
+	"river", "sea", "tree", "voice", "peace", "blessed", "faith", "grace", "truth", "way"]
+
+def connect_kwargs(database):
+	return {
+		"dbname": database,
+		"user": os.environ.get("AGMT_POSTGRES_USER", "postgres"),
+		"password": os.environ.get("AGMT_POSTGRES_PASSWORD", "secret"),
+		"host": os.environ.get("AGMT_POSTGRES_HOST", "localhost"),
+		"port": os.environ.get("AGMT_POSTGRES_PORT", "5432")
+	}
+
+def create_database(name=PERF_DATABASE):
+	'''Drops and creates the benchmark database, then loads the schema and lookup tables.'''
+	admin = psycopg2.connect(**connect_kwargs("postgres"))
+	admin.autocommit = True
+	cursor = admin.cursor()
+	cursor.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(name)))
+	cursor.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(name)))
+	admin.close()
+	connection = psycopg2.connect(**connect_kwargs(name))
+	load_schema(connection)
+	connection.close()
+
+def load_schema(connection):
+	'''Runs DB/seed_DB.sql. Its psql \\COPY lines are replaced by COPY FROM STDIN of the csv files.'''
+	with open(os.path.join(DB_DIR, 'seed_DB.sql')) as f:
+		script = f.read()
+	copies = re.findall(r"^\\COPY (\w+) \(([\w,]+)\) FROM '([\w.]+)'.*$", script, re.MULTILINE)
+	script = re.sub(r"^\\COPY .*$", "", script, flags=re.MULTILINE)
+	cursor = connection.cursor()
+	cursor.execute(script)
+	for table, columns, filename in copies:
+		with open(os.path.join(DB_DIR, filename)) as f:
+			cursor.copy_expert("COPY %s (%s) FROM STDIN WITH CSV HEADER" % (table, columns), f)
+	connection.commit()
+
+def create_admin(connection):
+	'''Adds a verified super admin and returns its email id. It only signs in with a token
+	made by access_token(), so the password hash is a placeholder.'''
+	cursor = connection.cursor()
+	cursor.execute("insert into autographamt_users (first_name, last_name, email_id, password_hash, \
+		password_salt, created_at_date, verification_code, verified, role_id, status) values \
+			('perf', 'admin', %s, 'x', 'x', current_timestamp, 'x', true, 3, true)", (ADMIN_EMAIL,))
+	connection.commit()
+	return ADMIN_EMAIL
+
+def access_token(secret, email=ADMIN_EMAIL):
+	import jwt
+	token = jwt.encode({
+		'sub': email,
+		'exp': datetime.datetime.utcnow() + datetime.timedelta(days=1),
+		'role': 'sa',
+		'app': 'mt'
+		}, secret, algorithm='HS256')
+	return token.decode('utf-8') if isinstance(token, bytes) else token
+
+def bible_layout():
+	'''Returns {book id: {chapter: number of verses}} from DB/bcv_map.csv.'''
+	layout = {}
+	with open(os.path.join(DB_DIR, 'bcv_map.csv')) as f:
+		for row in csv.DictReader(f):
+			chapters = layout.setdefault(int(row["book"]), {})
+			chapter = int(row["chapter"])
+			chapters[chapter] = max(chapters.get(chapter, 0), int(row["verse"]))
+	return layout
+
+def synthetic_book(bookCode, chapters, seed=0):
+	'''Returns (usfm text, parsed json) of a book with generated verse text, as the upload API takes it.'''
+	rand = random.Random("%s-%s" % (seed, bookCode))
+	usfm = ["\\id %s" % bookCode.upper()]
+	parsedChapters = []
+	for chapter in sorted(chapters):
+		usfm.append("\\c %s" % chapter)
+		usfm.append("\\p")
+		contents = []
+		for verse in range(1, chapters[chapter] + 1):
+			text = " ".join(rand.choice(WORDS) for _ in range(rand.randint(8, 30))).capitalize() + "."
+			usfm.append("\\v %s %s" % (verse, text))
+			contents.append({"verseNumber": str(verse), "verseText": text, "contents": [text]})
+		parsedChapters.append({"chapterNumber": str(chapter), "contents": contents})
+	parsed = {"book": {"bookCode": bookCode.upper(), "description": bookCode.upper()}, \
+		"chapters": parsedChapters}
+	return "\n".join(usfm), parsed
+
+def book_codes(connection):
+	cursor = connection.cursor()
+	cursor.execute("select book_id, book_code from bible_books_look_up")
+	return dict(cursor.fetchall())
+
+def create_bible(client, token, versionCode=VERSION_CODE):
+	'''Creates an empty bible source through the API and returns its source id.'''
+	headers = {"Authorization": "bearer " + token}
+	resp = client.post('/v1/sources/bibles', headers=headers, data=json.dumps({
+		"languageCode": LANGUAGE_CODE,
+		"versionContentCode": versionCode,
+		"versionContentDescription": "Performance test bible",
+		"year": 2020,
+		"revision": REVISION,
+		"license": "CC BY SA"
+	}))
+	assert json.loads(resp.get_data(as_text=True))["success"], resp.get_data(as_text=True)
+	connection = psycopg2.connect(**connect_kwargs(PERF_DATABASE))
+	cursor = connection.cursor()
+	cursor.execute("select source_id from sources where table_name=%s", \
+		("%s_%s_%s_bible" % (LANGUAGE_CODE, versionCode.lower(), REVISION),))
+	sourceId = cursor.fetchone()[0]
+	connection.close()
+	return sourceId
+
+def upload_book(client, sourceId, usfm, parsed):
+	resp = client.post('/v1/bibles/upload', data=json.dumps({
+		"sourceId": sourceId,
+		"wholeUsfmText": usfm,
+		"parsedUsfmText": parsed
+	}))
+	assert json.loads(resp.get_data(as_text=True))["success"], resp.get_data(as_text=True)
+
+def upload_bible(client, sourceId, books=None):
+	'''Uploads the synthetic text of every book (or of the given book ids) to a bible source.'''
+	connection = psycopg2.connect(**connect_kwargs(PERF_DATABASE))
+	codes = book_codes(connection)
+	connection.close()
+	layout = bible_layout()
+	for bookId in sorted(books or layout):
+		usfm, parsed = synthetic_book(codes[bookId], layout[bookId])
+		upload_book(client, sourceId, usfm, parsed)
+
+def create_commentary(client, token, abbreviation="PRFC"):
+	'''Creates a commentary with an intro for every book and a note for every five verses.
+	Returns its source id.'''
+	layout = bible_layout()
+	rand = random.Random(abbreviation)
+	commentary = []
+	for bookId in sorted(layout):
+		commentary.append({"bookId": bookId, "chapter": 0, "verse": "0", "commentary": "Introduction"})
+		for chapter, verses in sorted(layout[bookId].items()):
+			for start in range(1, verses + 1, 5):
+				text = " ".join(rand.choice(WORDS) for _ in range(rand.randint(20, 60)))
+				commentary.append({"bookId": bookId, "chapter": chapter, \
+					"verse": "%s-%s" % (start, min(start + 4, verses)), "commentary": text})
+	headers = {"Authorization": "bearer " + token}
+	resp = client.post('/v1/sources/commentary', headers=headers, data=json.dumps({
+		"name": "Performance test commentary",
+		"abbreviation": abbreviation,
+		"revision": REVISION,
+		"license": "CC BY SA",
+		"year": 2020,
+		"language": LANGUAGE_CODE,
+		"commentary": commentary
+	}))
+	assert json.loads(resp.get_data(as_text=True))["success"], resp.get_data(as_text=True)
+	connection = psycopg2.connect(**connect_kwargs(PERF_DATABASE))
+	cursor = connection.cursor()
+	cursor.execute("select source_id from sources where table_name=%s", \
+		("%s_%s_%s_commentary" % (LANGUAGE_CODE, abbreviation.lower(), REVISION),))
+	sourceId = cursor.fetchone()[0]
+	connection.close()
+	return sourceId
+
+def load_app():
+	'''Imports main.py configured for the benchmark database and returns the Flask app module.
+	Mails are written to a file instead of being sent.'''
+	os.environ["AGMT_POSTGRES_DATABASE"] = PERF_DATABASE
+	os.environ.setdefault("AGMT_MAIL_TRANSPORT", "file")
+	os.chdir(AGMT_DIR)
+	if AGMT_DIR not in sys.path:
+		sys.path.insert(0, AGMT_DIR)
+	import main
+	return main
+
+def seed(commentary=False):
+	'''Creates the benchmark database with the full synthetic bible, and a commentary if asked.
+	Returns (main module, test client, token, bible source id, commentary source id or None).'''
+	create_database()
+	connection = psycopg2.connect(**connect_kwargs(PERF_DATABASE))
+	create_admin(connection)
+	connection.close()
+	main = load_app()
+	client = main.app.test_client()
+	token = access_token(main.jwt_hs256_secret)
+	sourceId = create_bible(client, token)
+	upload_bible(client, sourceId)
+	commentaryId = create_commentary(client, token) if commentary else None
+	return main, client, token, sourceId, commentaryId
+
+if __name__ == '__main__':
+	_, _, _, sourceId, commentaryId = seed(commentary=True)
+	print("Seeded database %s: bible source %s, commentary source %s" % (PERF_DATABASE, sourceId, commentaryId))
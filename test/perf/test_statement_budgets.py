@@ -0,0 +1,239 @@
+import os
+import sys
+import json
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+pytest.importorskip("flask")
+psycopg2 = pytest.importorskip("psycopg2")
+pytest.importorskip("jwt")
+import seed
+import benchmark
+
+# Every route declares the most SQL statements one request may run. The counts come from the
+# InstrumentedCursor of agmt/metrics.py, so they cover the statements of helper functions too.
+# A budget is what the handler runs plus room for the per-worker cache loads (sources, books,
+# languages) and a pool health check; it must not grow with the data, so a query per row, per
+# project or per token fails the requests below. New routes need an entry here.
+#
+# The requests run against the local database built by seed.py (AGMT_PERF_DATABASE); the module
+# is skipped when no Postgres server is reachable.
+
+BUDGETS = {
+	"GET /v1/stats/dbpool": 0,
+	"GET /v1/metrics": 0,
+	"GET /": 0,
+	"POST /v1/auth": 5,
+	"POST /v1/registrations": 5,
+	"POST /v1/resetpassword": 5,
+	"POST /v1/forgotpassword": 5,
+	"GET /v1/verifications/<code>": 5,
+	"GET /v1/autographamt/organisations": 6,
+	"POST /v1/autographamt/organisations": 8,
+	"GET /v1/autographamt/users": 5,
+	"GET /v1/autographamt/projects": 4,
+	"POST /v1/autographamt/organisations/projects": 7,
+	"GET /v1/autographamt/projects/assignments/<projectId>": 4,
+	"POST /v1/autographamt/projects/assignments": 8,
+	"DELETE /v1/autographamt/projects/assignments": 5,
+	"GET /v1/autographamt/projects/translations/<token>/<projectId>": 4,
+	"POST /v1/autographamt/projects/translations": 12,
+	"POST /v1/autographamt/projects/bulktranslations": 11,
+	"GET /v1/autographamt/users/projects": 5,
+	"POST /v1/autographamt/approvals/organisations": 7,
+	"GET /v1/autographamt/statistics/projects/<projectId>": 6,
+	"POST /v1/autographamt/approvals/users": 4,
+	"GET /v1/sources/books/<sourceId>": 4,
+	"GET /v1/sources/projects/books/<projectId>/<userId>": 6,
+	"GET /v1/tokenlist/<sourceId>/<book>": 5,
+	"GET /v1/tokentranslationlist/<projectId>/<book>": 8,
+	"GET /v1/concordances/<sourceId>/<book>/<token>": 6,
+	"GET /v1/contenttypes": 4,
+	"GET /v1/languages/<contentId>": 4,
+	"GET /v1/languages": 3,
+	"GET /v1/contentdetails": 3,
+	"POST /v1/sources/bibles": 10,
+	"POST /v1/bibles/upload": 6,
+	"POST /v1/updatetokentranslations": 8,
+	"GET /v1/info/translatedtokens": 3,
+	"GET /v1/translatedbooks/<sourceId>/<targetId>": 5,
+	"POST /v1/downloaddraft": 5,
+	"GET /v1/translationshelps/words/<sourceId>/<token>": 4,
+	"GET /v1/translations/<sourceId>/<targetLanguageId>/<token>": 4,
+	"GET /v1/translations/<sourceId>/<targetLanguageId>": 4,
+	"GET /v1/sources/<sourceid>/<outputtype>": 5,
+	"GET /v1/sources/<sourceid>/<outputtype>/<bookid>": 5,
+	"GET /v1/sources/<sourceid>/<outputtype>/<bookid>/<chapterid>": 5,
+	"DELETE /v1/autographamt/user/delete": 4,
+	"POST /v1/autographamt/user/activate": 5,
+	"DELETE /v1/autographamt/organisation/delete": 4,
+	"POST /v1/autographamt/organisation/activate": 5,
+	"DELETE /v1/autographamt/project/delete": 7,
+	"POST /v1/autographamt/project/activate": 9,
+	"DELETE /v1/autographamt/source/delete": 3,
+	"POST /v1/autographamt/source/activate": 5,
+	"GET /v1/sources": 4,
+	"GET /v1/bibles": 5,
+	"GET /v1/bibles/languages": 4,
+	"GET /v1/bibles/<sourceId>/books": 4,
+	"GET /v1/bibles/<sourceId>/books-chapters": 5,
+	"GET /v1/bibles/<sourceId>/<contentFormat>": 6,
+	"GET /v1/bibles/<sourceId>/books/<bookCode>/<contentFormat>": 5,
+	"GET /v1/bibles/<sourceId>/books/<biblebookCode>/chapters": 5,
+	"GET /v1/bibles/<sourceId>/books/<bookCode>/chapter/<chapterId>": 6,
+	"GET /v1/bibles/<sourceId>/books/<biblebookCode>/chapters/<chapterId>/verses": 5,
+	"GET /v1/bibles/<sourceId>/books/<bibleBookCode>/chapters/<chapterId>/verses/<verseId>": 4,
+	"GET /v1/bibles/<sourceId>/chapters/<chapterId>/verses": 5,
+	"GET /v1/bibles/<sourceId>/verses/<verseId>": 4,
+	"GET /v1/bibles/<sourceId>/verses/<startVerseId>/<endVerseId>": 4,
+	"POST /v1/bibles/<sourceId>/verses": 4,
+	"GET /v1/bibles/parallel": 5,
+	"POST /v1/sources/commentary": 7,
+	"GET /v1/commentaries": 5,
+	"GET /v1/commentaries/<sourceId>/<bookCode>/<chapterId>": 7,
+	"POST /v1/sources/dictionary": 7,
+	"GET /v1/dictionaries": 5,
+	"GET /v1/dictionaries/<sourceId>": 4,
+	"GET /v1/dictionaries/<sourceId>/<wordId>": 4,
+	"POST /v1/sources/infographic": 7,
+	"GET /v1/infographics/<languageCode>": 5,
+	"POST /v1/sources/audiobible": 5,
+	"GET /v1/audiobibles": 5,
+	"POST /v1/sources/video": 5,
+	"GET /v1/videos": 5,
+	"GET /v1/booknames": 5,
+	"GET /v1/search/<sourceId>": 5,
+	"GET /v1/search": 4,
+	"PUT /v1/sources/metadata": 5,
+	"POST /v1/biblebooknames": 5
+}
+
+MANAGER_EMAIL = "perf.manager@example.com"
+ORGANISATIONS = 3
+PROJECTS_PER_ORGANISATION = 2
+TOKENS = ["covenant", "light", "water", "peace", "grace", "temple", "bread", "fire", "river", "mountain"]
+
+def postgres_available():
+	try:
+		psycopg2.connect(**seed.connect_kwargs("postgres")).close()
+		return True
+	except psycopg2.OperationalError:
+		return False
+
+def create_projects(sourceId):
+	'''Adds an organisation manager owning a few organisations with projects, all assigned to the
+	admin, with translations in some of them. Returns (manager email, project ids).'''
+	connection = psycopg2.connect(**seed.connect_kwargs(seed.PERF_DATABASE))
+	cursor = connection.cursor()
+	cursor.execute("insert into autographamt_users (first_name, last_name, email_id, password_hash, \
+		password_salt, created_at_date, verification_code, verified, role_id, status) values \
+			('perf', 'manager', %s, 'x', 'x', current_timestamp, 'x', true, 2, true) returning user_id", \
+				(MANAGER_EMAIL,))
+	managerId = cursor.fetchone()[0]
+	cursor.execute("select user_id from autographamt_users where email_id=%s", (seed.ADMIN_EMAIL,))
+	adminId = cursor.fetchone()[0]
+	cursor.execute("select language_id from languages where language_code=%s", (seed.LANGUAGE_CODE,))
+	targetId = cursor.fetchone()[0]
+	projectIds = []
+	for i in range(ORGANISATIONS):
+		cursor.execute("insert into autographamt_organisations (organisation_name, organisation_address, \
+			organisation_phone, organisation_email, verified, user_id) values (%s, 'x', 'x', 'x', true, %s) \
+				returning organisation_id", ("Perf organisation %s" % i, managerId))
+		organisationId = cursor.fetchone()[0]
+		for j in range(PROJECTS_PER_ORGANISATION):
+			cursor.execute("insert into autographamt_projects (project_name, source_id, target_id, \
+				organisation_id) values (%s, %s, %s, %s) returning project_id", \
+					("Perf project %s-%s" % (i, j), sourceId, targetId, organisationId))
+			projectId = cursor.fetchone()[0]
+			projectIds.append(projectId)
+			cursor.execute("insert into autographamt_assignments (books, user_id, project_id) values \
+				('gen|psa|jhn', %s, %s)", (adminId, projectId))
+			if j == 0:
+				cursor.execute("insert into translations (token, translation, source_id, target_id, user_id) \
+					values (%s, %s, %s, %s, %s) returning translation_id", (TOKENS[0], "x", sourceId, targetId, adminId))
+				cursor.execute("insert into translation_projects_look_up (translation_id, project_id) values \
+					(%s, %s)", (cursor.fetchone()[0], projectId))
+	connection.commit()
+	connection.close()
+	return MANAGER_EMAIL, projectIds
+
+@pytest.fixture(scope="module")
+def app():
+	if not postgres_available():
+		pytest.skip("no local Postgres server")
+	seed.create_database()
+	connection = psycopg2.connect(**seed.connect_kwargs(seed.PERF_DATABASE))
+	seed.create_admin(connection)
+	connection.close()
+	main = seed.load_app()
+	client = main.app.test_client()
+	token = seed.access_token(main.jwt_hs256_secret)
+	sourceId = seed.create_bible(client, token)
+	# a few books are enough, budgets do not depend on the amount of text
+	seed.upload_bible(client, sourceId, books=[1, 19, 43])
+	managerEmail, projectIds = create_projects(sourceId)
+	managerToken = seed.access_token(main.jwt_hs256_secret, managerEmail)
+	return main, client, token, managerToken, sourceId, projectIds
+
+def count_statements(main, call):
+	'''Runs one request and returns ("METHOD rule" of the route that served it, SQL statements it ran).'''
+	before = benchmark.route_statements(main)
+	call()
+	after = benchmark.route_statements(main)
+	served = [key for key, (total, count) in after.items() if count > before.get(key, (0, 0))[1]]
+	assert len(served) == 1, served
+	key = served[0]
+	return key, after[key][0] - before.get(key, (0, 0))[0]
+
+def assert_budget(main, call):
+	key, statements = count_statements(main, call)
+	assert key in BUDGETS, "%s has no statement budget" % key
+	assert statements <= BUDGETS[key], "%s ran %s SQL statements, its budget is %s" % \
+		(key, statements, BUDGETS[key])
+
+def test_every_route_has_a_budget():
+	main = seed.load_app()
+	missing = []
+	for rule in main.app.url_map.iter_rules():
+		if rule.endpoint == "static":
+			continue
+		for method in rule.methods - set(["HEAD", "OPTIONS"]):
+			if "%s %s" % (method, rule.rule) not in BUDGETS:
+				missing.append("%s %s" % (method, rule.rule))
+	assert not missing, missing
+
+def test_read_budgets(app):
+	main, client, _, _, sourceId, _ = app
+	for _, path in benchmark.read_scenarios(sourceId):
+		assert_budget(main, lambda: client.get(path).get_data())
+
+def test_verse_batch_budget(app):
+	main, client, _, _, sourceId, _ = app
+	verseIds = ["psa.%s.%s" % (chapter, verse) for chapter in range(1, 51) for verse in (1, 2)]
+	assert_budget(main, lambda: client.post("/v1/bibles/%s/verses" % sourceId, \
+		data=json.dumps({"verseIds": verseIds})))
+
+def test_project_budgets(app):
+	main, client, token, managerToken, _, projectIds = app
+	admin = {"Authorization": "bearer " + token}
+	manager = {"Authorization": "bearer " + managerToken}
+	# organisation manager: the projects of every organisation they own
+	assert_budget(main, lambda: client.get("/v1/autographamt/projects", headers=manager))
+	assert_budget(main, lambda: client.get("/v1/autographamt/projects", headers=admin))
+	# translator: every assigned project
+	assert_budget(main, lambda: client.get("/v1/autographamt/users/projects", headers=admin))
+	assert_budget(main, lambda: client.get("/v1/info/translatedtokens", headers=admin))
+	assert_budget(main, lambda: client.get("/v1/autographamt/organisations", headers=manager))
+
+def test_bulk_translation_budget(app):
+	main, client, token, _, _, projectIds = app
+	headers = {"Authorization": "bearer " + token}
+	body = json.dumps({"projectId": projectIds[0], "tokenTranslations": [
+		{"token": word, "translation": word.upper(), "senses": "a,b"} for word in TOKENS]})
+	# the first call adds most tokens, the second one updates all of them
+	for _ in range(2):
+		assert_budget(main, lambda: client.post("/v1/autographamt/projects/bulktranslations", \
+			headers=headers, data=body))
+		resp = client.get("/v1/autographamt/projects/translations/%s/%s" % (TOKENS[1], projectIds[0]), \
+			headers=headers)
+		assert TOKENS[1].upper() in resp.get_data(as_text=True)
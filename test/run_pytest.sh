@@ -50,3 +50,21 @@ pytest test_updatetokentranslations.py
 pytest test_activateuser.py
 pytest test_getalllanguagescontent.py
 pytest test_uploadbooks.py
+pytest test_mailer.py
+pytest test_conditionalget.py
+pytest test_metrics.py
+pytest perf/test_statement_budgets.py
+pytest test_bookindex.py
+pytest test_chapterjson.py
+pytest test_rawjson.py
+pytest test_biblestream.py
+pytest test_compression.py
+pytest test_verserange.py
+pytest test_versebatch.py
+pytest test_parallelverses.py
+pytest test_verselist.py
+pytest test_searchfts.py
+pytest test_concordancetrgm.py
+pytest test_wordindex.py
+pytest test_searchpaging.py
+pytest test_searchbibles.py
@@ -0,0 +1,31 @@
+import pytest
+import requests
+import json
+
+@pytest.fixture
+def supply_url():
+	return "https://stagingapi.autographamt.com"
+
+#---------------whole bible downloads are sent book by book----------------#
+@pytest.mark.parametrize('contentFormat',[('json'),('usfm')])
+def test_biblestream_whole_bible(supply_url,contentFormat):
+	resp = requests.get(supply_url + '/v1/bibles/35/' + contentFormat, stream=True)
+	assert resp.status_code == 200
+	j = json.loads(resp.content.decode('utf-8'))
+	assert j['sourceId'] == '35', str(j)[:200]
+	assert 'gen' in j['bibleContent'], list(j['bibleContent'])
+	resp2 = requests.get(supply_url + '/v1/bibles/35/books/gen/' + contentFormat)
+	assert json.loads(resp2.text)['bookContent'] == j['bibleContent']['gen']
+
+def test_biblestream_source_json(supply_url):
+	resp = requests.get(supply_url + '/v1/sources/35/json', stream=True)
+	j = json.loads(resp.content.decode('utf-8'))
+	assert 'gen' in j, list(j)
+	resp2 = requests.get(supply_url + '/v1/sources/35/usfm', stream=True)
+	j2 = json.loads(resp2.content.decode('utf-8'))
+	assert '1' in j2, list(j2)
+
+def test_biblestream_invalid_type(supply_url):
+	resp = requests.get(supply_url + '/v1/bibles/35/pdf')
+	j = json.loads(resp.text)
+	assert j['success'] == False, str(j)
@@ -0,0 +1,50 @@
+import pytest
+import requests
+import json
+
+@pytest.fixture
+def supply_url():
+	return "https://stagingapi.autographamt.com"
+
+#---------------chapter counts of the book list and of a book agree----------------#
+@pytest.mark.parametrize('book',[('gen'),('psa'),('jhn')])
+def test_bookindex_chapter_counts(supply_url,book):
+	resp = requests.get(supply_url + '/v1/bibles/35/books-chapters')
+	j = json.loads(resp.text)
+	chapters = j[0]['books'][book]['chapters']
+	resp2 = requests.get(supply_url + '/v1/bibles/35/books/' + book + '/chapters')
+	j2 = json.loads(resp2.text)
+	assert len(j2) == chapters, str(j2)
+	assert j2[-1]['chapter']['number'] == chapters
+
+#---------------the last chapter of a book links to the next book----------------#
+def test_bookindex_last_chapter(supply_url):
+	resp = requests.get(supply_url + '/v1/bibles/35/books-chapters')
+	chapters = json.loads(resp.text)[0]['books']['gen']['chapters']
+	resp2 = requests.get(supply_url + '/v1/bibles/35/books/gen/chapter/' + str(chapters))
+	j = json.loads(resp2.text)
+	assert j['chapterId'] == chapters, str(j)
+	assert j['next']['bibleBookCode'] == 'exo'
+	assert j['next']['chapterId'] == 1
+
+def test_bookindex_book_not_uploaded(supply_url):
+	resp = requests.get(supply_url + '/v1/bibles/35/books/xyz/chapters')
+	j = json.loads(resp.text)
+	assert j['success'] == False, str(j)
+	assert j['message'] == "Book not uploaded"
+
+#---------------the first chapter of a book links to the last chapter of the book before----------------#
+def test_bookindex_first_chapter(supply_url):
+	resp = requests.get(supply_url + '/v1/bibles/35/books-chapters')
+	chapters = json.loads(resp.text)[0]['books']['gen']['chapters']
+	resp2 = requests.get(supply_url + '/v1/bibles/35/books/exo/chapter/1')
+	j = json.loads(resp2.text)
+	assert j['previous']['bibleBookCode'] == 'gen', str(j['previous'])
+	assert j['previous']['chapterId'] == chapters
+	assert j['next']['chapterId'] == 2
+
+def test_bookindex_invalid_chapter(supply_url):
+	resp = requests.get(supply_url + '/v1/bibles/35/books/gen/chapter/0')
+	j = json.loads(resp.text)
+	assert j['success'] == False, str(j)
+	assert j['message'] == "Invalid chapter id"
@@ -0,0 +1,24 @@
+import pytest
+import requests
+import json
+
+@pytest.fixture
+def supply_url():
+	return "https://stagingapi.autographamt.com"
+
+#---------------a chapter is served from the chapter wise JSON----------------#
+@pytest.mark.parametrize('bookCode,bookId,chapter',[('gen',1,1),('psa',19,23),('jhn',43,3)])
+def test_chapterjson_same_content(supply_url,bookCode,bookId,chapter):
+	resp = requests.get(supply_url + '/v1/bibles/35/books/%s/chapter/%s' % (bookCode, chapter))
+	j = json.loads(resp.text)
+	assert j['chapterId'] == chapter, str(j)
+	resp2 = requests.get(supply_url + '/v1/sources/35/json/%s/%s' % (bookId, chapter))
+	j2 = json.loads(resp2.text)
+	assert j2 == j['chapterContent']
+	assert str(j2['chapterNumber']) == str(chapter)
+
+def test_chapterjson_missing_chapter(supply_url):
+	resp = requests.get(supply_url + '/v1/sources/35/json/19/151')
+	j = json.loads(resp.text)
+	assert j['success'] == False, str(j)
+	assert j['message'] == "Book not available"
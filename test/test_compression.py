@@ -0,0 +1,59 @@
+import os
+import sys
+import gzip
+import pytest
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'agmt'))
+import compression
+
+class Accept(object):
+	'''Stands in for the parsed Accept-Encoding header: accepts the listed encodings in order.'''
+	def __init__(self, *encodings):
+		self.encodings = encodings
+
+	def best_match(self, offered, default=None):
+		for encoding in self.encodings:
+			if encoding in offered:
+				return encoding
+		return default
+
+def test_compression_artifact():
+	body = '{"verse": "%s"}' % ("In the beginning " * 200)
+	artifact = compression.CompressedCache(1024 * 1024).add("key", body)
+	assert artifact["identity"] == body.encode("utf-8")
+	assert gzip.decompress(artifact["gzip"]) == artifact["identity"]
+	assert len(artifact["gzip"]) < len(artifact["identity"])
+	if compression.brotli is not None:
+		assert compression.brotli.decompress(artifact["br"]) == artifact["identity"]
+
+def test_compression_small_bodies_are_kept_as_they_are():
+	artifact = compression.CompressedCache(1024).add("key", '{"success": true}')
+	assert list(artifact) == ["identity"]
+
+def test_compression_size_limit():
+	cache = compression.CompressedCache(20000)
+	for i in range(20):
+		cache.add(i, os.urandom(3000))
+	assert cache.get(0) is None
+	assert cache.get(19) is not None
+	assert sum(len(data) for key in range(20) for data in (cache.get(key) or {}).values()) <= 20000
+
+def test_compression_choose_encoding():
+	artifact = {"identity": b"x", "gzip": b"y", "br": b"z"}
+	assert compression.choose_encoding(Accept("gzip"), artifact) == "gzip"
+	assert compression.choose_encoding(Accept("br", "gzip"), artifact) == "br"
+	assert compression.choose_encoding(Accept(), artifact) == "identity"
+	assert compression.choose_encoding(Accept("gzip"), {"identity": b"x"}) == "identity"
+
+#---------------content endpoints send the encoding the client asks for----------------#
+@pytest.mark.parametrize('path',[('/v1/bibles/35/books/gen/chapter/1'),('/v1/bibles/35/books/gen/json')])
+def test_compression_staging(path):
+	url = "https://stagingapi.autographamt.com" + path
+	resp = requests.get(url, headers={'Accept-Encoding': 'gzip'})
+	assert resp.status_code == 200, resp.text
+	assert resp.headers.get('Content-Encoding') == 'gzip'
+	assert 'Accept-Encoding' in resp.headers.get('Vary', '')
+	plain = requests.get(url, headers={'Accept-Encoding': 'identity'})
+	assert 'Content-Encoding' not in plain.headers
+	assert plain.json() == resp.json()
@@ -0,0 +1,31 @@
+import pytest
+import requests
+import json
+
+@pytest.fixture
+def supply_url():
+	return "https://stagingapi.autographamt.com"
+
+#---------------concordance of a token in a book and in the other books----------------#
+def test_concordancetrgm_book(supply_url):
+	resp = requests.get(supply_url + '/v1/concordances/35/gen/light')
+	j = json.loads(resp.text)
+	assert j['gen'], str(j)[:200]
+	for verse in j['gen']:
+		assert verse['bookCode'] == 'gen'
+		assert 'light' in verse['verse']
+	assert len(j['all']) <= 100
+	assert 'gen' not in [verse['bookCode'] for verse in j['all']]
+
+#---------------wildcards and quotes in the token are matched literally----------------#
+@pytest.mark.parametrize('token',[('%'),('_'),("light'")])
+def test_concordancetrgm_literal(supply_url,token):
+	resp = requests.get(supply_url + '/v1/concordances/35/gen/' + requests.utils.quote(token))
+	j = json.loads(resp.text)
+	for verse in j['gen'] + j['all']:
+		assert token in verse['verse']
+
+def test_concordancetrgm_invalid_source(supply_url):
+	resp = requests.get(supply_url + '/v1/concordances/10/gen/light')
+	j = json.loads(resp.text)
+	assert j['success'] == False, str(j)
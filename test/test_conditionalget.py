@@ -0,0 +1,45 @@
+import pytest
+import requests
+import json
+
+@pytest.fixture
+def supply_url():
+	return "https://stagingapi.autographamt.com"
+
+#---------------content endpoints answer a revalidation with 304----------------#
+@pytest.mark.parametrize('path',[('/v1/bibles'),('/v1/bibles/35/books-chapters'), \
+	('/v1/bibles/35/books/gen/chapter/1')])
+def test_conditionalget_etag(supply_url,path):
+	url = supply_url + path
+	resp = requests.get(url)
+	assert resp.status_code == 200, resp.text
+	etag = resp.headers.get('ETag')
+	assert etag, resp.headers
+	resp2 = requests.get(url, headers={'If-None-Match': etag})
+	assert resp2.status_code == 304, resp2.text
+	assert resp2.text == ''
+	assert resp2.headers.get('ETag') == etag
+
+def test_conditionalget_last_modified(supply_url):
+	url = supply_url + '/v1/bibles/35/books/gen/chapter/1'
+	resp = requests.get(url)
+	lastModified = resp.headers.get('Last-Modified')
+	assert lastModified, resp.headers
+	resp2 = requests.get(url, headers={'If-Modified-Since': lastModified})
+	assert resp2.status_code == 304, resp2.text
+
+#---------------a changed or unknown etag gets the full response----------------#
+def test_conditionalget_stale(supply_url):
+	url = supply_url + '/v1/bibles/35/books/gen/chapter/1'
+	resp = requests.get(url, headers={'If-None-Match': 'W/"35-0-gen-1"'})
+	j = json.loads(resp.text)
+	assert resp.status_code == 200, resp.text
+	assert j['chapterId'] == 1, str(j)
+
+#---------------errors carry no validators----------------#
+def test_conditionalget_invalid_source(supply_url):
+	url = supply_url + '/v1/bibles/10/books-chapters'
+	resp = requests.get(url)
+	j = json.loads(resp.text)
+	assert j['success'] == False, str(j)
+	assert 'ETag' not in resp.headers
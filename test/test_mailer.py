@@ -0,0 +1,50 @@
+import os
+import sys
+import json
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'agmt'))
+import mailer
+
+class FlakyTransport(object):
+	'''Fails every message the first `failures` times it is offered.'''
+	def __init__(self, failures):
+		self.failures = failures
+		self.batches = []
+
+	def send(self, messages):
+		self.batches.append([m["subject"] for m in messages])
+		if self.failures > 0:
+			self.failures -= 1
+			return messages
+		return []
+
+#---------------queued mails are written by the file transport----------------#
+def test_mailer_file_transport(tmpdir):
+	path = str(tmpdir.join('mails.jsonl'))
+	mail_queue = mailer.MailQueue(mailer.FileTransport(path))
+	mail_queue.send('ag2@yopmail.com', 'Subject 1', 'Hello')
+	mail_queue.send(['a@yopmail.com', 'b@yopmail.com'], 'Subject 2', 'Hello')
+	assert mail_queue.flush(5)
+	with open(path) as f:
+		mails = [json.loads(line) for line in f]
+	assert [m['subject'] for m in mails] == ['Subject 1', 'Subject 2']
+	assert mails[0]['to'] == {'ag2@yopmail.com': ''}
+	assert mails[0]['from'] == mailer.DEFAULT_SENDER
+	assert set(mails[1]['to']) == {'a@yopmail.com', 'b@yopmail.com'}
+
+#---------------failed mails are retried----------------#
+def test_mailer_retry():
+	transport = FlakyTransport(2)
+	mail_queue = mailer.MailQueue(transport, max_retries=3, retry_delay=0.01)
+	mail_queue.send('ag2@yopmail.com', 'Subject 1', 'Hello')
+	assert mail_queue.flush(5)
+	assert len(transport.batches) == 3
+
+#---------------mails are dropped after the last retry----------------#
+def test_mailer_give_up():
+	transport = FlakyTransport(10)
+	mail_queue = mailer.MailQueue(transport, max_retries=1, retry_delay=0.01)
+	mail_queue.send('ag2@yopmail.com', 'Subject 1', 'Hello')
+	assert mail_queue.flush(5)
+	assert len(transport.batches) == 2
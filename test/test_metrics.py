@@ -0,0 +1,16 @@
+import pytest
+import requests
+
+@pytest.fixture
+def supply_url():
+	return "https://stagingapi.autographamt.com"
+
+#---------------request metrics in prometheus text format----------------#
+def test_metrics_1(supply_url):
+	requests.get(supply_url + '/v1/bibles')
+	resp = requests.get(supply_url + '/v1/metrics')
+	assert resp.status_code == 200, resp.text
+	assert resp.headers['Content-Type'].startswith('text/plain'), resp.headers
+	assert '# TYPE agmt_request_duration_seconds histogram' in resp.text, resp.text
+	assert '# TYPE agmt_request_sql_statements histogram' in resp.text, resp.text
+	assert 'agmt_dbpool_size' in resp.text, resp.text
@@ -0,0 +1,31 @@
+import pytest
+import requests
+import json
+
+@pytest.fixture
+def supply_url():
+	return "https://stagingapi.autographamt.com"
+
+#---------------verses of several bibles side by side----------------#
+def test_parallelverses_chapter(supply_url):
+	resp = requests.get(supply_url + '/v1/bibles/parallel?sourceIds=35,39&chapter=gen.1')
+	j = json.loads(resp.text)
+	assert j['sourceIds'] == [35, 39], str(j)[:200]
+	verses = j['verses']
+	assert verses[0]['verseId'] == 'gen.1.1'
+	assert sorted(verses[0]['verseContent']) == ['35', '39']
+	single = requests.get(supply_url + '/v1/bibles/35/verses/gen.1.1')
+	assert json.loads(single.text)['verseContent'] == verses[0]['verseContent']['35']
+
+def test_parallelverses_range(supply_url):
+	resp = requests.get(supply_url + '/v1/bibles/parallel?sourceIds=35,39&start=gen.1.26&end=gen.2.3')
+	verses = json.loads(resp.text)['verses']
+	assert verses[0]['verseId'] == 'gen.1.26', str(verses[0])
+	assert verses[-1]['verseId'] == 'gen.2.3'
+
+@pytest.mark.parametrize('query',[('sourceIds=35,39'),('sourceIds=a&chapter=gen.1'), \
+	('sourceIds=35,10&chapter=gen.1'),('sourceIds=35&start=gen.2.3&end=gen.1.1')])
+def test_parallelverses_invalid(supply_url,query):
+	resp = requests.get(supply_url + '/v1/bibles/parallel?' + query)
+	j = json.loads(resp.text)
+	assert j['success'] == False, str(j)
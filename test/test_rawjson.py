@@ -0,0 +1,25 @@
+import pytest
+import requests
+import json
+
+@pytest.fixture
+def supply_url():
+	return "https://stagingapi.autographamt.com"
+
+#---------------stored JSON is passed through unchanged by every endpoint----------------#
+def test_rawjson_book_and_chapter(supply_url):
+	resp = requests.get(supply_url + '/v1/bibles/35/books/rut/json')
+	j = json.loads(resp.text)
+	assert j['bibleBookCode'] == 'rut', str(j)
+	book = j['bookContent']
+	resp2 = requests.get(supply_url + '/v1/bibles/35/books/rut/chapter/2')
+	j2 = json.loads(resp2.text)
+	assert j2['chapterContent'] == book['chapters'][1]
+	resp3 = requests.get(supply_url + '/v1/sources/35/json/8')
+	j3 = json.loads(resp3.text)
+	assert j3['rut'] == book
+
+def test_rawjson_usfm_is_a_string(supply_url):
+	resp = requests.get(supply_url + '/v1/bibles/35/books/rut/usfm')
+	j = json.loads(resp.text)
+	assert j['bookContent'].startswith('\\id'), j['bookContent'][:20]
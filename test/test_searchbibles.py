@@ -0,0 +1,43 @@
+import pytest
+import requests
+import json
+
+@pytest.fixture
+def supply_url():
+	return "https://stagingapi.autographamt.com"
+
+#---------------one search over several bibles, with a limit per bible----------------#
+def test_searchbibles_sources(supply_url):
+	resp = requests.get(supply_url + '/v1/search?keyword=god&sourceIds=35,35&limit=5')
+	j = json.loads(resp.text)
+	assert j['sourceIds'] == [35], str(j)[:200]
+	assert len(j['results']) == 1
+	assert j['results'][0]['sourceId'] == 35
+	assert len(j['results'][0]['result']) == 5
+	assert j['results'][0]['more'] == True
+	single = json.loads(requests.get(supply_url + '/v1/search/35?keyword=god&limit=5').text)
+	assert j['results'][0]['result'] == single['result']
+
+def test_searchbibles_language(supply_url):
+	resp = requests.get(supply_url + '/v1/search?keyword=god&language=eng&mode=fts&limit=3')
+	j = json.loads(resp.text)
+	assert j['sourceIds'], str(j)[:200]
+	assert [result['sourceId'] for result in j['results']] == j['sourceIds']
+	for result in j['results']:
+		assert len(result['result']) <= 3
+
+@pytest.mark.parametrize('query',[('keyword=god'),('keyword=god&sourceIds=a,b'),('keyword=god&sourceIds=10'),
+	('keyword=god&sourceIds=35&limit=0'),('sourceIds=35'),('keyword=god&language=xyz')])
+def test_searchbibles_invalid(supply_url,query):
+	resp = requests.get(supply_url + '/v1/search?' + query)
+	j = json.loads(resp.text)
+	assert j['success'] == False
+
+def test_searchbibles_inactive(supply_url):
+	bibles = json.loads(requests.get(supply_url + '/v1/bibles?status=inactive').text)
+	if not isinstance(bibles, list) or not bibles:
+		pytest.skip("no inactive bible")
+	sourceId = bibles[0]['languageVersions'][0]['sourceId']
+	resp = requests.get(supply_url + '/v1/search?keyword=god&sourceIds=%s' % sourceId)
+	j = json.loads(resp.text)
+	assert j['success'] == False
@@ -0,0 +1,30 @@
+import pytest
+import requests
+import json
+
+@pytest.fixture
+def supply_url():
+	return "https://stagingapi.autographamt.com"
+
+#---------------full text search finds the same verses as a word search----------------#
+def test_searchfts_word(supply_url):
+	resp = requests.get(supply_url + '/v1/search/35?keyword=light&mode=fts')
+	j = json.loads(resp.text)
+	assert j['keyword'] == 'light', str(j)[:200]
+	fts = set((r['bookCode'], r['chapter'], r['verse']) for r in j['result'])
+	resp2 = requests.get(supply_url + '/v1/search/35?keyword=\\mlight\\M')
+	regex = set((r['bookCode'], r['chapter'], r['verse']) for r in json.loads(resp2.text)['result'])
+	assert fts == regex
+
+def test_searchfts_all_words(supply_url):
+	resp = requests.get(supply_url + '/v1/search/35?keyword=let there be light&mode=fts')
+	result = json.loads(resp.text)['result']
+	assert ('gen', 1, 3) in [(r['bookCode'], r['chapter'], r['verse']) for r in result]
+	for r in result:
+		assert 'light' in r['text'].lower()
+
+def test_searchfts_not_found(supply_url):
+	resp = requests.get(supply_url + '/v1/search/35?keyword=qwertyuiop&mode=fts')
+	j = json.loads(resp.text)
+	assert j['success'] == False, str(j)
+	assert j['message'] == 'Keyword not found in bible'
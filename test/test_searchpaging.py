@@ -0,0 +1,62 @@
+import pytest
+import requests
+import json
+
+@pytest.fixture
+def supply_url():
+	return "https://stagingapi.autographamt.com"
+
+#---------------search results in pages, keyed on the verse after the cursor----------------#
+def test_searchpaging_pages(supply_url):
+	url = supply_url + '/v1/search/35?keyword=god&limit=20'
+	first = json.loads(requests.get(url).text)
+	assert len(first['result']) == 20, str(first)[:200]
+	assert first['nextCursor']
+	assert first['total'] > 20
+	second = json.loads(requests.get(url + '&cursor=' + first['nextCursor']).text)
+	assert 'total' not in second
+	refs = [(v['bookCode'], v['chapter'], v['verse']) for v in first['result'] + second['result']]
+	assert len(set(refs)) == len(refs)
+
+def test_searchpaging_unpaged(supply_url):
+	resp = requests.get(supply_url + '/v1/search/35?keyword=god')
+	j = json.loads(resp.text)
+	assert 'nextCursor' not in j
+	assert len(j['result']) > 20
+
+def test_searchpaging_facets(supply_url):
+	resp = requests.get(supply_url + '/v1/search/35?keyword=god&limit=5&facets=book')
+	j = json.loads(resp.text)
+	assert j['totalExact'] == True
+	assert j['facetsExact'] == True
+	assert sum(j['facets'].values()) == j['total']
+
+@pytest.mark.parametrize('query',[('limit=0'),('limit=x'),('cursor=-1')])
+def test_searchpaging_invalid(supply_url,query):
+	resp = requests.get(supply_url + '/v1/search/35?keyword=god&' + query)
+	j = json.loads(resp.text)
+	assert j['success'] == False
+	assert j['message'] == 'Invalid limit or cursor'
+
+#---------------concordance of the other books in pages----------------#
+@pytest.mark.parametrize('match',[(''),('&match=substring')])
+def test_searchpaging_concordance(supply_url,match):
+	url = supply_url + '/v1/concordances/35/gen/light?limit=10' + match
+	first = json.loads(requests.get(url).text)
+	assert first['gen']
+	assert len(first['all']) == 10
+	assert first['total'] > 10
+	second = json.loads(requests.get(url + '&cursor=' + first['nextCursor']).text)
+	assert second['gen'] == []
+	assert second['all'][0]['bookCode'] != 'gen'
+	assert (second['all'][0]['bookCode'], second['all'][0]['chapterNumber'], second['all'][0]['verseNumber']) != \
+		(first['all'][-1]['bookCode'], first['all'][-1]['chapterNumber'], first['all'][-1]['verseNumber'])
+
+#---------------counts of tokens of several words are estimates----------------#
+def test_searchpaging_concordance_phrase_facets(supply_url):
+	resp = requests.get(supply_url + '/v1/concordances/35/gen/the%20light?facets=book')
+	j = json.loads(resp.text)
+	assert j['totalExact'] == False
+	assert j['facetsExact'] == False
+	single = json.loads(requests.get(supply_url + '/v1/concordances/35/gen/light?facets=book').text)
+	assert single['facetsExact'] == True
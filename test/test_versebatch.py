@@ -0,0 +1,30 @@
+import pytest
+import requests
+import json
+
+@pytest.fixture
+def supply_url():
+	return "https://stagingapi.autographamt.com"
+
+#---------------many verses in one request, in the order asked for----------------#
+def test_versebatch_order(supply_url):
+	verseIds = ['jhn.3.16', 'gen.1.1', 'rev.22.21', 'gen.1.1']
+	resp = requests.post(supply_url + '/v1/bibles/35/verses', data=json.dumps({'verseIds': verseIds}))
+	j = json.loads(resp.text)
+	assert [v['verseId'] for v in j['verses']] == verseIds, str(j)
+	single = requests.get(supply_url + '/v1/bibles/35/verses/jhn.3.16')
+	assert json.loads(single.text)['verseContent'] == j['verses'][0]['verseContent']
+
+def test_versebatch_invalid_ids(supply_url):
+	verseIds = ['gen.1.1', 'gen.1', 'gen.1.999']
+	resp = requests.post(supply_url + '/v1/bibles/35/verses', data=json.dumps({'verseIds': verseIds}))
+	verses = json.loads(resp.text)['verses']
+	assert 'verseContent' in verses[0], str(verses[0])
+	assert verses[1]['message'] == 'Invalid Verse id format.'
+	assert verses[2]['message'] == 'No verse found'
+
+@pytest.mark.parametrize('body',[({}),({'verseIds': []}),({'verseIds': 'gen.1.1'})])
+def test_versebatch_bad_request(supply_url,body):
+	resp = requests.post(supply_url + '/v1/bibles/35/verses', data=json.dumps(body))
+	j = json.loads(resp.text)
+	assert j['success'] == False, str(j)
@@ -0,0 +1,27 @@
+import pytest
+import requests
+import json
+
+@pytest.fixture
+def supply_url():
+	return "https://stagingapi.autographamt.com"
+
+#---------------verse lists hold every verse number once, in order----------------#
+def test_verselist_order(supply_url):
+	resp = requests.get(supply_url + '/v1/bibles/35/books/gen/chapters/1/verses')
+	numbers = [v['verse']['number'] for v in json.loads(resp.text)]
+	assert numbers == list(range(1, 32)), str(numbers)
+	resp2 = requests.get(supply_url + '/v1/bibles/35/chapters/gen.1/verses')
+	assert [v['verse']['number'] for v in json.loads(resp2.text)] == numbers
+
+#---------------verse lists answer a revalidation with 304----------------#
+@pytest.mark.parametrize('path',[('/v1/bibles/35/books/gen/chapters/1/verses'), \
+	('/v1/bibles/35/chapters/gen.1/verses')])
+def test_verselist_etag(supply_url,path):
+	url = supply_url + path
+	resp = requests.get(url)
+	assert resp.status_code == 200, resp.text
+	etag = resp.headers.get('ETag')
+	assert etag, resp.headers
+	resp2 = requests.get(url, headers={'If-None-Match': etag})
+	assert resp2.status_code == 304, resp2.text
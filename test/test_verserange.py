@@ -0,0 +1,37 @@
+import pytest
+import requests
+import json
+
+@pytest.fixture
+def supply_url():
+	return "https://stagingapi.autographamt.com"
+
+#---------------verses of a passage across chapters----------------#
+def test_verserange_across_chapters(supply_url):
+	resp = requests.get(supply_url + '/v1/bibles/35/verses/gen.1.26/gen.2.3')
+	j = json.loads(resp.text)
+	verses = j['verses']
+	assert verses[0]['verseId'] == 'gen.1.26', str(verses[0])
+	assert verses[-1]['verseId'] == 'gen.2.3', str(verses[-1])
+	assert [v['chapterNumber'] for v in verses].count(2) == 3
+	single = requests.get(supply_url + '/v1/bibles/35/verses/gen.1.31')
+	assert json.loads(single.text)['verseContent'] == verses[5]['verseContent']
+
+def test_verserange_one_verse(supply_url):
+	resp = requests.get(supply_url + '/v1/bibles/35/verses/jhn.3.16/jhn.3.16')
+	j = json.loads(resp.text)
+	assert len(j['verses']) == 1, str(j)
+	assert j['verses'][0]['reference'] == 'John 3:16'
+
+@pytest.mark.parametrize('start,end,message',[('gen.2.3','gen.1.26','The range ends before it starts'), \
+	('gen.1','gen.2.3','Invalid Verse id format.'),('xyz.1.1','gen.2.3','Invalid Verse id format.')])
+def test_verserange_invalid(supply_url,start,end,message):
+	resp = requests.get(supply_url + '/v1/bibles/35/verses/%s/%s' % (start, end))
+	j = json.loads(resp.text)
+	assert j['success'] == False, str(j)
+	assert j['message'] == message
+
+def test_verserange_invalid_source(supply_url):
+	resp = requests.get(supply_url + '/v1/bibles/10/verses/gen.1.1/gen.1.2')
+	j = json.loads(resp.text)
+	assert j['success'] == False, str(j)
@@ -0,0 +1,57 @@
+import os
+import sys
+import json
+import pytest
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'agmt'))
+import wordindex
+
+@pytest.fixture
+def supply_url():
+	return "https://stagingapi.autographamt.com"
+
+VERSES = [
+	(1001001, "In the beginning God created the heaven and the earth."),
+	(1001003, "And God said, Let there be light: and there was light."),
+	(43001005, "And the light shineth in darkness."),
+	(19027001, "यहोवा मेरी ज्योति और मेरा उद्धार है।")
+]
+
+def test_wordindex_words():
+	assert wordindex.words("Let there be light: and there was light.") == \
+		["Let", "there", "be", "light", "and", "there", "was", "light"]
+	assert wordindex.words("मेरा उद्धार है।") == ["मेरा", "उद्धार", "है"]
+
+def test_wordindex_lookup():
+	index = wordindex.WordIndex.build(VERSES)
+	assert index.lookup(["light"]) == [1001003, 43001005]
+	assert index.lookup(["the", "light"]) == [43001005]
+	assert index.lookup(["ज्योति"]) == [19027001]
+	assert index.lookup(["Light"]) == []
+	assert index.lookup(["darkness", "heaven"]) == []
+
+def test_wordindex_added():
+	index = wordindex.WordIndex.build(VERSES[1:])
+	added = index.added(VERSES[:1])
+	assert added.lookup(["the"]) == [1001001, 43001005]
+	assert index.lookup(["the"]) == [43001005]
+
+def test_wordindex_contains_words():
+	assert wordindex.contains_words(VERSES[0][1], ["the", "earth"])
+	assert not wordindex.contains_words(VERSES[0][1], ["earth", "the"])
+
+#---------------concordance of a word, from the word index of the bible----------------#
+def test_wordindex_concordance(supply_url):
+	resp = requests.get(supply_url + '/v1/concordances/35/gen/light')
+	j = json.loads(resp.text)
+	assert j['gen'], str(j)[:200]
+	for verse in j['gen'] + j['all']:
+		assert 'light' in wordindex.words(verse['verse'])
+
+def test_wordindex_concordance_substring(supply_url):
+	resp = requests.get(supply_url + '/v1/concordances/35/gen/ligh?match=substring')
+	j = json.loads(resp.text)
+	assert j['gen'], str(j)[:200]
+	for verse in j['gen'] + j['all']:
+		assert 'ligh' in verse['verse']